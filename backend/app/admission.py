@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import random
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Any, List, Optional
+from .loop_monitor import LOOP_LAG_STAGE
+from .metrics import Histogram, StageMetrics
+
+logger = logging.getLogger(__name__)
+
+# Close code for sessions turned away while overloaded ("try again later")
+ADMISSION_CLOSE_CODE = 1013
+
+# A stage needs this many observations in a window before its percentile counts
+MIN_WINDOW_SAMPLES = 20
+
+class AdmissionController:
+    """AIMD limit on concurrent sessions, steered by the latency budget.
+
+    Every `interval_ms` the controller looks at the last window of the watched stage
+    histograms and of event loop lag (published by the LoopMonitor). If any stage's p99
+    is above `target_fraction * budget_ms`, or the loop lag p99 is above `lag_budget_ms`, the
+    limit shrinks multiplicatively; otherwise it grows by one while sessions are
+    actually being held back by it. Sessions already admitted are never dropped:
+    shedding new arrivals is what keeps them inside the budget.
+    """
+
+    def __init__(self, metrics: StageMetrics, stages: List[str], budget_ms: float = 500,
+                 target_fraction: float = 0.8, lag_budget_ms: float = 50, initial_limit: int = 100,
+                 min_limit: int = 4, max_limit: int = 10000, decrease: float = 0.7,
+                 interval_ms: float = 1000, queue_size: int = 0, queue_timeout_ms: float = 0,
+                 retry_after_ms: float = 2000):
+        self.metrics = metrics
+        self.stages = stages
+        self.threshold_ms = budget_ms * target_fraction
+        self.lag_budget_ms = lag_budget_ms
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.interval = interval_ms / 1000
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.retry_after_ms = retry_after_ms
+
+        self.in_use = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.snapshots: Dict[str, Histogram] = {}
+        self.task: Optional[asyncio.Task] = None
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.decreases = 0
+        self.last_p99_ms: Dict[str, float] = {}
+        self.last_lag_ms = 0.0
+
+    def start(self):
+        """Start the limit adjustment loop"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def acquire(self) -> bool:
+        """Take a session slot, waiting in the queue if there is room; False means rejected"""
+        if self.in_use < self.limit and not self.waiters:
+            self.in_use += 1
+            self.admitted += 1
+            return True
+        if len(self.waiters) >= self.queue_size or self.queue_timeout <= 0:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # _wake may have handed this waiter a slot just before the cancellation landed
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        self.admitted += 1
+        return True
+
+    def release(self):
+        """Return a session slot"""
+        self.in_use -= 1
+        self._wake()
+
+    def retry_after(self) -> int:
+        """Retry hint in milliseconds, jittered so rejected callers do not return together"""
+        return int(self.retry_after_ms * random.uniform(1.0, 2.0))
+
+    def adjust(self):
+        """Apply one AIMD step from the latest window"""
+        p99s = {}
+        for stage in self.stages + [LOOP_LAG_STAGE]:
+            histogram = self.metrics.stages.get(stage)
+            if histogram is None:
+                continue
+            window = histogram.delta(self.snapshots.get(stage))
+            self.snapshots[stage] = histogram.copy()
+            if window.count >= MIN_WINDOW_SAMPLES:
+                p99s[stage] = window.quantile(0.99)
+        lag_ms = p99s.pop(LOOP_LAG_STAGE, 0.0)
+        self.last_p99_ms = {stage: round(value, 3) for stage, value in p99s.items()}
+        self.last_lag_ms = round(lag_ms, 3)
+
+        over = [stage for stage, value in p99s.items() if value > self.threshold_ms]
+        if over or lag_ms > self.lag_budget_ms:
+            limit = max(self.min_limit, int(min(self.limit, self.in_use) * self.decrease))
+            if limit < self.limit:
+                self.decreases += 1
+                logger.warning(f"Admission limit {self.limit} -> {limit} (slow stages: {over}, loop lag {lag_ms:.1f} ms)")
+                self.limit = limit
+        elif self.in_use >= self.limit or self.waiters:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the current limit and admission counters"""
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiting": len(self.waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "decreases": self.decreases,
+            "window_p99_ms": self.last_p99_ms,
+            "window_loop_lag_ms": self.last_lag_ms
+        }
+
+    def _wake(self):
+        while self.waiters and self.in_use < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_use += 1
+                waiter.set_result(True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.adjust()
+
+async def reject_connection(websocket, retry_after_ms: int):
+    """Tell an over-limit client when to come back, then close with ADMISSION_CLOSE_CODE"""
+    message = json.dumps({"type": "overloaded", "retry_after_ms": retry_after_ms})
+    if hasattr(websocket, "accept"):
+        # Starlette (SimpleVoiceAgent)
+        await websocket.accept()
+        await websocket.send_text(message)
+    else:
+        # websockets (VoiceAgent's transport)
+        await websocket.send(message)
+    await websocket.close(code=ADMISSION_CLOSE_CODE, reason=f"overloaded; retry after {retry_after_ms} ms")
+
+async def serve_admitted(admission: Optional[AdmissionController], websocket,
+                         serve: Callable[[Any], Awaitable[None]]):
+    """Run `serve(websocket)` holding a session slot, or turn the connection away when over the limit"""
+    if admission is None:
+        await serve(websocket)
+        return
+    admitted = False
+    try:
+        admitted = await admission.acquire()
+        if not admitted:
+            # Shed the new session so calls already in progress stay inside the latency budget
+            await reject_connection(websocket, admission.retry_after())
+            return
+        await serve(websocket)
+    finally:
+        if admitted:
+            admission.release()
+
+def create_admission_controller(config, metrics: StageMetrics) -> Optional[AdmissionController]:
+    """Admission controller for /ws configured from ADMISSION_* settings, or None when disabled"""
+    if not config.ADMISSION_CONTROL:
+        return None
+    return AdmissionController(
+        metrics,
+        [stage.strip() for stage in config.ADMISSION_STAGES.split(",") if stage.strip()],
+        budget_ms=config.MAX_LATENCY_MS,
+        target_fraction=config.ADMISSION_TARGET_FRACTION,
+        lag_budget_ms=config.ADMISSION_LAG_BUDGET_MS,
+        initial_limit=config.ADMISSION_INITIAL_LIMIT,
+        min_limit=config.ADMISSION_MIN_LIMIT,
+        max_limit=config.ADMISSION_MAX_LIMIT,
+        queue_size=config.ADMISSION_QUEUE_SIZE,
+        queue_timeout_ms=config.ADMISSION_QUEUE_TIMEOUT_MS,
+        retry_after_ms=config.ADMISSION_RETRY_AFTER_MS
+    )
@@ -0,0 +1,248 @@
+import struct
+from typing import Dict, Any, NamedTuple, Optional
+import numpy as np
+
+# Binary audio frame layout on /ws (little-endian):
+#   uint32 sequence number | uint64 sender timestamp (microseconds) | int16 PCM samples
+AUDIO_FRAME_HEADER = struct.Struct("<IQ")
+AUDIO_SAMPLE_DTYPE = np.dtype("<i2")
+
+class AudioFrame(NamedTuple):
+    seq: int
+    timestamp_us: int
+    samples: np.ndarray
+
+def decode_audio_frame(data: bytes, max_samples: int) -> AudioFrame:
+    """Decode a binary audio frame without copying the PCM payload"""
+    header_size = AUDIO_FRAME_HEADER.size
+    if len(data) < header_size:
+        raise ValueError("Audio frame shorter than header")
+
+    payload_size = len(data) - header_size
+    if payload_size % AUDIO_SAMPLE_DTYPE.itemsize:
+        raise ValueError("Audio payload is not whole int16 samples")
+    if payload_size // AUDIO_SAMPLE_DTYPE.itemsize > max_samples:
+        raise ValueError(f"Audio frame exceeds {max_samples} samples")
+
+    seq, timestamp_us = AUDIO_FRAME_HEADER.unpack_from(data)
+    # Read-only view over the received bytes
+    samples = np.frombuffer(data, dtype=AUDIO_SAMPLE_DTYPE, offset=header_size)
+    return AudioFrame(seq, timestamp_us, samples)
+
+class AudioRingBuffer:
+    """Preallocated int16 ring buffer exposing contiguous, zero-copy windows"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        # Every sample is stored twice (at i and i + capacity) so any window of up to
+        # `capacity` samples is a contiguous slice, even across the wrap point
+        self.buffer = np.zeros(capacity * 2, dtype=AUDIO_SAMPLE_DTYPE)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overruns = 0
+
+    def write(self, samples: np.ndarray):
+        """Copy samples into the ring, overwriting the oldest audio"""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self.write_pos += n - self.capacity
+            n = self.capacity
+
+        cap = self.capacity
+        start = self.write_pos % cap
+        self.buffer[start:start + n] = samples
+        if start + n <= cap:
+            self.buffer[start + cap:start + cap + n] = samples
+        else:
+            split = cap - start
+            self.buffer[start + cap:] = samples[:split]
+            self.buffer[:n - split] = samples[split:]
+        self.write_pos += n
+
+    def latest(self, n: int) -> np.ndarray:
+        """View of the most recent n samples"""
+        n = min(n, self.capacity, self.write_pos)
+        end = self.write_pos % self.capacity + self.capacity
+        return self._view(end - n, end)
+
+    def available(self) -> int:
+        """Number of unread samples"""
+        return self.write_pos - self.read_pos
+
+    def read_window(self, n: int) -> Optional[np.ndarray]:
+        """View of the next n unread samples, or None until enough audio has arrived.
+
+        The view is valid until `capacity` more samples are written.
+        """
+        if self.write_pos - self.read_pos > self.capacity:
+            # Reader fell behind by more than the ring holds; skip to the oldest audio
+            self.read_pos = self.write_pos - self.capacity
+            self.overruns += 1
+        if n > self.capacity or self.write_pos - self.read_pos < n:
+            return None
+
+        start = self.read_pos % self.capacity
+        self.read_pos += n
+        return self._view(start, start + n)
+
+    def _view(self, start: int, end: int) -> np.ndarray:
+        view = self.buffer[start:end]
+        view.flags.writeable = False
+        return view
+
+class JitterStats:
+    """Frame counters shared by every session's jitter buffer"""
+
+    def __init__(self):
+        self.frames_received = 0
+        self.frames_late = 0
+        self.frames_duplicate = 0
+        self.frames_concealed = 0
+        self.frames_lost = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "frames_received": self.frames_received,
+            "frames_late": self.frames_late,
+            "frames_duplicate": self.frames_duplicate,
+            "frames_concealed": self.frames_concealed,
+            "frames_lost": self.frames_lost
+        }
+
+class JitterBuffer:
+    """Reorders frames by sequence number and conceals small gaps before the ring buffer.
+
+    The playout depth adapts to the measured inter-arrival jitter (RFC 3550 estimator)
+    between `min_depth` and `max_depth` frames.
+    """
+
+    def __init__(self, ring: AudioRingBuffer, frame_size: int, sample_rate: int,
+                 min_depth: int = 1, max_depth: int = 8, max_conceal: int = 2,
+                 counters: Optional[JitterStats] = None):
+        self.ring = ring
+        self.frame_size = frame_size
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.max_conceal = max_conceal
+        self.sample_rate = sample_rate
+        # frame_size is only the largest frame accepted; both of these follow the frames actually sent
+        self.frame_duration_us = frame_size * 1_000_000 / sample_rate
+        self.last_frame_len = 0
+
+        # Preallocated slots indexed by seq % max_depth
+        self.slots = np.zeros((max_depth, frame_size), dtype=AUDIO_SAMPLE_DTYPE)
+        self.slot_seq = np.full(max_depth, -1, dtype=np.int64)
+        self.slot_len = np.zeros(max_depth, dtype=np.int32)
+
+        self.next_seq: Optional[int] = None
+        self.highest_seq = -1
+        self.target_depth = min_depth
+        self.jitter_us = 0.0
+        self.last_transit_us: Optional[int] = None
+        self.consecutive_concealed = 0
+        self.counters = counters if counters is not None else JitterStats()
+
+    def push(self, frame: AudioFrame, arrival_us: int) -> int:
+        """Buffer a frame and release every frame that is ready; returns frames released"""
+        self.counters.frames_received += 1
+        n = min(len(frame.samples), self.frame_size)
+        if n:
+            self.frame_duration_us = n * 1_000_000 / self.sample_rate
+        self._update_jitter(frame.timestamp_us, arrival_us)
+
+        seq = frame.seq
+        if self.next_seq is None:
+            self.next_seq = seq
+        if seq < self.next_seq:
+            self.counters.frames_late += 1
+            return 0
+
+        slot = seq % self.max_depth
+        if self.slot_seq[slot] == seq:
+            self.counters.frames_duplicate += 1
+            return 0
+
+        released = 0
+        if seq - self.next_seq >= 2 * self.max_depth:
+            # Stream jumped far ahead: flush what is buffered and resync on this frame
+            for _ in range(self.max_depth):
+                pending = self.next_seq % self.max_depth
+                if self.slot_seq[pending] == self.next_seq:
+                    released += self._release(pending)
+                else:
+                    self.next_seq += 1
+                    self.counters.frames_lost += 1
+            self.counters.frames_lost += seq - self.next_seq
+            self.next_seq = seq
+
+        # A frame this far ahead needs the slot window to move forward first
+        while seq - self.next_seq >= self.max_depth:
+            released += self._advance()
+
+        self.slots[slot, :n] = frame.samples[:n]
+        self.slot_len[slot] = n
+        self.slot_seq[slot] = seq
+        self.highest_seq = max(self.highest_seq, seq)
+
+        while True:
+            slot = self.next_seq % self.max_depth
+            if self.slot_seq[slot] == self.next_seq:
+                released += self._release(slot)
+            elif self.highest_seq - self.next_seq > self.target_depth:
+                # Waited as long as the target depth allows for the missing frame
+                released += self._advance()
+            else:
+                return released
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the playout depth, jitter estimate and frame counters"""
+        return {
+            "target_depth": self.target_depth,
+            "jitter_ms": round(self.jitter_us / 1000, 3),
+            **self.counters.stats()
+        }
+
+    def _update_jitter(self, timestamp_us: int, arrival_us: int):
+        # Clock offset between sender and receiver cancels out in the transit delta
+        transit = arrival_us - timestamp_us
+        if self.last_transit_us is not None:
+            delta = abs(transit - self.last_transit_us)
+            self.jitter_us += (delta - self.jitter_us) / 16
+            depth = self.min_depth + int(2 * self.jitter_us / self.frame_duration_us)
+            self.target_depth = min(self.max_depth - 1, max(self.min_depth, depth))
+        self.last_transit_us = transit
+
+    def _release(self, slot: int) -> int:
+        self.last_frame_len = int(self.slot_len[slot])
+        self.ring.write(self.slots[slot, :self.last_frame_len])
+        self.slot_seq[slot] = -1
+        self.next_seq += 1
+        self.consecutive_concealed = 0
+        return 1
+
+    def _advance(self) -> int:
+        """Move past next_seq: release it if present, otherwise conceal or skip it"""
+        slot = self.next_seq % self.max_depth
+        if self.slot_seq[slot] == self.next_seq:
+            return self._release(slot)
+
+        self.next_seq += 1
+        if self.consecutive_concealed < self.max_conceal and self.last_frame_len:
+            # Small gap: repeat the previous frame
+            self.ring.write(self.ring.latest(self.last_frame_len))
+            self.consecutive_concealed += 1
+            self.counters.frames_concealed += 1
+            return 1
+
+        self.counters.frames_lost += 1
+        return 0
+
+def create_audio_buffer(sample_rate: int, chunk_size: int, buffer_seconds: float,
+                        min_depth: int, max_depth: int, max_conceal: int,
+                        counters: Optional[JitterStats] = None) -> JitterBuffer:
+    """Create a per-session jitter buffer backed by a preallocated ring"""
+    # Round capacity up to whole chunks, and keep at least two so concealment never overlaps
+    chunks = max(2, -(-int(sample_rate * buffer_seconds) // chunk_size))
+    ring = AudioRingBuffer(chunks * chunk_size)
+    return JitterBuffer(ring, chunk_size, sample_rate, min_depth, max_depth, max_conceal, counters)
@@ -11,4 +11,103 @@ class Config:
     # Performance settings
     MAX_LATENCY_MS = 500
     AUDIO_SAMPLE_RATE = 16000
-    AUDIO_CHUNK_SIZE = 1024
\ No newline at end of file
+    AUDIO_CHUNK_SIZE = 1024
+    # Echo each binary audio frame header back so clients can measure round trips
+    AUDIO_FRAME_ACKS = os.getenv("AUDIO_FRAME_ACKS", "true").lower() == "true"
+    # Requests carrying an "id" run concurrently, up to this many per connection
+    MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", 8))
+
+    # "gemini", or "stub" for the deterministic local stand-in used in offline benchmarks
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+    STUB_LLM_FIRST_TOKEN_MS = float(os.getenv("STUB_LLM_FIRST_TOKEN_MS", 200))
+    STUB_LLM_TOKEN_MS = float(os.getenv("STUB_LLM_TOKEN_MS", 20))
+    # JSON list of {"match": regex, "tool": name, "args": {...}}; defaults to the form tools
+    STUB_LLM_SCRIPT = os.getenv("STUB_LLM_SCRIPT")
+
+    # Resolve common form commands locally instead of waiting on the LLM
+    INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+
+    # Speculative LLM dispatch (VoiceAgent): start on a partial transcript once it is stable
+    SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "false").lower() == "true"
+    SPECULATION_STABILITY_MS = float(os.getenv("SPECULATION_STABILITY_MS", 250))
+    SPECULATION_MIN_WORDS = int(os.getenv("SPECULATION_MIN_WORDS", 3))
+
+    # Inbound audio buffering (per session)
+    AUDIO_BUFFER_SECONDS = float(os.getenv("AUDIO_BUFFER_SECONDS", 2.0))
+    JITTER_MIN_FRAMES = int(os.getenv("JITTER_MIN_FRAMES", 1))
+    JITTER_MAX_FRAMES = int(os.getenv("JITTER_MAX_FRAMES", 8))
+    JITTER_MAX_CONCEAL_FRAMES = int(os.getenv("JITTER_MAX_CONCEAL_FRAMES", 2))
+
+    # Voice activity detection: energy/ZCR gate, escalating ambiguous windows to Silero
+    # Samples per VAD window; a multiple of 512 (Silero's chunk size) when VAD_USE_SILERO is on
+    VAD_WINDOW_SIZE = int(os.getenv("VAD_WINDOW_SIZE", 512))
+    VAD_SILENCE_DBFS = float(os.getenv("VAD_SILENCE_DBFS", -50.0))
+    VAD_SPEECH_DBFS = float(os.getenv("VAD_SPEECH_DBFS", -30.0))
+    VAD_ZCR_MAX = float(os.getenv("VAD_ZCR_MAX", 0.35))
+    VAD_HANGOVER_WINDOWS = int(os.getenv("VAD_HANGOVER_WINDOWS", 8))
+    VAD_USE_SILERO = os.getenv("VAD_USE_SILERO", "true").lower() == "true"
+    VAD_SILERO_THRESHOLD = float(os.getenv("VAD_SILERO_THRESHOLD", 0.5))
+    # Silero runs once per process, batching ambiguous windows from all sessions
+    VAD_BATCH_MAX_SIZE = int(os.getenv("VAD_BATCH_MAX_SIZE", 64))
+    VAD_BATCH_MAX_DELAY_MS = float(os.getenv("VAD_BATCH_MAX_DELAY_MS", 5.0))
+
+    # Disconnected sessions keep their current form this long, for callers reconnecting with their ID
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 300))
+
+    # Form store settings
+    # JSON file of extra form types: {name: {"fields": {field: {"type": ..., "required": ...}}}}
+    FORM_TYPES_PATH = os.getenv("FORM_TYPES_PATH")
+    FORM_STORE_MAX_FORMS = int(os.getenv("FORM_STORE_MAX_FORMS", 10000))
+    FORM_TTL_SECONDS = int(os.getenv("FORM_TTL_SECONDS", 3600))
+    # Forms that keep their last snapshot and its JSON between changes (most recently read first)
+    FORM_SNAPSHOT_CACHE_SIZE = int(os.getenv("FORM_SNAPSHOT_CACHE_SIZE", 1024))
+    # Append-only form journal, replayed on startup; unset keeps forms in memory only
+    JOURNAL_PATH = os.getenv("JOURNAL_PATH")
+    # Group commit: buffered records are written and fsynced this often
+    JOURNAL_FLUSH_MS = float(os.getenv("JOURNAL_FLUSH_MS", 20))
+    JOURNAL_COMPACT_MIN_RECORDS = int(os.getenv("JOURNAL_COMPACT_MIN_RECORDS", 10000))
+
+    # Event loop monitor: lag histogram plus stacks of callbacks blocking the loop
+    LOOP_MONITOR = os.getenv("LOOP_MONITOR", "true").lower() == "true"
+    LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", 20))
+    SLOW_CALLBACK_MS = float(os.getenv("SLOW_CALLBACK_MS", 100))
+
+    # Admission control on /ws: AIMD limit on concurrent sessions that sheds new arrivals
+    # once a watched stage's recent p99 passes ADMISSION_TARGET_FRACTION of MAX_LATENCY_MS
+    ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "false").lower() == "true"
+    ADMISSION_STAGES = os.getenv("ADMISSION_STAGES", "turn,audio_frame,tool_call,intent")
+    ADMISSION_TARGET_FRACTION = float(os.getenv("ADMISSION_TARGET_FRACTION", 0.8))
+    # Loop lag p99 limit; needs LOOP_MONITOR
+    ADMISSION_LAG_BUDGET_MS = float(os.getenv("ADMISSION_LAG_BUDGET_MS", 50))
+    ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", 4))
+    ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", 10000))
+    # Starts at full capacity and only shrinks once the budget is actually at risk
+    ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", ADMISSION_MAX_LIMIT))
+    # Over-limit sessions wait this long for a slot (0 rejects immediately)
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+    ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 1000))
+    ADMISSION_RETRY_AFTER_MS = float(os.getenv("ADMISSION_RETRY_AFTER_MS", 2000))
+
+    # Session recording for offline replay (app.replay); unset disables it
+    RECORD_DIR = os.getenv("RECORD_DIR")
+    # Fraction of sessions recorded
+    RECORD_SAMPLE_RATE = float(os.getenv("RECORD_SAMPLE_RATE", 1.0))
+
+    # Outbound fan-out: bounded queue per connection, drained by its own writer task
+    OUTBOUND_QUEUE_SIZE = int(os.getenv("OUTBOUND_QUEUE_SIZE", 64))
+    # drop_oldest, coalesce or disconnect
+    SLOW_CONSUMER_POLICY = os.getenv("SLOW_CONSUMER_POLICY", "coalesce")
+
+    # Pipeline pool (VoiceAgent): processor sets built ahead of arriving callers
+    PIPELINE_POOL_MIN_SIZE = int(os.getenv("PIPELINE_POOL_MIN_SIZE", 4))
+    # Upper bound on pipelines held ready or being built; MIN_SIZE is clamped to it
+    PIPELINE_POOL_MAX_SIZE = int(os.getenv("PIPELINE_POOL_MAX_SIZE", 16))
+
+    # Multi-process serving (app.serve): session-affine workers sharing local form state
+    # 0 sizes the pool from the CPUs the container may use (cgroup quota and affinity)
+    WORKERS = int(os.getenv("WORKERS", 0))
+    # Set by the launcher in each worker process
+    WORKER_INDEX = os.getenv("WORKER_INDEX")
+    # SQLite file holding every session's latest form; unset keeps form state in-process only
+    SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH")
+    SHARED_STATE_FLUSH_MS = float(os.getenv("SHARED_STATE_FLUSH_MS", 50))
@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Awaitable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class DispatchStats:
+    """Request counters shared by every connection's dispatcher"""
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled
+        }
+
+class RequestDispatcher:
+    """Runs a connection's ID-tagged requests concurrently, up to a fixed limit.
+
+    Each request sends its own reply when it completes, so a slow tool call does
+    not hold up pings or audio read after it.
+    """
+
+    def __init__(self, max_in_flight: int = 8, counters: Optional[DispatchStats] = None):
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.tasks: Set[asyncio.Task] = set()
+        self.counters = counters if counters is not None else DispatchStats()
+
+    async def submit(self, request: Awaitable):
+        """Start a request, waiting only if the connection is at its in-flight limit"""
+        await self.semaphore.acquire()
+        task = asyncio.create_task(self._run(request))
+        self.tasks.add(task)
+        # A task cancelled before it starts never runs _run, so the slot is returned here
+        task.add_done_callback(functools.partial(self._done, request))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.tasks)
+
+    async def close(self):
+        """Cancel requests still running"""
+        for task in list(self.tasks):
+            task.cancel()
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def _run(self, request: Awaitable):
+        try:
+            await request
+            self.counters.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.counters.failed += 1
+            logger.error(f"Request error: {e}")
+
+    def _done(self, request: Awaitable, task: asyncio.Task):
+        self.tasks.discard(task)
+        self.semaphore.release()
+        if task.cancelled():
+            self.counters.cancelled += 1
+            if asyncio.iscoroutine(request):
+                # Never awaited if the task was cancelled before its first step
+                request.close()
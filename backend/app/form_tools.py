@@ -1,121 +1,375 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+import itertools
 import json
-import asyncio
+import os
+import time
 from datetime import datetime
+from .config import Config
+from .form_types import FormType, FormTypeRegistry, form_type_registry
+from .serialization import Snapshot, serialization_stats
 
-class FormManager:
+class FormIdGenerator:
+    """Monotonic form IDs that never collide within a process"""
+    
     def __init__(self):
-        self.forms = {}
-        self.current_form = None
+        # Start time and pid keep IDs unique across restarts and worker processes
+        self.prefix = f"form_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.counter = itertools.count(1)
+    
+    def __call__(self) -> str:
+        return f"{self.prefix}_{next(self.counter)}"
+
+generate_form_id = FormIdGenerator()
+
+class SnapshotCache:
+    """LRU bound on how many forms keep their last snapshot between changes.
+
+    A form evicted here drops its cached snapshot and JSON, and builds them again
+    if it is read later.
+    """
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        # form_id -> form holding a cached snapshot, least recently used first
+        self.forms: "OrderedDict[str, Form]" = OrderedDict()
+        self.evictions = 0
+    
+    def keep(self, form: "Form"):
+        """Mark a form's snapshot as recently used, evicting the LRU one when full"""
+        self.forms[form.id] = form
+        self.forms.move_to_end(form.id)
+        while len(self.forms) > self.max_size:
+            _, evicted = self.forms.popitem(last=False)
+            evicted.cached = None
+            self.evictions += 1
+    
+    def discard(self, form_id: str):
+        """Forget a form that left the store"""
+        form = self.forms.pop(form_id, None)
+        if form is not None:
+            form.cached = None
+    
+    def stats(self) -> Dict[str, int]:
+        snapshots = [form.cached for form in self.forms.values() if form.cached is not None]
+        return {
+            "cached_snapshots": len(snapshots),
+            "cached_snapshot_bytes": sum(len(snapshot.encoded) for snapshot in snapshots if snapshot.encoded),
+            "snapshot_evictions": self.evictions
+        }
+    
+    def __len__(self) -> int:
+        return len(self.forms)
+
+snapshot_cache = SnapshotCache(Config.FORM_SNAPSHOT_CACHE_SIZE)
+
+class FormStore:
+    """Bounded form storage with LRU eviction and idle TTL expiry"""
+    
+    def __init__(self, max_forms: int = 10000, ttl_seconds: float = 3600):
+        self.max_forms = max_forms
+        self.ttl_seconds = ttl_seconds
+        # form_id -> (form, last access time), least recently used first
+        self.forms: "OrderedDict[str, Tuple[Form, float]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+        # Callables taking (event, owner, form), run after every form mutation
+        self.listeners = []
+    
+    def get(self, form_id: str) -> Optional["Form"]:
+        """Get a form and mark it as recently used"""
+        entry = self.forms.get(form_id)
+        if entry is None:
+            return None
         
-    async def create_form(self, form_type: str = "default") -> Dict[str, Any]:
-        """Create a new form"""
-        form_id = f"form_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        now = time.monotonic()
+        if now - entry[1] > self.ttl_seconds:
+            del self.forms[form_id]
+            snapshot_cache.discard(form_id)
+            self.expirations += 1
+            return None
+        
+        self.forms[form_id] = (entry[0], now)
+        self.forms.move_to_end(form_id)
+        return entry[0]
+    
+    def put(self, form_id: str, form: "Form"):
+        """Store a form, expiring idle forms and evicting the LRU form when full"""
+        now = time.monotonic()
+        self.forms[form_id] = (form, now)
+        self.forms.move_to_end(form_id)
+        self.expire(now)
         
-        form_schema = {
-            "id": form_id,
-            "type": form_type,
+        while len(self.forms) > self.max_forms:
+            evicted_id, _ = self.forms.popitem(last=False)
+            snapshot_cache.discard(evicted_id)
+            self.evictions += 1
+    
+    def remove(self, form_id: str) -> Optional["Form"]:
+        """Remove a form from the store"""
+        entry = self.forms.pop(form_id, None)
+        snapshot_cache.discard(form_id)
+        return entry[0] if entry else None
+    
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop forms idle for longer than the TTL, oldest first"""
+        now = time.monotonic() if now is None else now
+        expired = 0
+        while self.forms:
+            form_id, (_, last_access) = next(iter(self.forms.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            del self.forms[form_id]
+            snapshot_cache.discard(form_id)
+            expired += 1
+        self.expirations += expired
+        return expired
+    
+    def stats(self) -> Dict[str, int]:
+        """Get store counters, including the process-wide snapshot cache"""
+        return {
+            "live_forms": len(self.forms),
+            "max_forms": self.max_forms,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            **snapshot_cache.stats()
+        }
+    
+    def notify(self, event: str, owner: Optional[str], form: "Form"):
+        """Tell listeners that a form was created, updated or submitted"""
+        for listener in self.listeners:
+            listener(event, owner, form)
+    
+    def __contains__(self, form_id: str) -> bool:
+        return form_id in self.forms
+    
+    def __len__(self) -> int:
+        return len(self.forms)
+
+class Form:
+    """One form's mutable state.
+
+    Field names, types and required flags live on the shared FormType; a form only
+    holds its values, in field order, and numeric timestamps (time.time()). The dict
+    sent to clients is built when a response needs it, once per version (snapshot()).
+    """
+    __slots__ = ("id", "form_type", "type_name", "values", "errors", "status", "version",
+                 "created_at", "updated_at", "submitted_at", "cached")
+    
+    def __init__(self, form_id: str, form_type: FormType, type_name: Optional[str] = None):
+        self.id = form_id
+        self.form_type = form_type
+        # The requested type name, which may have fallen back to the default schema
+        self.type_name = type_name or form_type.name
+        self.values = form_type.new_values()
+        # Outstanding validation errors by field, kept current by update_field
+        self.errors = dict(form_type.initial_errors)
+        self.status = "active"
+        self.version = 1
+        self.created_at = time.time()
+        self.updated_at: Optional[float] = None
+        self.submitted_at: Optional[float] = None
+        self.cached: Optional[Snapshot] = None
+    
+    def value(self, field_name: str) -> str:
+        return self.values[self.form_type.index[field_name]]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The form as clients see it"""
+        data = {
+            "id": self.id,
+            "type": self.type_name,
             "fields": {
-                "name": {"value": "", "required": True, "type": "text"},
-                "email": {"value": "", "required": True, "type": "email"},
-                "phone": {"value": "", "required": False, "type": "tel"},
-                "message": {"value": "", "required": False, "type": "textarea"}
+                field_name: {"value": value, "required": required, "type": field_type}
+                for (field_name, required, field_type), value in zip(self.form_type.field_meta, self.values)
             },
-            "status": "active",
-            "created_at": datetime.now().isoformat()
+            "errors": dict(self.errors),
+            "status": self.status,
+            "version": self.version,
+            "created_at": _isoformat(self.created_at)
         }
+        if self.updated_at is not None:
+            data["updated_at"] = _isoformat(self.updated_at)
+        if self.submitted_at is not None:
+            data["submitted_at"] = _isoformat(self.submitted_at)
+        return data
+    
+    def snapshot(self) -> Snapshot:
+        """to_dict() memoized for the current version, along with its JSON encoding.
+
+        Shared by every reader of this version, so it must not be modified. Only the
+        snapshot_cache's most recently read forms keep theirs between changes.
+        """
+        cached = self.cached
+        if cached is not None and cached.version == self.version:
+            serialization_stats.snapshots_reused += 1
+        else:
+            serialization_stats.snapshots_built += 1
+            cached = self.cached = Snapshot(self.to_dict(), self.version)
+        snapshot_cache.keep(self)
+        return cached
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], types: Optional[FormTypeRegistry] = None) -> "Form":
+        """Rebuild a form from its to_dict() output, e.g. a journal record"""
+        types = types if types is not None else form_type_registry
+        form = cls(data["id"], types.get(data.get("type")), data.get("type"))
+        fields = data.get("fields", {})
+        form.values = [fields.get(field_name, {}).get("value", default)
+                       for field_name, default in zip(form.form_type.field_names, form.values)]
+        errors = data.get("errors")
+        if errors is None:
+            # Journaled before errors were tracked
+            errors = {field_name: f"{field_name} is required"
+                      for (field_name, required, _), value in zip(form.form_type.field_meta, form.values)
+                      if required and not value}
+        form.errors = errors
+        form.status = data.get("status", "active")
+        form.version = data.get("version", 1)
+        form.created_at = _timestamp(data.get("created_at")) or form.created_at
+        form.updated_at = _timestamp(data.get("updated_at"))
+        form.submitted_at = _timestamp(data.get("submitted_at"))
+        return form
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+def _timestamp(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+class FormManager:
+    def __init__(self, store: Optional[FormStore] = None, owner: Optional[str] = None,
+                 types: Optional[FormTypeRegistry] = None):
+        self.forms = store if store is not None else FormStore()
+        # Session the forms belong to, passed on to store listeners
+        self.owner = owner
+        self.types = types if types is not None else form_type_registry
+        self.current_form = None
+        
+    async def create_form(self, form_type: str = "default") -> Form:
+        """Create a new form from its compiled type"""
+        form = Form(generate_form_id(), self.types.get(form_type), form_type)
         
-        self.forms[form_id] = form_schema
-        self.current_form = form_id
-        return form_schema
+        self.forms.put(form.id, form)
+        self.current_form = form.id
+        self.forms.notify("create", self.owner, form)
+        return form
     
-    async def update_field(self, field_name: str, value: str) -> Dict[str, Any]:
+    async def update_field(self, field_name: str, value: str) -> Form:
         """Update a form field"""
-        if not self.current_form:
-            raise ValueError("No active form")
-            
-        form = self.forms.get(self.current_form)
+        form = self.current()
         if not form:
-            raise ValueError("Form not found")
-            
-        if field_name not in form["fields"]:
+            raise ValueError("No active form" if not self.current_form else "Form not found")
+        
+        index = form.form_type.index.get(field_name)
+        if index is None:
             raise ValueError(f"Field '{field_name}' not found")
-            
-        form["fields"][field_name]["value"] = value
-        form["updated_at"] = datetime.now().isoformat()
+        
+        # Malformed values raise here and leave the form unchanged
+        value, error = form.form_type.validate(field_name, value)
+        form.values[index] = value
+        if error:
+            form.errors[field_name] = error
+        else:
+            form.errors.pop(field_name, None)
+        form.version += 1
+        form.updated_at = time.time()
+        form.cached = None
+        self.forms.notify("update", self.owner, form)
         
         return form
     
     async def submit_form(self) -> Dict[str, Any]:
         """Submit the current form"""
-        if not self.current_form:
-            raise ValueError("No active form")
-            
-        form = self.forms.get(self.current_form)
+        form = self.current()
         if not form:
-            raise ValueError("Form not found")
-            
-        # Validate required fields
-        errors = []
-        for field_name, field_info in form["fields"].items():
-            if field_info["required"] and not field_info["value"]:
-                errors.append(f"{field_name} is required")
+            raise ValueError("No active form" if not self.current_form else "Form not found")
         
-        if errors:
-            return {"status": "error", "errors": errors}
+        # Fields are validated as they are updated, so only outstanding errors remain to check
+        if form.errors:
+            return {"status": "error", "errors": list(form.errors.values())}
         
-        form["status"] = "submitted"
-        form["submitted_at"] = datetime.now().isoformat()
+        form.status = "submitted"
+        form.version += 1
+        form.submitted_at = time.time()
+        form.cached = None
+        self.forms.notify("submit", self.owner, form)
         
         return {"status": "success", "form": form}
     
-    def get_current_form(self) -> Optional[Dict[str, Any]]:
-        """Get the current active form"""
+    def current(self) -> Optional[Form]:
+        """The current form object"""
         if self.current_form:
             return self.forms.get(self.current_form)
         return None
+    
+    def get_current_form(self) -> Optional[Dict[str, Any]]:
+        """Get the current active form"""
+        form = self.current()
+        return form.snapshot() if form else None
+
+def form_delta(form: Form, field_names) -> Dict[str, Any]:
+    """Fields changed by the latest form mutation.
+
+    Clients apply a delta only if they hold `base_version`, and resync otherwise.
+    `errors` replaces the client's errors as a whole; it is small and changes with fields.
+    """
+    return {
+        "id": form.id,
+        "version": form.version,
+        "base_version": form.version - 1,
+        "status": form.status,
+        "fields": {name: form.value(name) for name in field_names},
+        "errors": dict(form.errors),
+        "updated_at": _isoformat(form.updated_at) if form.updated_at is not None else None
+    }
 
-# Tool calling functions for Gemini
-def get_form_tools():
-    return [
-        {
-            "name": "open_form",
-            "description": "Open a new form for the user to fill",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "form_type": {
-                        "type": "string",
-                        "description": "Type of form to open",
-                        "default": "default"
-                    }
+# Tool calling functions for Gemini, encoded once so no caller can change what others advertise
+FORM_TOOLS_JSON = json.dumps([
+    {
+        "name": "open_form",
+        "description": "Open a new form for the user to fill",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "form_type": {
+                    "type": "string",
+                    "description": "Type of form to open",
+                    "default": "default"
                 }
             }
-        },
-        {
-            "name": "update_form_field",
-            "description": "Update a specific field in the form",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "field_name": {
-                        "type": "string",
-                        "description": "Name of the field to update (name, email, phone, message)"
-                    },
-                    "value": {
-                        "type": "string",
-                        "description": "Value to set for the field"
-                    }
+        }
+    },
+    {
+        "name": "update_form_field",
+        "description": "Update a specific field in the form",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "field_name": {
+                    "type": "string",
+                    "description": "Name of the field to update (name, email, phone, message)"
                 },
-                "required": ["field_name", "value"]
-            }
-        },
-        {
-            "name": "submit_form",
-            "description": "Submit the completed form",
-            "parameters": {
-                "type": "object",
-                "properties": {}
-            }
+                "value": {
+                    "type": "string",
+                    "description": "Value to set for the field"
+                }
+            },
+            "required": ["field_name", "value"]
+        }
+    },
+    {
+        "name": "submit_form",
+        "description": "Submit the completed form",
+        "parameters": {
+            "type": "object",
+            "properties": {}
         }
-    ]
\ No newline at end of file
+    }
+])
+
+def get_form_tools() -> List[Dict[str, Any]]:
+    """Form tool schemas, decoded into the caller's own copy"""
+    return json.loads(FORM_TOOLS_JSON)
@@ -0,0 +1,155 @@
+import json
+import re
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+from .config import Config
+
+# A field validator returns (normalized value, None) or (None, error message)
+FieldValidator = Callable[[str], Tuple[Optional[str], Optional[str]]]
+
+EMAIL_PATTERN = re.compile(r"^[a-z0-9._%+-]+@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}$")
+PHONE_PATTERN = re.compile(r"^\+?[\d\s().-]+$")
+PHONE_NON_DIGITS = re.compile(r"\D")
+NUMBER_PATTERN = re.compile(r"^[+-]?(?:\d+\.?\d*|\.\d+)$")
+URL_PATTERN = re.compile(r"^https?://[^\s/$.?#][^\s]*$", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+WHITESPACE = re.compile(r"\s+")
+
+def _validate_text(value: str) -> Tuple[Optional[str], Optional[str]]:
+    return WHITESPACE.sub(" ", value).strip(), None
+
+def _validate_textarea(value: str) -> Tuple[Optional[str], Optional[str]]:
+    return value.strip(), None
+
+def _validate_email(value: str) -> Tuple[Optional[str], Optional[str]]:
+    value = value.strip().lower()
+    if EMAIL_PATTERN.match(value):
+        return value, None
+    return None, "is not a valid email address"
+
+def _validate_tel(value: str) -> Tuple[Optional[str], Optional[str]]:
+    value = WHITESPACE.sub(" ", value).strip()
+    if PHONE_PATTERN.match(value) and 7 <= len(PHONE_NON_DIGITS.sub("", value)) <= 15:
+        return value, None
+    return None, "is not a valid phone number"
+
+def _validate_number(value: str) -> Tuple[Optional[str], Optional[str]]:
+    value = value.strip().replace(",", "")
+    if NUMBER_PATTERN.match(value):
+        return value, None
+    return None, "is not a number"
+
+def _validate_url(value: str) -> Tuple[Optional[str], Optional[str]]:
+    value = value.strip()
+    if URL_PATTERN.match(value):
+        return value, None
+    return None, "is not a valid URL"
+
+def _validate_date(value: str) -> Tuple[Optional[str], Optional[str]]:
+    value = value.strip()
+    if DATE_PATTERN.match(value):
+        return value, None
+    return None, "is not a date (YYYY-MM-DD)"
+
+FIELD_VALIDATORS: Dict[str, FieldValidator] = {
+    "text": _validate_text,
+    "textarea": _validate_textarea,
+    "email": _validate_email,
+    "tel": _validate_tel,
+    "number": _validate_number,
+    "url": _validate_url,
+    "date": _validate_date
+}
+
+DEFAULT_FORM_TYPES = {
+    "default": {
+        "fields": {
+            "name": {"type": "text", "required": True},
+            "email": {"type": "email", "required": True},
+            "phone": {"type": "tel", "required": False},
+            "message": {"type": "textarea", "required": False}
+        }
+    }
+}
+
+class CompiledField(NamedTuple):
+    required: bool
+    validate: FieldValidator
+
+class FormType:
+    """A form schema compiled once into shared field metadata and per-field validators.
+
+    Forms of this type only hold their field values, as a list in `field_names` order.
+    """
+
+    def __init__(self, name: str, schema: Dict[str, Any]):
+        self.name = name
+        self.fields: Dict[str, CompiledField] = {}
+        # (field name, required, field type) per position
+        self.field_meta: List[Tuple[str, bool, str]] = []
+        self.defaults: List[str] = []
+        for field_name, spec in schema["fields"].items():
+            field_type = spec.get("type", "text")
+            if field_type not in FIELD_VALIDATORS:
+                raise ValueError(f"Unknown field type '{field_type}' in form type '{name}'")
+            required = bool(spec.get("required", False))
+            self.fields[field_name] = CompiledField(required, FIELD_VALIDATORS[field_type])
+            self.field_meta.append((field_name, required, field_type))
+            self.defaults.append(spec.get("default", ""))
+        self.field_names = tuple(meta[0] for meta in self.field_meta)
+        self.index = {field_name: i for i, field_name in enumerate(self.field_names)}
+        # Errors of a fresh form: every required field without a default is missing
+        self.initial_errors = {
+            field_name: f"{field_name} is required"
+            for (field_name, required, _), default in zip(self.field_meta, self.defaults)
+            if required and not default
+        }
+
+    def new_values(self) -> List[str]:
+        """Field values of a fresh form"""
+        return list(self.defaults)
+
+    def validate(self, field_name: str, value: str) -> Tuple[str, Optional[str]]:
+        """Normalize a field value.
+
+        Returns (value, None) when the field is complete, or (value, error) when a
+        required field was cleared. Raises ValueError for values of the wrong shape.
+        """
+        field = self.fields.get(field_name)
+        if field is None:
+            raise ValueError(f"Field '{field_name}' not found")
+        if not value or not value.strip():
+            return "", f"{field_name} is required" if field.required else None
+        normalized, error = field.validate(value)
+        if error:
+            raise ValueError(f"{field_name} {error}")
+        return normalized, None
+
+class FormTypeRegistry:
+    """Compiled form types by name; unknown names get the default schema"""
+
+    def __init__(self, default: str = "default"):
+        self.types: Dict[str, FormType] = {}
+        self.default = default
+
+    def register(self, name: str, schema: Dict[str, Any]):
+        """Compile and register a form schema"""
+        self.types[name] = FormType(name, schema)
+
+    def get(self, name: Optional[str]) -> FormType:
+        return self.types.get(name) or self.types[self.default]
+
+    def names(self) -> List[str]:
+        return list(self.types)
+
+def create_form_type_registry(path: Optional[str] = None) -> FormTypeRegistry:
+    """Registry of the built-in form types plus any from a JSON file of {name: {"fields": {...}}}"""
+    schemas = dict(DEFAULT_FORM_TYPES)
+    if path:
+        with open(path) as f:
+            schemas.update(json.load(f))
+    registry = FormTypeRegistry()
+    for name, schema in schemas.items():
+        registry.register(name, schema)
+    return registry
+
+form_type_registry = create_form_type_registry(Config.FORM_TYPES_PATH)
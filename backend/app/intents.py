@@ -0,0 +1,151 @@
+import re
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+class IntentMatch(NamedTuple):
+    tool: str
+    args: Dict[str, Any]
+
+# Words that may surround a command without changing it
+FILLER_WORDS = frozenset({
+    "please", "can", "could", "would", "you", "i", "want", "to", "like", "lets", "let's",
+    "ok", "okay", "now", "just", "go", "ahead", "and", "yes", "yeah", "thanks", "thank"
+})
+
+# Whole-utterance commands, as token sequences
+COMMAND_PHRASES: List[Tuple[str, Dict[str, Any], str]] = [
+    ("open_form", {}, "open a form"),
+    ("open_form", {}, "open the form"),
+    ("open_form", {}, "open form"),
+    ("open_form", {}, "open a new form"),
+    ("open_form", {}, "start a form"),
+    ("open_form", {}, "start a new form"),
+    ("open_form", {}, "new form"),
+    ("submit_form", {}, "submit"),
+    ("submit_form", {}, "submit it"),
+    ("submit_form", {}, "submit the form"),
+    ("submit_form", {}, "submit my form"),
+    ("submit_form", {}, "send the form"),
+    ("submit_form", {}, "send it"),
+]
+
+_LEAD_IN = r"^(?:(?:my|the)\s+)?"
+# Field statements; each must cover the whole utterance to count as a hit
+FIELD_PATTERNS = [
+    ("email", re.compile(_LEAD_IN + r"e-?mail(?:\s+address)?\s+is\s+(?P<value>.+)$")),
+    ("phone", re.compile(_LEAD_IN + r"(?:phone|mobile|cell)(?:\s+number)?\s+is\s+(?P<value>.+)$")),
+    ("name", re.compile(_LEAD_IN + r"name\s+is\s+(?P<value>.+)$")),
+]
+
+# A field value containing one of these is a correction or denial, not a value
+NEGATION_WORDS = frozenset({"not", "no", "never", "nope", "wait", "actually", "isn't", "wasn't"})
+
+EMAIL_PATTERN = re.compile(r"^[a-z0-9._%+-]+@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}$")
+NAME_PATTERN = re.compile(r"^[a-z][a-z'-]*(?:\s+[a-z][a-z'-]*){0,3}$")
+PUNCTUATION = re.compile(r"[^\w\s@.+'-]")
+SPOKEN_EMAIL = ((" at ", "@"), (" dot ", "."), (" underscore ", "_"), (" dash ", "-"))
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return " ".join(PUNCTUATION.sub(" ", text.lower()).split()).rstrip(".")
+
+class IntentMatcher:
+    """Resolves unambiguous form commands locally so they skip the LLM round-trip.
+
+    Only utterances matched in full are resolved; anything else is deferred to the LLM.
+    A match counts as a hit once its tool call succeeds (record_hit); a match whose tool
+    call fails goes on to the LLM too (record_failure).
+    """
+
+    def __init__(self, phrases: List[Tuple[str, Dict[str, Any], str]] = COMMAND_PHRASES):
+        # Token trie: word -> child node; a node's None key holds (tool, args)
+        self.trie: Dict[Optional[str], Any] = {}
+        for tool, args, phrase in phrases:
+            node = self.trie
+            for word in phrase.split():
+                node = node.setdefault(word, {})
+            node[None] = (tool, args)
+
+        self.hits: Dict[str, int] = {}
+        self.misses = 0
+        self.failures = 0
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """Resolve an utterance to a tool call, or None to defer to the LLM"""
+        utterance = normalize(text)
+        intent = self._match_command(utterance) or self._match_field(utterance)
+        if intent is None:
+            self.misses += 1
+        return intent
+
+    def record_hit(self, intent: IntentMatch):
+        """The matched tool call succeeded, so the LLM was skipped"""
+        self.hits[intent.tool] = self.hits.get(intent.tool, 0) + 1
+
+    def record_failure(self, intent: IntentMatch):
+        """The matched tool call failed and the utterance was deferred to the LLM"""
+        self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit and miss counters"""
+        hits = sum(self.hits.values())
+        total = hits + self.misses + self.failures
+        return {
+            "hits": hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "hit_rate": round(hits / total, 3) if total else 0,
+            "hits_by_tool": dict(self.hits)
+        }
+
+    def _match_command(self, utterance: str) -> Optional[IntentMatch]:
+        words = utterance.split()
+        # Trim filler words from both ends
+        start, end = 0, len(words)
+        while start < end and words[start] in FILLER_WORDS:
+            start += 1
+        while end > start and words[end - 1] in FILLER_WORDS:
+            end -= 1
+        if start == end:
+            return None
+
+        node = self.trie
+        for word in words[start:end]:
+            node = node.get(word)
+            if node is None:
+                return None
+        if None not in node:
+            return None
+        tool, args = node[None]
+        return IntentMatch(tool, dict(args))
+
+    def _match_field(self, utterance: str) -> Optional[IntentMatch]:
+        for field_name, pattern in FIELD_PATTERNS:
+            match = pattern.match(utterance)
+            if match:
+                words = match.group("value").split()
+                # "my name is john thanks": trailing filler is not part of the value
+                while words and words[-1] in FILLER_WORDS:
+                    words.pop()
+                if not words or NEGATION_WORDS.intersection(words):
+                    return None
+                value = getattr(self, f"_parse_{field_name}")(" ".join(words))
+                if value is None:
+                    return None
+                return IntentMatch("update_form_field", {"field_name": field_name, "value": value})
+        return None
+
+    def _parse_email(self, value: str) -> Optional[str]:
+        value = f" {value} "
+        for spoken, symbol in SPOKEN_EMAIL:
+            value = value.replace(spoken, symbol)
+        value = value.replace(" ", "")
+        return value if EMAIL_PATTERN.match(value) else None
+
+    def _parse_phone(self, value: str) -> Optional[str]:
+        if re.search(r"[a-z]", value):
+            return None
+        digits = re.sub(r"[^\d+]", "", value)
+        return digits if 7 <= len(digits.lstrip("+")) <= 15 else None
+
+    def _parse_name(self, value: str) -> Optional[str]:
+        return value.title() if NAME_PATTERN.match(value) else None
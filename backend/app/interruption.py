@@ -0,0 +1,54 @@
+import time
+from typing import Callable, Dict, Any, Optional
+from .metrics import StageMetrics
+
+# Stage name for speech onset to output cut, in StageMetrics
+ONSET_TO_SILENCE_STAGE = "onset_to_silence"
+
+class InterruptionStats:
+    """Barge-in counter shared by all connections; onset-to-silence latency goes to `metrics`"""
+
+    def __init__(self, metrics: Optional[StageMetrics] = None):
+        self.interruptions = 0
+        self.metrics = metrics
+
+    def stats(self) -> Dict[str, Any]:
+        return {"interruptions": self.interruptions}
+
+class InterruptionController:
+    """Per-connection barge-in state.
+
+    The output side reports when the agent starts and stops responding. Speech onset
+    while the agent is responding starts an interruption; once output has been cut,
+    `silenced` records the latency and tells the client to truncate what it has.
+    """
+
+    def __init__(self, stats: InterruptionStats):
+        self.stats = stats
+        self.agent_responding = False
+        self.onset_at: Optional[float] = None
+        # Flushes queued output to the client and sends the truncate message
+        self.on_truncate: Optional[Callable[[], None]] = None
+
+    def speech_started(self) -> bool:
+        """Record speech onset; returns True if it interrupts the agent"""
+        if not self.agent_responding or self.onset_at is not None:
+            return False
+        self.onset_at = time.perf_counter()
+        self.stats.interruptions += 1
+        return True
+
+    def silenced(self):
+        """Output has been cut for the pending interruption"""
+        if self.onset_at is None:
+            return
+        self.agent_responding = False
+        if self.on_truncate:
+            self.on_truncate()
+        if self.stats.metrics:
+            self.stats.metrics.since(ONSET_TO_SILENCE_STAGE, self.onset_at)
+        self.onset_at = None
+
+    @property
+    def interrupting(self) -> bool:
+        return self.onset_at is not None
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from .form_tools import Form
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+class FormJournal:
+    """Append-only journal of form mutations with group commit.
+
+    Each create, update and submit appends one JSON line holding the whole form.
+    Appends only serialize into a memory buffer; a background task writes and fsyncs
+    everything buffered every `flush_interval_ms` on a dedicated writer thread.
+    Replay keeps the last record per form. Compaction rewrites the file with one
+    record per live form once it holds more than twice that many records.
+    """
+
+    def __init__(self, path: str, flush_interval_ms: float = 20, compact_min_records: int = 10000,
+                 ttl_seconds: float = 3600):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.compact_min_records = compact_min_records
+        self.ttl_seconds = ttl_seconds
+
+        self.buffer: List[bytes] = []
+        # form_id -> (latest record, wall time written), used for compaction
+        self.latest: Dict[str, Tuple[bytes, float]] = {}
+        self.records_in_file = 0
+        self.file = None
+        self.task: Optional[asyncio.Task] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="form-journal")
+
+        self.records_appended = 0
+        self.flushes = 0
+        self.compactions = 0
+        self.last_fsync_ms = 0.0
+
+    def replay(self) -> Dict[str, Tuple[Optional[str], Dict[str, Any]]]:
+        """Read the journal back; returns form_id -> (owner, latest form)"""
+        forms: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}
+        if not os.path.exists(self.path):
+            return forms
+
+        now = time.time()
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash mid-flush; everything before it is intact
+                    logger.warning(f"Skipping corrupt journal record in {self.path}")
+                    continue
+                self.records_in_file += 1
+                if now - record["t"] > self.ttl_seconds:
+                    continue
+                form = record["f"]
+                forms[form["id"]] = (record["o"], form)
+                self.latest[form["id"]] = (line if line.endswith(b"\n") else line + b"\n", record["t"])
+
+        logger.info(f"Replayed {len(forms)} forms from {self.records_in_file} journal records")
+        return forms
+
+    def start(self):
+        """Open the journal for appending and start the group-commit task"""
+        if self.task is None:
+            self.file = open(self.path, "ab")
+            self._seal_torn_tail()
+            self.task = asyncio.create_task(self._run())
+
+    def on_form_event(self, event: str, owner: Optional[str], form: Form):
+        """FormStore listener: buffer a record for the next group commit"""
+        now = time.time()
+        # The encoded snapshot is reused by the tool reply for this same version
+        line = dumps({"e": event, "o": owner, "t": now, "f": form.snapshot()}).encode() + b"\n"
+        self.buffer.append(line)
+        self.latest[form.id] = (line, now)
+        self.records_appended += 1
+
+    async def close(self):
+        """Commit anything buffered and close the file"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+            await self._commit()
+            self.file.close()
+        self.executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get journal counters"""
+        return {
+            "buffered": len(self.buffer),
+            "records_appended": self.records_appended,
+            "records_in_file": self.records_in_file,
+            "flushes": self.flushes,
+            "avg_batch_size": round(self.records_appended / self.flushes, 2) if self.flushes else 0,
+            "last_fsync_ms": round(self.last_fsync_ms, 3),
+            "compactions": self.compactions
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._commit()
+            if self.records_in_file > max(self.compact_min_records, 2 * len(self.latest)):
+                await self._compact()
+
+    async def _commit(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._write, batch)
+            self.records_in_file += len(batch)
+            self.flushes += 1
+        except OSError as e:
+            logger.error(f"Form journal write failed: {e}")
+
+    def _write(self, batch: List[bytes]):
+        start = time.perf_counter()
+        self.file.write(b"".join(batch))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_fsync_ms = (time.perf_counter() - start) * 1000
+
+    def _seal_torn_tail(self):
+        """End a partial last line left by a crash mid-flush, so the next record starts on its own line"""
+        if self.file.tell() == 0:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+        if torn:
+            self.file.write(b"\n")
+            self.file.flush()
+
+    async def _compact(self):
+        cutoff = time.time() - self.ttl_seconds
+        for form_id in [form_id for form_id, (_, written) in self.latest.items() if written < cutoff]:
+            del self.latest[form_id]
+        # Records appended after this snapshot are committed after it, so the newest still wins
+        snapshot = [line for line, _ in self.latest.values()]
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self._rewrite, snapshot)
+            self.records_in_file = len(snapshot)
+            self.compactions += 1
+        except OSError as e:
+            logger.error(f"Form journal compaction failed: {e}")
+
+    def _rewrite(self, snapshot: List[bytes]):
+        tmp_path = f"{self.path}.compact"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(snapshot))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Make the rename itself durable
+        dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        old_file, self.file = self.file, open(self.path, "ab")
+        old_file.close()
+
+def create_journal(config) -> Optional[FormJournal]:
+    """Open this process's form journal, or None when JOURNAL_PATH is unset"""
+    if not config.JOURNAL_PATH:
+        return None
+    path = config.JOURNAL_PATH
+    if config.WORKER_INDEX is not None:
+        # One journal per worker; a respawned worker replays its predecessor's file
+        path = f"{path}.w{config.WORKER_INDEX}"
+    return FormJournal(path, config.JOURNAL_FLUSH_MS, config.JOURNAL_COMPACT_MIN_RECORDS, config.FORM_TTL_SECONDS)
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Deque, Dict, Any, Optional
+from .metrics import Histogram, StageMetrics
+
+logger = logging.getLogger(__name__)
+
+# Stage name the lag histogram is published under on /metrics
+LOOP_LAG_STAGE = "loop_lag"
+
+STACK_DEPTH = 12
+
+class LoopMonitor:
+    """Measures event loop lag and captures whatever blocks the loop for too long.
+
+    A task on the loop wakes every `interval_ms` and records how late it woke. A
+    watchdog thread checks that heartbeat; when the loop has not come back within
+    `slow_callback_ms` it snapshots the loop thread's stack and running task, so the
+    blocking code is caught in the act. The loop itself only pays for the periodic
+    wakeup; stacks are captured only for stalls.
+    """
+
+    def __init__(self, metrics: Optional[StageMetrics] = None, interval_ms: float = 20,
+                 slow_callback_ms: float = 100, max_reports: int = 50):
+        self.metrics = metrics
+        self.interval = interval_ms / 1000
+        self.slow_callback = slow_callback_ms / 1000
+        self.lag_ms = Histogram()
+        self.max_lag_ms = 0.0
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.heartbeat = time.perf_counter()
+        self.task: Optional[asyncio.Task] = None
+        self.watchdog: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+        self.reports: Deque[Dict[str, Any]] = deque(maxlen=max_reports)
+        self.offenders: Counter = Counter()
+        self.slow_callbacks = 0
+        self.stall_report: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        """Start the lag sampler on the running loop and the watchdog thread"""
+        if self.task is not None:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.perf_counter()
+        self.stopped.clear()
+        self.task = asyncio.create_task(self._sample())
+        self.watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self.watchdog.start()
+
+    async def close(self):
+        self.stopped.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.watchdog:
+            await asyncio.to_thread(self.watchdog.join)
+            self.watchdog = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Lag percentiles plus the slowest callbacks seen"""
+        return {
+            "lag_ms": self.lag_ms.summary(),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "slow_callbacks": self.slow_callbacks,
+            "top_offenders": [{"where": where, "count": n} for where, n in self.offenders.most_common(5)],
+            "recent": list(self.reports)[-5:]
+        }
+
+    async def _sample(self):
+        while True:
+            started_at = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.heartbeat = now
+            lag_ms = max(0.0, (now - started_at - self.interval) * 1000)
+            self.lag_ms.observe(lag_ms)
+            if self.metrics:
+                self.metrics.observe(LOOP_LAG_STAGE, lag_ms)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+            report, self.stall_report = self.stall_report, None
+            if report:
+                # The stall is over; record how long it actually lasted
+                report["blocked_ms"] = round(lag_ms, 1)
+                logger.warning(f"Event loop blocked for {lag_ms:.0f} ms in {report['where']}")
+
+    def _watch(self):
+        reported_heartbeat = None
+        while not self.stopped.wait(self.slow_callback / 2):
+            heartbeat = self.heartbeat
+            stalled = time.perf_counter() - heartbeat - self.interval
+            if stalled < self.slow_callback or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            report = self._capture(stalled)
+            if report:
+                self.slow_callbacks += 1
+                self.offenders[report["where"]] += 1
+                self.reports.append(report)
+                self.stall_report = report
+
+    def _capture(self, stalled: float) -> Optional[Dict[str, Any]]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame, limit=STACK_DEPTH)
+        # Read from the watchdog thread: the task the loop is running right now, if any
+        task = asyncio.current_task(self.loop)
+        coroutine = task.get_coro() if task else None
+        innermost = stack[-1] if stack else None
+        where = getattr(coroutine, "__qualname__", None) or (
+            f"{innermost.name} ({innermost.filename}:{innermost.lineno})" if innermost else "unknown")
+        return {
+            "at": time.time(),
+            "blocked_ms": round(stalled * 1000, 1),
+            "where": where,
+            "task": task.get_name() if task else None,
+            "stack": [f"{entry.filename}:{entry.lineno} in {entry.name}" for entry in stack]
+        }
+
+def create_loop_monitor(config, metrics: Optional[StageMetrics] = None) -> Optional[LoopMonitor]:
+    """Loop monitor configured from LOOP_MONITOR_* settings, or None when disabled"""
+    if not config.LOOP_MONITOR:
+        return None
+    return LoopMonitor(metrics, config.LOOP_MONITOR_INTERVAL_MS, config.SLOW_CALLBACK_MS)
@@ -0,0 +1,224 @@
+"""Offline, reproducible benchmark of the VoiceAgent pipeline.
+
+    python -m app.loopback --calls 20 --turns 5
+
+Drives `VoiceAgent.handle_connection` in-process: a loopback transport feeds audio and
+transcription frames in and captures output frames, and the deterministic StubLLM
+replaces Gemini. Turn latency minus the stub's configured time-to-first-token is the
+pipeline's own overhead.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Any, List, Optional
+from pipecat.frames.frames import (
+    AudioRawFrame,
+    Frame,
+    InterimTranscriptionFrame,
+    LLMFullResponseEndFrame,
+    StartFrame,
+    TextFrame,
+    TranscriptionFrame
+)
+from pipecat.pipeline.task import PipelineTask
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from .intents import IntentMatcher
+from .metrics import Histogram
+from .voice_agent import VoiceAgent
+
+DEFAULT_TURNS = [
+    "Open a form please.",
+    "My name is Ada Lovelace.",
+    "My email is ada@example.com.",
+    "What do you need from me next?",
+    "Submit the form."
+]
+
+class LoopbackInput(FrameProcessor):
+    """First processor in the pipeline; the harness injects caller frames through it"""
+
+    async def feed(self, frame: Frame):
+        await self.push_frame(frame, FrameDirection.DOWNSTREAM)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+        await self.push_frame(frame, direction)
+
+class LoopbackOutput(FrameProcessor):
+    """Last processor in the pipeline; timestamps the agent's output instead of sending it"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = asyncio.Event()
+        self.turn_done = asyncio.Event()
+        self.first_output_at: Optional[float] = None
+        self.local_turn = False
+
+    def expect_turn(self, local: bool = False):
+        """Start timing a turn; `local` turns are answered by the intent fast path"""
+        self.turn_done.clear()
+        self.first_output_at = None
+        self.local_turn = local
+
+    def mark_output(self):
+        if self.first_output_at is None:
+            self.first_output_at = time.perf_counter()
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartFrame):
+            self.started.set()
+        elif isinstance(frame, TextFrame) and not isinstance(frame, TranscriptionFrame):
+            self.mark_output()
+        elif isinstance(frame, LLMFullResponseEndFrame):
+            self.turn_done.set()
+
+        # The task only finishes once the EndFrame reaches its sink
+        await self.push_frame(frame, direction)
+
+class LoopbackTransport:
+    """Transport stand-in exposing the same processor accessors as WebsocketServerTransport"""
+
+    def __init__(self):
+        self.input = LoopbackInput()
+        self.output = LoopbackOutput()
+
+    def input_processor(self) -> LoopbackInput:
+        return self.input
+
+    def output_processor(self) -> LoopbackOutput:
+        return self.output
+
+class LoopbackWebSocket:
+    """Collects what the agent sends on the connection's outbound queue"""
+
+    def __init__(self):
+        self.transport = LoopbackTransport()
+        self.messages: List[Dict[str, Any]] = []
+        self.closed = False
+
+    async def send(self, message: str):
+        self.messages.append(json.loads(message))
+        output = self.transport.output
+        output.mark_output()
+        # Turns answered by the intent fast path produce a form update instead of LLM text;
+        # LLM turns also push form updates from their tool calls, but end with the response
+        if output.local_turn:
+            output.turn_done.set()
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = True
+
+class LoopbackVoiceAgent(VoiceAgent):
+    """VoiceAgent whose connections use the loopback transport"""
+
+    def create_transport(self, websocket: LoopbackWebSocket) -> LoopbackTransport:
+        return websocket.transport
+
+class LoopbackBenchmark:
+    """Runs concurrent scripted calls and collects per-turn latency"""
+
+    def __init__(self, agent: VoiceAgent, turns: List[str], word_ms: float = 150,
+                 audio_frames_per_turn: int = 10, turn_timeout: float = 10.0):
+        self.agent = agent
+        self.turns = turns
+        self.word_delay = word_ms / 1000
+        self.audio_frames_per_turn = audio_frames_per_turn
+        self.turn_timeout = turn_timeout
+
+        # Predicts which turns the agent's intent fast path answers
+        self.matcher = IntentMatcher() if agent.config.INTENT_FAST_PATH else None
+
+        self.turn_ms = Histogram()
+        self.overhead_ms = Histogram()
+        self.timeouts = 0
+
+    async def run_call(self):
+        websocket = LoopbackWebSocket()
+        transport = websocket.transport
+        connection = asyncio.create_task(self.agent.handle_connection(websocket))
+        await asyncio.wait_for(transport.output.started.wait(), self.turn_timeout)
+
+        config = self.agent.config
+        frame_samples = config.AUDIO_SAMPLE_RATE // 50
+        silence = bytes(frame_samples * 2)
+        for text in self.turns:
+            # 20 ms audio frames keep the VAD and barge-in path in the loop
+            for _ in range(self.audio_frames_per_turn):
+                await transport.input.feed(AudioRawFrame(silence, config.AUDIO_SAMPLE_RATE, 1))
+
+            words = text.split()
+            for n in range(1, len(words)):
+                await transport.input.feed(InterimTranscriptionFrame(" ".join(words[:n]), "caller", ""))
+                await asyncio.sleep(self.word_delay)
+
+            transport.output.expect_turn(local=self.matcher is not None and self.matcher.match(text) is not None)
+            sent_at = time.perf_counter()
+            await transport.input.feed(TranscriptionFrame(text, "caller", ""))
+            try:
+                await asyncio.wait_for(transport.output.turn_done.wait(), self.turn_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                continue
+
+            turn_ms = (transport.output.first_output_at - sent_at) * 1000
+            self.turn_ms.observe(turn_ms)
+            self.overhead_ms.observe(max(0.0, turn_ms - config.STUB_LLM_FIRST_TOKEN_MS))
+
+        # An EndFrame only stops the pipeline when queued on its task
+        await self.connection_task(transport).stop_when_done()
+        await connection
+
+    def connection_task(self, transport: LoopbackTransport) -> PipelineTask:
+        """The PipelineTask running the connection that uses `transport`"""
+        for connection in self.agent.active_connections.values():
+            if connection["transport"] is transport:
+                return connection["task"]
+        raise RuntimeError("Loopback call is not connected")
+
+    async def run(self, calls: int) -> Dict[str, Any]:
+        await asyncio.gather(*(self.run_call() for _ in range(calls)))
+        stats = self.agent.get_stats()
+        return {
+            "calls": calls,
+            "turns_per_call": len(self.turns),
+            "timeouts": self.timeouts,
+            "turn_ms": self.turn_ms.summary(),
+            "pipeline_overhead_ms": self.overhead_ms.summary(),
+            "stages_ms": stats["latency_ms"],
+            "intents": stats["intents"]
+        }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the VoiceAgent pipeline offline")
+    parser.add_argument("--calls", type=int, default=10, help="concurrent calls")
+    parser.add_argument("--turns", type=int, default=len(DEFAULT_TURNS), help="turns per call")
+    parser.add_argument("--first-token-ms", type=float, default=None)
+    parser.add_argument("--token-ms", type=float, default=None)
+    parser.add_argument("--word-ms", type=float, default=150, help="delay between interim transcripts")
+    parser.add_argument("--output", default=None, help="result file (JSON)")
+    args = parser.parse_args()
+
+    agent = LoopbackVoiceAgent()
+    agent.config.LLM_BACKEND = "stub"
+    if args.first_token_ms is not None:
+        agent.config.STUB_LLM_FIRST_TOKEN_MS = args.first_token_ms
+    if args.token_ms is not None:
+        agent.config.STUB_LLM_TOKEN_MS = args.token_ms
+
+    turns = [DEFAULT_TURNS[i % len(DEFAULT_TURNS)] for i in range(args.turns)]
+    await agent.start()
+    try:
+        results = await LoopbackBenchmark(agent, turns, args.word_ms).run(args.calls)
+    finally:
+        await agent.shutdown()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,8 +2,9 @@ import asyncio
 import logging
 from fastapi import FastAPI, WebSocket, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 import uvicorn
+from .serialization import dumps
 from .simple_voice_agent import SimpleVoiceAgent
 from .config import Config
 
@@ -25,6 +26,16 @@ app.add_middleware(
 # Initialize voice agent
 voice_agent = SimpleVoiceAgent()
 
+@app.on_event("startup")
+async def startup():
+    """Restore persisted state and start background services"""
+    await voice_agent.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release shared agent resources"""
+    await voice_agent.shutdown()
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for voice communication"""
@@ -35,18 +46,41 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "voice-agent"}
 
+@app.get("/stats")
+async def get_stats():
+    """Service counters for sessions and form storage"""
+    return voice_agent.get_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Per-stage latency histograms and audio frame counters in Prometheus text format"""
+    return PlainTextResponse(voice_agent.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/form/status")
-async def get_form_status():
-    """Get current form status"""
-    form = voice_agent.get_form_status()
+async def get_form_status(session_id: str):
+    """Get current form status for a session"""
+    session = voice_agent.get_session(session_id)
+    if session:
+        form = session.form_manager.get_current_form()
+    elif voice_agent.shared_state:
+        # The session may be served by another worker process
+        form = await voice_agent.shared_state.lookup(session_id)
+        if form is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+    else:
+        raise HTTPException(status_code=404, detail="Session not found")
     if form:
-        return {"status": "success", "form": form}
+        # Reuses the form's cached encoding instead of re-serializing it
+        return Response(dumps({"status": "success", "form": form}), media_type="application/json")
     return {"status": "no_active_form"}
 
 @app.post("/form/reset")
-async def reset_form():
-    """Reset the current form"""
-    voice_agent.form_manager.current_form = None
+async def reset_form(session_id: str):
+    """Reset the current form for a session"""
+    session = voice_agent.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    session.form_manager.current_form = None
     return {"status": "success", "message": "Form reset"}
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+import bisect
+import time
+from typing import Dict, Any, List, Optional
+
+# Log-spaced bucket upper bounds in milliseconds: 0.01 ms to ~42 s, four buckets per doubling
+DEFAULT_BUCKETS_MS = tuple(0.01 * 2 ** (i / 4) for i in range(89))
+
+class Histogram:
+    """Fixed-bucket latency histogram; observing is a bisect and two additions"""
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.bounds = list(buckets_ms)
+        # One extra bucket catches everything above the last bound
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if n and cumulative + n >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.bounds[-1]
+
+    def copy(self) -> "Histogram":
+        histogram = Histogram.__new__(Histogram)
+        histogram.bounds = self.bounds
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.sum_ms = self.sum_ms
+        return histogram
+
+    def delta(self, earlier: Optional["Histogram"]) -> "Histogram":
+        """Observations made since `earlier`, a copy() of this histogram"""
+        if earlier is None:
+            return self.copy()
+        histogram = Histogram.__new__(Histogram)
+        histogram.bounds = self.bounds
+        histogram.counts = [now - then for now, then in zip(self.counts, earlier.counts)]
+        histogram.count = self.count - earlier.count
+        histogram.sum_ms = self.sum_ms - earlier.sum_ms
+        return histogram
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "p50": _round(self.quantile(0.5)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+            "mean": _round(self.sum_ms / self.count) if self.count else None
+        }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+class StageMetrics:
+    """Latency histograms per pipeline stage, exported in Prometheus text format"""
+
+    NAME = "voice_agent_stage_latency_seconds"
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None):
+        self.stages: Dict[str, Histogram] = {}
+        self.labels = labels or {}
+
+    def observe(self, stage: str, value_ms: float):
+        """Record one stage latency in milliseconds"""
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.observe(value_ms)
+
+    def since(self, stage: str, started_at: float):
+        """Record the time elapsed since `started_at` (time.perf_counter)"""
+        self.observe(stage, (time.perf_counter() - started_at) * 1000)
+
+    def summary(self) -> Dict[str, Any]:
+        """p50/p95/p99 per stage, in milliseconds"""
+        return {stage: histogram.summary() for stage, histogram in sorted(self.stages.items())}
+
+    def render(self) -> str:
+        """Prometheus text exposition of every stage histogram"""
+        lines: List[str] = [
+            f"# HELP {self.NAME} Time spent in each voice pipeline stage.",
+            f"# TYPE {self.NAME} histogram"
+        ]
+        extra = "".join(f',{key}="{value}"' for key, value in self.labels.items())
+        for stage, histogram in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, n in zip(histogram.bounds, histogram.counts):
+                cumulative += n
+                lines.append(f'{self.NAME}_bucket{{stage="{stage}"{extra},le="{bound / 1000:.9g}"}} {cumulative}')
+            lines.append(f'{self.NAME}_bucket{{stage="{stage}"{extra},le="+Inf"}} {histogram.count}')
+            lines.append(f'{self.NAME}_sum{{stage="{stage}"{extra}}} {histogram.sum_ms / 1000:.9g}')
+            lines.append(f'{self.NAME}_count{{stage="{stage}"{extra}}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def render_counters(self, name: str, help_text: str, label: str, values: Dict[str, Any]) -> str:
+        """Prometheus text exposition of a counter family, one sample per `label` value"""
+        lines: List[str] = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        extra = "".join(f',{key}="{value}"' for key, value in self.labels.items())
+        for key, value in values.items():
+            lines.append(f'{name}{{{label}="{key}"{extra}}} {value}')
+        return "\n".join(lines) + "\n"
+
+def create_stage_metrics(config) -> StageMetrics:
+    """Stage metrics for this process, labelled with the worker index when running under app.serve"""
+    return StageMetrics({"worker": config.WORKER_INDEX} if config.WORKER_INDEX is not None else None)
+
+class TurnTracer:
+    """Per-connection timestamps (time.perf_counter) for frames and turns crossing pipeline stages.
+
+    Probes between processors call these hooks; each completed stage is observed on `metrics`.
+    """
+
+    def __init__(self, metrics: StageMetrics):
+        self.metrics = metrics
+        self.reset()
+
+    def reset(self):
+        self.frame_in: Optional[tuple] = None
+        self.text_out: Dict[int, float] = {}
+        self.turn_started_at: Optional[float] = None
+        self.transcript_at: Optional[float] = None
+        self.llm_started_at: Optional[float] = None
+        self.first_token_seen = False
+
+    def stage_entered(self, frame: Any):
+        """An audio frame is about to enter a per-frame stage (the VAD)"""
+        self.frame_in = (id(frame), time.perf_counter())
+
+    def stage_left(self, stage: str, frame: Any):
+        """The same frame came out the other side"""
+        if self.frame_in and self.frame_in[0] == id(frame):
+            self.metrics.since(stage, self.frame_in[1])
+            self.frame_in = None
+
+    def speech_stopped(self):
+        """The caller finished speaking: the turn clock starts"""
+        self.turn_started_at = time.perf_counter()
+
+    def transcript(self):
+        """A transcription fragment is waiting to be aggregated"""
+        if self.transcript_at is None:
+            self.transcript_at = time.perf_counter()
+
+    def llm_request(self):
+        """Aggregated text was handed to the LLM"""
+        now = time.perf_counter()
+        if self.transcript_at is not None:
+            self.metrics.observe("sentence_aggregation", (now - self.transcript_at) * 1000)
+            self.transcript_at = None
+        self.llm_started_at = now
+        self.first_token_seen = False
+        # Text of an earlier response that never reached the output was dropped
+        self.text_out.clear()
+
+    def llm_text(self, frame: Any):
+        """The LLM produced a text frame"""
+        now = time.perf_counter()
+        if self.llm_started_at is not None and not self.first_token_seen:
+            self.metrics.observe("llm_first_token", (now - self.llm_started_at) * 1000)
+            self.first_token_seen = True
+        self.text_out[id(frame)] = now
+
+    def llm_done(self):
+        """The LLM finished its response"""
+        if self.llm_started_at is not None:
+            self.metrics.since("llm_complete", self.llm_started_at)
+            self.llm_started_at = None
+
+    def output(self, frame: Any):
+        """A text frame reached the output transport"""
+        now = time.perf_counter()
+        emitted_at = self.text_out.pop(id(frame), None)
+        if emitted_at is not None:
+            self.metrics.observe("output_send", (now - emitted_at) * 1000)
+        if self.turn_started_at is not None:
+            self.metrics.observe("turn", (now - self.turn_started_at) * 1000)
+            self.turn_started_at = None
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Message = Union[str, bytes]
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+# Close code sent to consumers disconnected for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+class OutboundQueue:
+    """Bounded per-connection send queue drained by its own writer task.
+
+    When the queue is full the slow-consumer policy applies:
+      drop_oldest - discard the oldest queued message
+      coalesce    - replace a queued message with the same key (latest snapshot wins),
+                    falling back to drop_oldest for messages without a key
+      disconnect  - close the connection
+    """
+
+    def __init__(self, send: Callable[[Message], Awaitable[Any]], max_size: int = 64,
+                 policy: str = COALESCE, close: Optional[Callable[[], Awaitable[Any]]] = None):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.send = send
+        self.close_connection = close
+        self.max_size = max_size
+        self.policy = policy
+
+        # Entries are [key, message] so a coalesced message keeps its queue position
+        self.queue: deque = deque()
+        self.keyed: Dict[str, List] = {}
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        # Closes the connection after a disconnect; close() waits for it
+        self.close_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def start(self):
+        """Start the writer task"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._drain())
+
+    def enqueue(self, message: Message, key: Optional[str] = None) -> bool:
+        """Queue a message without waiting; returns False if it was not accepted"""
+        if self.closed:
+            return False
+
+        if key is not None and self.policy == COALESCE and key in self.keyed:
+            self.keyed[key][1] = message
+            self.coalesced += 1
+            return True
+
+        if len(self.queue) >= self.max_size:
+            if self.policy == DISCONNECT:
+                logger.warning("Disconnecting slow consumer")
+                self.closed = True
+                self.dropped += len(self.queue) + 1
+                self.queue.clear()
+                self.keyed.clear()
+                if self.close_connection:
+                    self.close_task = asyncio.create_task(self.close_connection())
+                self.ready.set()
+                return False
+            self._drop_oldest()
+
+        entry = [key, message]
+        self.queue.append(entry)
+        if key is not None:
+            self.keyed[key] = entry
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self.ready.set()
+        return True
+
+    async def close(self):
+        """Stop the writer, discarding anything still queued, and finish any pending disconnect"""
+        self.closed = True
+        self.ready.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.close_task:
+            try:
+                await self.close_task
+            except Exception as e:
+                logger.info(f"Closing slow consumer failed: {e}")
+            self.close_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue counters"""
+        return {
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced
+        }
+
+    def _drop_oldest(self):
+        key, _ = self.queue.popleft()
+        if key is not None:
+            self.keyed.pop(key, None)
+        self.dropped += 1
+
+    async def _drain(self):
+        while not self.closed:
+            if not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+
+            key, message = self.queue.popleft()
+            if key is not None:
+                self.keyed.pop(key, None)
+            try:
+                await self.send(message)
+                self.sent += 1
+            except Exception as e:
+                logger.info(f"Outbound send failed, stopping writer: {e}")
+                self.closed = True
+
+def aggregate_queue_stats(queues) -> Dict[str, Any]:
+    """Combine counters from many outbound queues"""
+    totals = {"connections": 0, "depth": 0, "deepest": 0, "sent": 0, "dropped": 0, "coalesced": 0}
+    for queue in queues:
+        stats = queue.stats()
+        totals["connections"] += 1
+        totals["depth"] += stats["depth"]
+        totals["deepest"] = max(totals["deepest"], stats["depth"])
+        totals["sent"] += stats["sent"]
+        totals["dropped"] += stats["dropped"]
+        totals["coalesced"] += stats["coalesced"]
+    return totals
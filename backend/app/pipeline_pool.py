@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Any, Generic, Optional, TypeVar
+from .metrics import StageMetrics
+
+logger = logging.getLogger(__name__)
+
+# Stage name for connection start to first output frame, in StageMetrics
+TIME_TO_FIRST_FRAME_STAGE = "time_to_first_frame"
+
+T = TypeVar("T")
+
+class PipelinePool(Generic[T]):
+    """Pre-built, single-use per-connection pipeline components.
+
+    `acquire` hands out a ready item (a hit) or builds one on the spot (a miss) and
+    tops the pool back up to `min_size` in the background. Items are never returned:
+    processors are torn down with their pipeline and the LLM keeps the caller's
+    context, so no state carries over from one caller to the next. The pool never
+    holds or builds more than `max_size` items at once.
+    """
+
+    def __init__(self, factory: Callable[[], Awaitable[T]], min_size: int = 4, max_size: int = 16,
+                 metrics: Optional[StageMetrics] = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.ready: Deque[T] = deque()
+        self.building = 0
+        self.refill_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.metrics = metrics
+
+    async def start(self):
+        """Fill the pool to its minimum size"""
+        await self._refill()
+
+    async def acquire(self) -> T:
+        """Take a pre-built item, or build one if none is ready"""
+        if self.ready:
+            self.hits += 1
+            item = self.ready.popleft()
+        else:
+            self.misses += 1
+            item = await self.factory()
+        self._schedule_refill()
+        return item
+
+    def record_first_frame(self, started_at: float):
+        """Record time from connection start (time.perf_counter) to the first output frame"""
+        if self.metrics:
+            self.metrics.since(TIME_TO_FIRST_FRAME_STAGE, started_at)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool counters"""
+        return {
+            "ready": len(self.ready),
+            "building": self.building,
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_size": self.max_size
+        }
+
+    async def close(self):
+        """Stop refilling and drop ready items"""
+        if self.refill_task:
+            self.refill_task.cancel()
+            self.refill_task = None
+        self.ready.clear()
+
+    def _schedule_refill(self):
+        if self.refill_task is None or self.refill_task.done():
+            self.refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self):
+        while len(self.ready) + self.building < self.min_size:
+            self.building += 1
+            try:
+                self.ready.append(await self.factory())
+            except Exception as e:
+                logger.error(f"Pipeline warm-up error: {e}")
+                return
+            finally:
+                self.building -= 1
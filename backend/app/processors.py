@@ -0,0 +1,311 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+import numpy as np
+from pipecat.frames.frames import (
+    Frame,
+    AudioRawFrame,
+    InterimTranscriptionFrame,
+    LLMFullResponseEndFrame,
+    LLMFullResponseStartFrame,
+    StartInterruptionFrame,
+    TextFrame,
+    TranscriptionFrame,
+    UserStartedSpeakingFrame,
+    UserStoppedSpeakingFrame
+)
+from pipecat.processors.frame_processor import FrameDirection, FrameProcessor
+from .audio import AUDIO_SAMPLE_DTYPE, AudioRingBuffer
+from .intents import IntentMatch, IntentMatcher
+from .interruption import InterruptionController
+from .metrics import TurnTracer
+from .speculation import SpeculationStats, Speculator
+from .stub_llm import StubLLM
+from .vad import GatedVAD
+
+class GatedVADProcessor(FrameProcessor):
+    """Runs the gated energy/ZCR VAD on inbound audio and emits speaking frames on transitions"""
+
+    def __init__(self, vad: GatedVAD, ring: AudioRingBuffer):
+        super().__init__()
+        self.vad = vad
+        # Transport frames rarely line up with VAD windows, so audio is staged in a ring
+        self.ring = ring
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, AudioRawFrame) and direction == FrameDirection.DOWNSTREAM:
+            self.ring.write(np.frombuffer(frame.audio, dtype=AUDIO_SAMPLE_DTYPE))
+            was_speaking = self.vad.speaking
+            n = min(self.ring.available(), self.ring.capacity) // self.vad.window_size * self.vad.window_size
+            if n:
+                await self.vad.process(self.ring.read_window(n))
+            if self.vad.speaking != was_speaking:
+                speaking_frame = UserStartedSpeakingFrame() if self.vad.speaking else UserStoppedSpeakingFrame()
+                await self.push_frame(speaking_frame, direction)
+
+        await self.push_frame(frame, direction)
+
+class FirstFrameProbe(FrameProcessor):
+    """Reports once when the first generated frame heads to the client.
+
+    Sits after the LLM; inbound audio and transcriptions passing through are ignored.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.on_first_frame: Optional[Callable[[], None]] = None
+
+    def arm(self, on_first_frame: Callable[[], None]):
+        """Call `on_first_frame` when the next output frame passes"""
+        self.on_first_frame = on_first_frame
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if (self.on_first_frame and direction == FrameDirection.DOWNSTREAM
+                and isinstance(frame, TextFrame) and not isinstance(frame, TranscriptionFrame)):
+            self.on_first_frame()
+            self.on_first_frame = None
+
+        await self.push_frame(frame, direction)
+
+class IntentProcessor(FrameProcessor):
+    """Handles form commands in transcriptions locally; other frames continue to the LLM"""
+
+    def __init__(self, matcher: IntentMatcher):
+        super().__init__()
+        self.matcher = matcher
+        self.handler: Optional[Callable[[IntentMatch], Awaitable[bool]]] = None
+
+    def set_handler(self, handler: Optional[Callable[[IntentMatch], Awaitable[bool]]]):
+        """Bind the handler that runs matched tool calls for the current session.
+
+        The handler returns False when the tool call failed.
+        """
+        self.handler = handler
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if self.handler and direction == FrameDirection.DOWNSTREAM and isinstance(frame, TranscriptionFrame):
+            intent = self.matcher.match(frame.text)
+            if intent and await self.handler(intent):
+                # Answered locally, so the LLM never sees this utterance
+                return
+            # Unmatched, or the tool call failed: the LLM answers instead
+
+        await self.push_frame(frame, direction)
+
+class SpeculationGate(FrameProcessor):
+    """Sits after the LLM and holds output for a speculative request until it is committed or dropped"""
+
+    def __init__(self):
+        super().__init__()
+        self.holding = False
+        self.held = []
+
+    def hold(self):
+        """Start holding LLM output"""
+        self.holding = True
+        self.held = []
+
+    async def release(self):
+        """Send held output on and pass later output straight through"""
+        self.holding = False
+        held, self.held = self.held, []
+        for frame in held:
+            await self.push_frame(frame, FrameDirection.DOWNSTREAM)
+
+    def drop(self):
+        """Discard held output"""
+        self.holding = False
+        self.held = []
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if (self.holding and direction == FrameDirection.DOWNSTREAM
+                and isinstance(frame, (TextFrame, LLMFullResponseStartFrame, LLMFullResponseEndFrame))
+                and not isinstance(frame, TranscriptionFrame)):
+            self.held.append(frame)
+            return
+
+        await self.push_frame(frame, direction)
+
+class SpeculativeTranscriptProcessor(FrameProcessor):
+    """Replaces the sentence aggregator: sends stable partial transcripts to the LLM early.
+
+    Output for a speculative request waits in the gate until the final transcript confirms it.
+    """
+
+    def __init__(self, gate: SpeculationGate, stability_ms: float, min_words: int, stats: SpeculationStats):
+        super().__init__()
+        self.gate = gate
+        self.speculator = Speculator(self._start, self._cancel, self._commit, stability_ms, min_words, stats)
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if direction == FrameDirection.DOWNSTREAM:
+            if isinstance(frame, InterimTranscriptionFrame):
+                await self.speculator.partial(frame.text)
+                return
+            if isinstance(frame, TranscriptionFrame):
+                await self.speculator.final(frame.text)
+                return
+            if isinstance(frame, UserStartedSpeakingFrame):
+                # A new turn: anything still speculative never got its final transcript
+                await self.speculator.abandon()
+
+        await self.push_frame(frame, direction)
+
+    async def _start(self, text: str, speculative: bool):
+        if speculative:
+            self.gate.hold()
+        await self.push_frame(TextFrame(text), FrameDirection.DOWNSTREAM)
+
+    async def _cancel(self):
+        self.gate.drop()
+        # Stop the LLM generating for the abandoned request
+        await self.push_frame(StartInterruptionFrame(), FrameDirection.DOWNSTREAM)
+
+    async def _commit(self):
+        await self.gate.release()
+
+class BargeInProcessor(FrameProcessor):
+    """Sits after the VAD and interrupts the agent when the caller talks over it"""
+
+    def __init__(self, controller: InterruptionController):
+        super().__init__()
+        self.controller = controller
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if (direction == FrameDirection.DOWNSTREAM and isinstance(frame, UserStartedSpeakingFrame)
+                and self.controller.speech_started()):
+            # Every processor downstream drops queued work for the interrupted response,
+            # the LLM cancels generation and the output transport flushes its queue
+            await self.push_frame(StartInterruptionFrame(), direction)
+
+        await self.push_frame(frame, direction)
+
+class OutputGuard(FrameProcessor):
+    """Last processor before the output transport: tracks agent output and cuts it on barge-in"""
+
+    def __init__(self, controller: InterruptionController):
+        super().__init__()
+        self.controller = controller
+        self.dropping = False
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if direction == FrameDirection.DOWNSTREAM:
+            if isinstance(frame, StartInterruptionFrame):
+                if self.controller.interrupting:
+                    self.dropping = True
+                    self.controller.silenced()
+            elif isinstance(frame, LLMFullResponseStartFrame):
+                self.dropping = False
+                self.controller.agent_responding = True
+            elif isinstance(frame, LLMFullResponseEndFrame):
+                self.controller.agent_responding = False
+            elif self.dropping and isinstance(frame, TextFrame) and not isinstance(frame, TranscriptionFrame):
+                # Output of the interrupted response still in flight
+                return
+
+        await self.push_frame(frame, direction)
+
+class StageProbe(FrameProcessor):
+    """Passes frames through unchanged, timestamping them for the connection's turn tracer.
+
+    `point` names where the probe sits: before or after the VAD, before or after the LLM,
+    or just before the output transport.
+    """
+
+    PRE_VAD = "pre_vad"
+    POST_VAD = "post_vad"
+    PRE_LLM = "pre_llm"
+    POST_LLM = "post_llm"
+    PRE_OUTPUT = "pre_output"
+
+    def __init__(self, tracer: TurnTracer, point: str):
+        super().__init__()
+        self.tracer = tracer
+        self.point = point
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if direction == FrameDirection.DOWNSTREAM:
+            self._trace(frame)
+
+        await self.push_frame(frame, direction)
+
+    def _trace(self, frame: Frame):
+        is_output_text = isinstance(frame, TextFrame) and not isinstance(frame, TranscriptionFrame)
+        if self.point == self.PRE_VAD:
+            if isinstance(frame, AudioRawFrame):
+                self.tracer.stage_entered(frame)
+        elif self.point == self.POST_VAD:
+            if isinstance(frame, AudioRawFrame):
+                self.tracer.stage_left("vad", frame)
+            elif isinstance(frame, UserStoppedSpeakingFrame):
+                self.tracer.speech_stopped()
+            elif isinstance(frame, TranscriptionFrame):
+                self.tracer.transcript()
+        elif self.point == self.PRE_LLM:
+            if is_output_text:
+                self.tracer.llm_request()
+        elif self.point == self.POST_LLM:
+            if is_output_text:
+                self.tracer.llm_text(frame)
+            elif isinstance(frame, LLMFullResponseEndFrame):
+                self.tracer.llm_done()
+        elif self.point == self.PRE_OUTPUT:
+            if is_output_text:
+                self.tracer.output(frame)
+
+class StubLLMService(FrameProcessor):
+    """Stands in for GeminiLLMService with a local StubLLM, for offline benchmarks"""
+
+    def __init__(self, llm: StubLLM):
+        super().__init__()
+        self.llm = llm
+        self.tool_handler: Optional[Callable[[str, Dict[str, Any]], Awaitable[Any]]] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def set_tool_handler(self, handler: Optional[Callable[[str, Dict[str, Any]], Awaitable[Any]]]):
+        """Bind the handler scripted tool calls are sent to"""
+        self.tool_handler = handler
+
+    async def process_frame(self, frame: Frame, direction: FrameDirection):
+        await super().process_frame(frame, direction)
+
+        if isinstance(frame, StartInterruptionFrame):
+            self._cancel()
+        elif (direction == FrameDirection.DOWNSTREAM and isinstance(frame, TextFrame)
+                and not isinstance(frame, TranscriptionFrame)):
+            # A new user turn replaces any response still generating
+            self._cancel()
+            self.task = asyncio.create_task(self._respond(frame.text))
+            return
+
+        await self.push_frame(frame, direction)
+
+    def _cancel(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+        self.task = None
+
+    async def _respond(self, text: str):
+        for tool, args in self.llm.tool_calls(text):
+            if self.tool_handler:
+                await self.tool_handler(tool, args)
+
+        await self.push_frame(LLMFullResponseStartFrame(), FrameDirection.DOWNSTREAM)
+        async for token in self.llm.stream(text):
+            await self.push_frame(TextFrame(token), FrameDirection.DOWNSTREAM)
+        await self.push_frame(LLMFullResponseEndFrame(), FrameDirection.DOWNSTREAM)
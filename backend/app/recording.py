@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import random
+import struct
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
+from .sessions import valid_session_id
+
+logger = logging.getLogger(__name__)
+
+# Recording file layout (little-endian):
+#   header: magic "VREC" | uint8 version | uint64 start time (unix microseconds)
+#   events: uint64 offset from start (microseconds) | uint8 kind | uint32 length | payload
+RECORDING_MAGIC = b"VREC"
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct("<4sBQ")
+EVENT_HEADER = struct.Struct("<QBI")
+
+INBOUND_BYTES = 1
+INBOUND_TEXT = 2
+OUTBOUND_BYTES = 3
+OUTBOUND_TEXT = 4
+
+class RecordedEvent(NamedTuple):
+    offset_us: int
+    kind: int
+    payload: bytes
+
+def read_recording(path: str) -> Iterator[RecordedEvent]:
+    """Iterate the events of a recording file, stopping at a torn final event"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _ = RECORDING_HEADER.unpack_from(data)
+    if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+        raise ValueError(f"Not a version {RECORDING_VERSION} session recording: {path}")
+
+    pos = RECORDING_HEADER.size
+    while pos + EVENT_HEADER.size <= len(data):
+        offset_us, kind, length = EVENT_HEADER.unpack_from(data, pos)
+        pos += EVENT_HEADER.size
+        if pos + length > len(data):
+            return
+        yield RecordedEvent(offset_us, kind, data[pos:pos + length])
+        pos += length
+
+class SessionRecording:
+    """In-memory tail of one session's recording, drained to disk by the recorder"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.started_at = time.perf_counter()
+        self.buffer = bytearray(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, time.time_ns() // 1000))
+        self.finished = False
+
+    def record(self, kind: int, payload: Union[str, bytes]):
+        """Append an event; only packs bytes into memory"""
+        if isinstance(payload, str):
+            payload = payload.encode()
+        offset_us = int((time.perf_counter() - self.started_at) * 1_000_000)
+        self.buffer += EVENT_HEADER.pack(offset_us, kind, len(payload))
+        self.buffer += payload
+
+class RecordingWebSocket:
+    """Wraps a connection's websocket, recording inbound and outbound messages.
+
+    Covers both the Starlette API (receive/send_text/send_bytes) used by SimpleVoiceAgent
+    and the websockets API (recv/send/async iteration) used by VoiceAgent's transport.
+    """
+
+    def __init__(self, websocket: Any, recording: SessionRecording):
+        self._websocket = websocket
+        self.recording = recording
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._websocket, name)
+
+    async def receive(self) -> Dict[str, Any]:
+        event = await self._websocket.receive()
+        if event.get("bytes") is not None:
+            self.recording.record(INBOUND_BYTES, event["bytes"])
+        elif event.get("text") is not None:
+            self.recording.record(INBOUND_TEXT, event["text"])
+        return event
+
+    async def send_text(self, data: str):
+        self.recording.record(OUTBOUND_TEXT, data)
+        await self._websocket.send_text(data)
+
+    async def send_bytes(self, data: bytes):
+        self.recording.record(OUTBOUND_BYTES, data)
+        await self._websocket.send_bytes(data)
+
+    async def recv(self) -> Union[str, bytes]:
+        message = await self._websocket.recv()
+        self._record_inbound(message)
+        return message
+
+    async def send(self, message: Any):
+        if isinstance(message, bytes):
+            self.recording.record(OUTBOUND_BYTES, message)
+        elif isinstance(message, str):
+            self.recording.record(OUTBOUND_TEXT, message)
+        await self._websocket.send(message)
+
+    async def __aiter__(self):
+        async for message in self._websocket:
+            self._record_inbound(message)
+            yield message
+
+    def _record_inbound(self, message: Union[str, bytes]):
+        self.recording.record(INBOUND_BYTES if isinstance(message, bytes) else INBOUND_TEXT, message)
+
+class SessionRecorder:
+    """Opt-in recorder of live sessions for offline replay.
+
+    Recording only appends to per-session memory buffers; a background task hands
+    them to a dedicated writer thread every `flush_interval_ms`.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 1.0, flush_interval_ms: float = 200):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval_ms / 1000
+        os.makedirs(directory, exist_ok=True)
+
+        self.recordings: List[SessionRecording] = []
+        self.task: Optional[asyncio.Task] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-recorder")
+
+        self.sessions_recorded = 0
+        self.bytes_written = 0
+
+    def start(self):
+        """Start the background flush task"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def wrap(self, websocket: Any, session_id: str) -> Any:
+        """Return a recording wrapper for a sampled session, or the websocket unchanged"""
+        if random.random() >= self.sample_rate:
+            return websocket
+        # Never let a client-chosen ID pick the path
+        name = session_id if valid_session_id(session_id) else uuid.uuid4().hex
+        filename = f"{name}-{time.time_ns() // 1_000_000}.vrec"
+        recording = SessionRecording(os.path.join(self.directory, filename))
+        self.recordings.append(recording)
+        self.sessions_recorded += 1
+        return RecordingWebSocket(websocket, recording)
+
+    def finish(self, websocket: Any):
+        """Mark a session's recording complete; it is closed on the next flush"""
+        if isinstance(websocket, RecordingWebSocket):
+            websocket.recording.finished = True
+
+    async def close(self):
+        """Flush every recording and stop the writer"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for recording in self.recordings:
+            recording.finished = True
+        await self._flush()
+        self.executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get recorder counters"""
+        return {
+            "active": len(self.recordings),
+            "sessions_recorded": self.sessions_recorded,
+            "bytes_written": self.bytes_written
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def _flush(self):
+        loop = asyncio.get_running_loop()
+        writes = []
+        for recording in self.recordings:
+            if recording.buffer:
+                data, recording.buffer = bytes(recording.buffer), bytearray()
+                writes.append((recording.path, data))
+                self.bytes_written += len(data)
+        # Finished recordings have nothing left to buffer after this flush
+        self.recordings = [recording for recording in self.recordings if not recording.finished]
+        if writes:
+            try:
+                await loop.run_in_executor(self.executor, self._write, writes)
+            except OSError as e:
+                logger.error(f"Session recording write failed: {e}")
+
+    def _write(self, writes: List[tuple]):
+        for path, data in writes:
+            with open(path, "ab") as f:
+                f.write(data)
+
+def create_recorder(config) -> Optional[SessionRecorder]:
+    """Session recorder writing to RECORD_DIR, or None when recording is off"""
+    if not config.RECORD_DIR:
+        return None
+    return SessionRecorder(config.RECORD_DIR, config.RECORD_SAMPLE_RATE)
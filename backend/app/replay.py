@@ -0,0 +1,239 @@
+"""Replay recorded sessions against a running server and compare latencies.
+
+    RECORD_DIR=recordings uvicorn app.main:app             # record live traffic
+    python -m app.replay recordings/*.vrec --sessions 200 --speed 4 --output new.json
+    python -m app.replay recordings/*.vrec --output new.json --compare old.json
+
+Inbound messages are sent on their recorded schedule (divided by `--speed`), many
+sessions at once. Each reply is matched to its request the way clients do: audio acks
+by frame sequence, tagged requests by "id", untagged ones in order. Latency is measured
+from the scheduled send time, and requests that went unanswered in the recording are
+not expected to be answered on replay. Recorded latencies are taken server-side, so
+they exclude the network; diff two replay results (`--compare`) to compare builds.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Tuple
+import websockets
+from .audio import AUDIO_FRAME_HEADER
+from .metrics import Histogram
+from .recording import INBOUND_BYTES, INBOUND_TEXT, OUTBOUND_BYTES, OUTBOUND_TEXT, read_recording
+
+# Server pushes that do not answer a particular request
+UNSOLICITED_TYPES = {"session", "vad", "form_update", "form_delta", "truncate"}
+
+# (inbound message index, metric name, sent at)
+Request = Tuple[int, str, float]
+
+class ReplyMatcher:
+    """Pairs replies with the requests that caused them"""
+
+    def __init__(self):
+        self.tagged: Dict[tuple, Request] = {}
+        self.untagged: Deque[Request] = deque()
+
+    def sent(self, index: int, kind: int, payload: bytes, sent_at: float):
+        if kind == INBOUND_BYTES:
+            if len(payload) >= AUDIO_FRAME_HEADER.size:
+                seq, _ = AUDIO_FRAME_HEADER.unpack_from(payload)
+                self.tagged[("frame", seq)] = (index, "audio_frame", sent_at)
+            return
+        message = _parse(payload)
+        if message is None:
+            return
+        metric = str(message.get("type"))
+        if "id" in message:
+            self.tagged[("id", str(message["id"]))] = (index, metric, sent_at)
+        else:
+            self.untagged.append((index, metric, sent_at))
+
+    def received(self, kind: int, payload: bytes) -> Optional[Request]:
+        if kind == OUTBOUND_BYTES:
+            if len(payload) < AUDIO_FRAME_HEADER.size:
+                return None
+            seq, _ = AUDIO_FRAME_HEADER.unpack_from(payload)
+            return self.tagged.pop(("frame", seq), None)
+        message = _parse(payload)
+        if message is None or message.get("type") in UNSOLICITED_TYPES:
+            return None
+        if "id" in message:
+            return self.tagged.pop(("id", str(message["id"])), None)
+        return self.untagged.popleft() if self.untagged else None
+
+def _parse(payload: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+class RecordedSession:
+    """Inbound schedule of one recording, plus the latencies the original server achieved"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.inbound: List[Tuple[float, int, bytes]] = []
+        # Inbound indices that were answered in the recording
+        self.answered: Dict[int, float] = {}
+        self.metrics: Dict[int, str] = {}
+
+        matcher = ReplyMatcher()
+        for event in read_recording(path):
+            at = event.offset_us / 1_000_000
+            if event.kind in (INBOUND_BYTES, INBOUND_TEXT):
+                index = len(self.inbound)
+                self.inbound.append((at, event.kind, event.payload))
+                matcher.sent(index, event.kind, event.payload, at)
+            elif event.kind in (OUTBOUND_BYTES, OUTBOUND_TEXT):
+                request = matcher.received(event.kind, event.payload)
+                if request:
+                    index, metric, sent_at = request
+                    self.answered[index] = (at - sent_at) * 1000
+                    self.metrics[index] = metric
+
+class Replay:
+    """Replays recorded sessions concurrently and collects per-request-type latency"""
+
+    def __init__(self, server_url: str, speed: float = 1.0, drain_seconds: float = 5.0):
+        self.server_url = server_url
+        self.speed = speed
+        self.drain_seconds = drain_seconds
+
+        self.recorded: Dict[str, Histogram] = {}
+        self.replayed: Dict[str, Histogram] = {}
+        self.unanswered = 0
+        self.errors = 0
+
+    async def run_session(self, recording: RecordedSession, start_at: float):
+        await sleep_until(start_at)
+        try:
+            websocket = await websockets.connect(self.server_url, max_queue=None)
+        except Exception:
+            self.errors += 1
+            return
+
+        matcher = ReplyMatcher()
+        expected = set(recording.answered)
+        done = asyncio.Event()
+        if not expected:
+            done.set()
+
+        async def receive():
+            async for message in websocket:
+                now = time.perf_counter()
+                if isinstance(message, bytes):
+                    request = matcher.received(OUTBOUND_BYTES, message)
+                else:
+                    request = matcher.received(OUTBOUND_TEXT, message.encode())
+                if request and request[0] in expected:
+                    index, metric, sent_at = request
+                    _observe(self.replayed, metric, (now - sent_at) * 1000)
+                    expected.discard(index)
+                    if not expected:
+                        done.set()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            for index, (at, kind, payload) in enumerate(recording.inbound):
+                intended = start_at + at / self.speed
+                await sleep_until(intended)
+                matcher.sent(index, kind, payload, intended)
+                await websocket.send(payload if kind == INBOUND_BYTES else payload.decode())
+            try:
+                await asyncio.wait_for(done.wait(), self.drain_seconds)
+            except asyncio.TimeoutError:
+                pass
+        except (websockets.ConnectionClosed, OSError):
+            self.errors += 1
+        finally:
+            receiver.cancel()
+            await websocket.close()
+
+        for index, latency_ms in recording.answered.items():
+            _observe(self.recorded, recording.metrics[index], latency_ms)
+        self.unanswered += len(expected)
+
+    async def run(self, recordings: List[RecordedSession], sessions: int, stagger_ms: float = 0) -> Dict[str, Any]:
+        start_at = time.perf_counter() + 0.1
+        await asyncio.gather(*(
+            self.run_session(recordings[i % len(recordings)], start_at + i * stagger_ms / 1000)
+            for i in range(sessions)
+        ))
+
+        latency = {}
+        for metric in sorted(set(self.recorded) | set(self.replayed)):
+            recorded = self.recorded.get(metric, Histogram()).summary()
+            replayed = self.replayed.get(metric, Histogram()).summary()
+            latency[metric] = {
+                "recorded": recorded,
+                "replayed": replayed,
+                "diff_ms": {key: _diff(recorded[key], replayed[key]) for key in ("p50", "p95", "p99")}
+            }
+        return {
+            "server_url": self.server_url,
+            "speed": self.speed,
+            "sessions": sessions,
+            "recordings": len(recordings),
+            "unanswered": self.unanswered,
+            "errors": self.errors,
+            "latency_ms": latency
+        }
+
+def _observe(histograms: Dict[str, Histogram], metric: str, value_ms: float):
+    histogram = histograms.get(metric)
+    if histogram is None:
+        histogram = histograms[metric] = Histogram()
+    histogram.observe(value_ms)
+
+def _diff(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    return round(new - old, 3) if old is not None and new is not None else None
+
+async def sleep_until(deadline: float):
+    delay = deadline - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+def compare_results(baseline: Dict[str, Any], candidate: Dict[str, Any]):
+    """Print replayed percentile changes between two builds"""
+    print(f"{'metric':<26} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for metric, entry in candidate["latency_ms"].items():
+        base = baseline["latency_ms"].get(metric)
+        if base is None:
+            continue
+        for key in ("p50", "p95", "p99"):
+            old, new = base["replayed"][key], entry["replayed"][key]
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{metric + ' ' + key:<26} {old:>10.3f} {new:>10.3f} {change:>8}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions against a server")
+    parser.add_argument("recordings", nargs="+", help="session recordings (.vrec)")
+    parser.add_argument("--url", default="ws://localhost:8000/ws")
+    parser.add_argument("--speed", type=float, default=1.0, help="schedule speed-up factor")
+    parser.add_argument("--sessions", type=int, default=None,
+                        help="concurrent sessions, cycling through the recordings (default: one each)")
+    parser.add_argument("--stagger-ms", type=float, default=0, help="delay between session starts")
+    parser.add_argument("--drain-seconds", type=float, default=5.0, help="wait for outstanding replies")
+    parser.add_argument("--output", default=None, help="result file (JSON)")
+    parser.add_argument("--compare", default=None, help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    recordings = [RecordedSession(path) for path in args.recordings]
+    replay = Replay(args.url, args.speed, args.drain_seconds)
+    results = await replay.run(recordings, args.sessions or len(recordings), args.stagger_ms)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import json
+from typing import Dict, Any, Optional
+
+class SerializationStats:
+    """Process-wide counters for reused encodings"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.snapshots_built = 0
+        self.snapshots_reused = 0
+
+    def stats(self) -> Dict[str, Any]:
+        encodes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / encodes, 3) if encodes else 0,
+            "bytes_saved": self.bytes_saved,
+            "snapshots_built": self.snapshots_built,
+            "snapshots_reused": self.snapshots_reused
+        }
+
+serialization_stats = SerializationStats()
+
+class Snapshot(dict):
+    """An immutable-by-convention dict that remembers its JSON encoding.
+
+    It is an ordinary dict to every consumer; dumps() splices in the cached text
+    instead of encoding it again.
+    """
+    __slots__ = ("version", "encoded")
+
+    def __init__(self, data: Dict[str, Any], version: Optional[int] = None):
+        super().__init__(data)
+        self.version = version
+        self.encoded: Optional[str] = None
+
+def encode(snapshot: Snapshot) -> str:
+    """JSON text of a snapshot, encoded at most once"""
+    if snapshot.encoded is None:
+        snapshot.encoded = json.dumps(snapshot)
+        serialization_stats.misses += 1
+    else:
+        serialization_stats.hits += 1
+        serialization_stats.bytes_saved += len(snapshot.encoded)
+    return snapshot.encoded
+
+def dumps(obj: Any) -> str:
+    """json.dumps, reusing the cached encoding of any Snapshot nested in dicts"""
+    if isinstance(obj, Snapshot):
+        return encode(obj)
+    if isinstance(obj, dict) and _contains_snapshot(obj):
+        return "{" + ", ".join(f"{json.dumps(str(key))}: {dumps(value)}" for key, value in obj.items()) + "}"
+    return json.dumps(obj)
+
+def _contains_snapshot(obj: Dict[str, Any]) -> bool:
+    for value in obj.values():
+        if isinstance(value, Snapshot) or (isinstance(value, dict) and _contains_snapshot(value)):
+            return True
+    return False
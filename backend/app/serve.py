@@ -0,0 +1,277 @@
+"""Production launcher: one router process feeding N session-affine uvicorn workers.
+
+    python -m app.serve --workers 4
+
+The router owns the listening socket. For each accepted connection it peeks at the
+HTTP request line and hands the socket to a worker over a Unix socket pair:
+connections naming a `session_id` created by worker K (IDs look like `wK-...`)
+go back to K, everything else is spread round-robin. Workers never listen
+themselves, so a session's in-memory state always lives in exactly one process.
+Form state other workers need (`/form/status`) is published to a shared SQLite file.
+"""
+import argparse
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import re
+import selectors
+import signal
+import socket
+import tempfile
+import time
+import zlib
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Enough to hold any realistic request line
+MAX_REQUEST_LINE = 4096
+# Connections that send nothing within this time are dropped by the router
+HANDSHAKE_TIMEOUT_S = 10.0
+# Maximum sockets received from the router per read
+MAX_FDS_PER_MESSAGE = 64
+
+SESSION_WORKER_PATTERN = re.compile(rb"[?&]session_id=w(\d+)-")
+SESSION_ID_PATTERN = re.compile(rb"[?&]session_id=([^&\s]+)")
+
+def route_request(request_head: bytes, workers: int) -> Optional[int]:
+    """Worker index owning the session ID in the request line, or None for new sessions"""
+    request_line = request_head.split(b"\r\n", 1)[0]
+    match = SESSION_WORKER_PATTERN.search(request_line)
+    if match:
+        index = int(match.group(1))
+        if index < workers:
+            return index
+    match = SESSION_ID_PATTERN.search(request_line)
+    if match:
+        # A client-chosen ID: hash it so every reconnect reaches the same worker
+        return zlib.crc32(match.group(1)) % workers
+    return None
+
+def available_cpus() -> int:
+    """CPUs this process may use: its affinity mask capped by a cgroup CPU quota"""
+    count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota:
+        count = min(count, math.ceil(quota))
+    return max(1, count)
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    try:
+        # cgroup v2: "<quota> <period>", quota "max" when unlimited
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        return int(quota) / int(period) if quota != "max" else None
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: quota -1 when unlimited
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return quota / period if quota > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def run_worker(index: int, channel: socket.socket, host: str, port: int):
+    """Worker process entry point: serve connections handed over by the router"""
+    import uvicorn
+
+    class RoutedServer(uvicorn.Server):
+        """uvicorn server fed accepted sockets by the router instead of a listener"""
+
+        async def startup(self, sockets=None):
+            await super().startup(sockets=[])
+            if self.should_exit:
+                return
+            loop = asyncio.get_running_loop()
+            channel.setblocking(False)
+            loop.add_reader(channel.fileno(), self.receive_connections, loop)
+            logger.info(f"Worker {index} ready (pid {os.getpid()})")
+
+        async def shutdown(self, sockets=None):
+            asyncio.get_running_loop().remove_reader(channel.fileno())
+            await super().shutdown(sockets=sockets)
+
+        def receive_connections(self, loop: asyncio.AbstractEventLoop):
+            try:
+                message, fds, _, _ = socket.recv_fds(channel, 1, MAX_FDS_PER_MESSAGE)
+            except BlockingIOError:
+                return
+            if not message and not fds:
+                # Router went away
+                loop.remove_reader(channel.fileno())
+                self.should_exit = True
+                return
+            for fd in fds:
+                sock = socket.socket(fileno=fd)
+                loop.create_task(loop.connect_accepted_socket(self.create_protocol, sock))
+
+        def create_protocol(self):
+            return self.config.http_protocol_class(
+                config=self.config,
+                server_state=self.server_state,
+                app_state=self.lifespan.state,
+            )
+
+    RoutedServer(uvicorn.Config("app.main:app", host=host, port=port, log_level="info")).run()
+
+class Worker:
+    """Handle on a worker process and the router's end of its socket pair"""
+
+    def __init__(self, index: int, process: multiprocessing.Process, channel: socket.socket):
+        self.index = index
+        self.process = process
+        self.channel = channel
+        self.connections = 0
+
+class SessionRouter:
+    """Accepts connections and passes each to the worker that owns its session"""
+
+    def __init__(self, host: str, port: int, workers: int):
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.workers: List[Optional[Worker]] = [None] * workers
+        self.next_worker = 0
+        self.context = multiprocessing.get_context("spawn")
+        self.selector = selectors.DefaultSelector()
+        self.running = True
+
+    def start_worker(self, index: int):
+        """Spawn (or respawn) worker `index`"""
+        router_end, worker_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Spawned workers read their index when app.config is first imported
+        os.environ["WORKER_INDEX"] = str(index)
+        process = self.context.Process(
+            target=run_worker,
+            args=(index, worker_end, self.host, self.port),
+            name=f"voice-agent-worker-{index}",
+        )
+        process.start()
+        worker_end.close()
+        self.workers[index] = Worker(index, process, router_end)
+
+    def run(self):
+        """Serve until SIGINT or SIGTERM"""
+        listener = socket.create_server((self.host, self.port), backlog=2048, reuse_port=False)
+        listener.setblocking(False)
+        self.selector.register(listener, selectors.EVENT_READ, None)
+
+        for index in range(self.worker_count):
+            self.start_worker(index)
+        logger.info(f"Routing http://{self.host}:{self.port} to {self.worker_count} workers")
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            while self.running:
+                for key, _ in self.selector.select(timeout=1.0):
+                    if key.data is None:
+                        self.accept(listener)
+                    else:
+                        self.route(key.fileobj)
+                self.drop_stalled()
+                self.respawn_dead()
+        finally:
+            self.selector.close()
+            listener.close()
+            self.stop_workers()
+
+    def stop(self, signum=None, frame=None):
+        """Stop accepting and shut the workers down"""
+        self.running = False
+
+    def accept(self, listener: socket.socket):
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except BlockingIOError:
+                return
+            conn.setblocking(False)
+            # Wait for the request line before choosing a worker
+            self.selector.register(conn, selectors.EVENT_READ, time.monotonic() + HANDSHAKE_TIMEOUT_S)
+
+    def route(self, conn: socket.socket):
+        self.selector.unregister(conn)
+        try:
+            head = conn.recv(MAX_REQUEST_LINE, socket.MSG_PEEK)
+        except OSError:
+            head = b""
+        if not head:
+            conn.close()
+            return
+
+        index = route_request(head, self.worker_count)
+        if index is None:
+            index = self.next_worker
+            self.next_worker = (self.next_worker + 1) % self.worker_count
+
+        worker = self.workers[index]
+        try:
+            socket.send_fds(worker.channel, [b"c"], [conn.fileno()])
+            worker.connections += 1
+        except OSError as e:
+            logger.error(f"Could not hand connection to worker {index}: {e}")
+        finally:
+            # The worker holds its own duplicate of the socket
+            conn.close()
+
+    def drop_stalled(self):
+        now = time.monotonic()
+        stalled = [
+            key.fileobj for key in self.selector.get_map().values()
+            if key.data is not None and key.data < now
+        ]
+        for conn in stalled:
+            self.selector.unregister(conn)
+            conn.close()
+
+    def respawn_dead(self):
+        for worker in self.workers:
+            if self.running and not worker.process.is_alive():
+                logger.warning(f"Worker {worker.index} exited with {worker.process.exitcode}, restarting")
+                worker.channel.close()
+                self.start_worker(worker.index)
+
+    def stop_workers(self):
+        for worker in self.workers:
+            if worker and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker:
+                worker.process.join(timeout=30)
+                worker.channel.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Connections routed to each worker"""
+        return {worker.index: worker.connections for worker in self.workers if worker}
+
+def main():
+    from .config import Config
+
+    parser = argparse.ArgumentParser(description="Run the voice agent on multiple cores")
+    parser.add_argument("--host", default=Config.HOST)
+    parser.add_argument("--port", type=int, default=Config.PORT)
+    parser.add_argument("--workers", type=int, default=Config.WORKERS,
+                        help="worker processes (default: CPUs available to the container)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not Config.SHARED_STATE_PATH:
+        # Workers need a common store for state looked up across sessions
+        os.environ["SHARED_STATE_PATH"] = os.path.join(
+            tempfile.gettempdir(), f"voice-agent-{args.port}.sqlite3"
+        )
+    if not Config.JOURNAL_PATH:
+        # Respawned workers replay their predecessor's forms from here
+        os.environ["JOURNAL_PATH"] = os.path.join(
+            tempfile.gettempdir(), f"voice-agent-{args.port}.journal"
+        )
+    SessionRouter(args.host, args.port, args.workers if args.workers > 0 else available_cpus()).run()
+
+if __name__ == "__main__":
+    main()
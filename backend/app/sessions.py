@@ -0,0 +1,171 @@
+import json
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from .audio import JitterBuffer
+from .form_tools import Form, FormManager, FormStore
+from .outbound import OutboundQueue
+from .vad import GatedVAD
+
+# Client-supplied session IDs end up in file names, logs and the shared state
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Close code for connections asking for a session they cannot have
+SESSION_REJECTED_CLOSE_CODE = 1008
+
+def valid_session_id(session_id: Any) -> bool:
+    """Whether a client-supplied session ID is safe to use as given"""
+    return isinstance(session_id, str) and SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+def worker_id_prefix(worker_index: Optional[str]) -> str:
+    """Session ID prefix for a worker process; empty when running a single process"""
+    return f"w{worker_index}-" if worker_index is not None else ""
+
+class Session:
+    """State owned by a single caller, kept for a while after it disconnects so it can resume"""
+
+    def __init__(self, session_id: str, websocket: Any = None, form_store: Optional[FormStore] = None):
+        self.session_id = session_id
+        self.websocket = websocket
+        self.form_manager = FormManager(form_store, session_id)
+        self.created_at = time.time()
+        # time.monotonic() when the connection closed; None while connected
+        self.detached_at: Optional[float] = None
+        # Client accepts form_delta replies instead of full form snapshots
+        self.deltas = False
+        # Bounded send queue drained by the connection's writer task
+        self.outbound: Optional[OutboundQueue] = None
+        self.audio_frames_received = 0
+        # Jitter buffer over a preallocated ring and its VAD, created on the first audio frame
+        self.audio: Optional[JitterBuffer] = None
+        self.vad: Optional[GatedVAD] = None
+
+class SessionStore:
+    """Sessions keyed by session ID with O(1) lookup, creation and removal.
+
+    A session outlives its connection by `ttl_seconds`, so a caller reconnecting with
+    its ID gets its current form back. Only one connection can hold a session at a time.
+    """
+
+    def __init__(self, form_store: Optional[FormStore] = None, id_prefix: str = "", ttl_seconds: float = 300):
+        self.sessions: Dict[str, Session] = {}
+        # Worker processes prefix new IDs so the router can send reconnects back to them
+        self.id_prefix = id_prefix
+        self.ttl_seconds = ttl_seconds
+        # session_id -> time detached, oldest first
+        self.detached: "OrderedDict[str, float]" = OrderedDict()
+        # Forms from every session share one bounded store
+        self.form_store = form_store if form_store is not None else FormStore()
+        # Callables taking the session ID, run when a session expires or is removed
+        self.listeners = []
+        self.expirations = 0
+
+    def create(self, session_id: Optional[str] = None, websocket: Any = None) -> Session:
+        """Create a session, or reattach to a detached one with the same ID.
+
+        Raises ValueError for a malformed session ID or one that is still connected.
+        """
+        if session_id and not valid_session_id(session_id):
+            raise ValueError("Invalid session ID")
+        self.expire()
+        if session_id and session_id in self.sessions:
+            session = self.sessions[session_id]
+            if session.detached_at is None:
+                raise ValueError("Session is already connected")
+            del self.detached[session_id]
+            session.detached_at = None
+            session.websocket = websocket
+            return session
+
+        session = Session(session_id or f"{self.id_prefix}{uuid.uuid4().hex}", websocket, self.form_store)
+        self.sessions[session.session_id] = session
+        return session
+
+    def detach(self, session_id: str, websocket: Any = None) -> bool:
+        """Mark a session disconnected, if `websocket` still holds it; it expires after the TTL"""
+        session = self.sessions.get(session_id)
+        if session is None or session.detached_at is not None or session.websocket is not websocket:
+            return False
+        session.websocket = None
+        # Audio state belongs to the connection; a reconnect starts a fresh stream
+        session.audio = None
+        session.vad = None
+        session.detached_at = time.monotonic()
+        self.detached[session_id] = session.detached_at
+        self.expire(session.detached_at)
+        return True
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop sessions detached for longer than the TTL, oldest first"""
+        now = time.monotonic() if now is None else now
+        expired = 0
+        while self.detached:
+            session_id, detached_at = next(iter(self.detached.items()))
+            if now - detached_at <= self.ttl_seconds:
+                break
+            del self.detached[session_id]
+            self.sessions.pop(session_id, None)
+            self._dropped(session_id)
+            expired += 1
+        self.expirations += expired
+        return expired
+
+    def restore_forms(self, forms: Dict[str, Any]):
+        """Load replayed forms; their sessions are resumable for the TTL, as if just disconnected"""
+        now = time.monotonic()
+        for form_id, (owner, form) in forms.items():
+            self.form_store.put(form_id, Form.from_dict(form))
+            if not owner:
+                continue
+            session = self.sessions.get(owner)
+            if session is None:
+                session = self.sessions[owner] = Session(owner, None, self.form_store)
+                session.detached_at = now
+                self.detached[owner] = now
+            # The journal lists forms in creation order, so the last one is current
+            session.form_manager.current_form = form_id
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Get a connected or resumable session by ID"""
+        self.expire()
+        return self.sessions.get(session_id)
+
+    def remove(self, session_id: str) -> Optional[Session]:
+        """Drop a session now; its forms stay in the form store until they expire or are evicted"""
+        self.detached.pop(session_id, None)
+        session = self.sessions.pop(session_id, None)
+        if session:
+            self._dropped(session_id)
+        return session
+
+    def stats(self) -> Dict[str, int]:
+        """Get session counters"""
+        return {
+            "sessions": len(self.sessions),
+            "detached": len(self.detached),
+            "expirations": self.expirations
+        }
+
+    def _dropped(self, session_id: str):
+        for listener in self.listeners:
+            listener(session_id)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.sessions
+
+async def reject_session(websocket: Any, reason: str):
+    """Tell the client why its session was refused, then close with SESSION_REJECTED_CLOSE_CODE"""
+    message = json.dumps({"type": "error", "message": reason})
+    if hasattr(websocket, "accept"):
+        # Starlette (SimpleVoiceAgent)
+        await websocket.accept()
+        await websocket.send_text(message)
+    else:
+        # websockets (VoiceAgent's transport)
+        await websocket.send(message)
+    await websocket.close(code=SESSION_REJECTED_CLOSE_CODE, reason=reason)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from .form_tools import Form
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+class SharedFormState:
+    """Latest form per session in a local SQLite file shared by all worker processes.
+
+    Writes are buffered and flushed by a background thread every `flush_interval_ms`,
+    so form mutations never wait on disk. Only the newest snapshot per session is kept.
+    """
+
+    def __init__(self, path: str, flush_interval_ms: float = 50, ttl_seconds: float = 3600):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.ttl_seconds = ttl_seconds
+
+        # session_id -> (encoded form, time), or None for a session to delete
+        self.pending: Dict[str, Optional[Tuple[str, float]]] = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+        # One connection for the flush thread, one for lookups
+        self.writer = self._connect()
+        self.writer.execute(
+            "CREATE TABLE IF NOT EXISTS session_forms ("
+            "session_id TEXT PRIMARY KEY, form TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.writer.commit()
+        self.reader = self._connect()
+        self.reader_lock = threading.Lock()
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.thread = threading.Thread(target=self._flush_loop, name="shared-form-state", daemon=True)
+        self.thread.start()
+
+    def on_form_event(self, event: str, owner: Optional[str], form: Form):
+        """FormStore listener: publish the session's latest form"""
+        if owner:
+            self.publish(owner, form.snapshot())
+
+    def publish(self, session_id: str, form: Dict[str, Any]):
+        """Queue a session's form for the next flush"""
+        data = dumps(form)
+        with self.lock:
+            self.pending[session_id] = (data, time.time())
+
+    def forget(self, session_id: str):
+        """Queue the deletion of an expired session's form"""
+        with self.lock:
+            self.pending[session_id] = None
+
+    def get_form(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a session's latest form, wherever it is being served"""
+        with self.lock:
+            if session_id in self.pending:
+                pending = self.pending[session_id]
+                return json.loads(pending[0]) if pending else None
+
+        with self.reader_lock:
+            row = self.reader.execute(
+                "SELECT form FROM session_forms WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def lookup(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a form without blocking the event loop on disk"""
+        return await asyncio.to_thread(self.get_form, session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get flush counters"""
+        return {
+            "pending": len(self.pending),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written
+        }
+
+    def close(self):
+        """Flush what is pending and stop the writer thread"""
+        self.stopping.set()
+        self.thread.join()
+        self.writer.close()
+        self.reader.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        # WAL lets every worker read while one writes
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _flush_loop(self):
+        last_expiry = time.time()
+        while not self.stopping.wait(self.flush_interval):
+            self._flush()
+            if time.time() - last_expiry > self.ttl_seconds / 10:
+                self._expire()
+                last_expiry = time.time()
+        self._flush()
+
+    def _flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, {}
+
+        try:
+            self.writer.executemany(
+                "INSERT OR REPLACE INTO session_forms (session_id, form, updated_at) VALUES (?, ?, ?)",
+                [(session_id, *entry) for session_id, entry in batch.items() if entry]
+            )
+            self.writer.executemany(
+                "DELETE FROM session_forms WHERE session_id = ?",
+                [(session_id,) for session_id, entry in batch.items() if not entry]
+            )
+            self.writer.commit()
+            self.flushes += 1
+            self.rows_written += len(batch)
+        except sqlite3.Error as e:
+            logger.error(f"Shared form state flush failed: {e}")
+
+    def _expire(self):
+        try:
+            self.writer.execute(
+                "DELETE FROM session_forms WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self.writer.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Shared form state expiry failed: {e}")
+
+def create_shared_state(config) -> Optional[SharedFormState]:
+    """Open the cross-worker form state, or None when SHARED_STATE_PATH is unset"""
+    if not config.SHARED_STATE_PATH:
+        return None
+    return SharedFormState(config.SHARED_STATE_PATH, config.SHARED_STATE_FLUSH_MS, config.FORM_TTL_SECONDS)
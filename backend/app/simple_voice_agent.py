@@ -1,9 +1,23 @@
 import asyncio
 import json
 import logging
+import time
 from typing import Dict, Any, Optional
 from fastapi import WebSocket
-from .form_tools import FormManager, get_form_tools
+from .admission import create_admission_controller, serve_admitted
+from .audio import AUDIO_FRAME_HEADER, JitterBuffer, JitterStats, create_audio_buffer, decode_audio_frame
+from .dispatcher import DispatchStats, RequestDispatcher
+from .form_tools import FormStore
+from .intents import IntentMatcher
+from .journal import create_journal
+from .loop_monitor import create_loop_monitor
+from .metrics import create_stage_metrics
+from .recording import create_recorder
+from .serialization import dumps, serialization_stats
+from .sessions import Session, SessionStore, reject_session, worker_id_prefix
+from .shared_state import create_shared_state
+from .tool_registry import form_tool_registry
+from .vad import VADStats, create_vad, create_vad_engine
 from .config import Config
 
 logger = logging.getLogger(__name__)
@@ -11,80 +25,222 @@ logger = logging.getLogger(__name__)
 class SimpleVoiceAgent:
     def __init__(self):
         self.config = Config()
-        self.form_manager = FormManager()
+        self.form_store = FormStore(
+            max_forms=self.config.FORM_STORE_MAX_FORMS,
+            ttl_seconds=self.config.FORM_TTL_SECONDS
+        )
+        self.sessions = SessionStore(
+            self.form_store,
+            worker_id_prefix(self.config.WORKER_INDEX),
+            self.config.SESSION_TTL_SECONDS
+        )
+        # Latest form per session, readable from any worker process
+        self.shared_state = create_shared_state(self.config)
+        if self.shared_state:
+            self.form_store.listeners.append(self.shared_state.on_form_event)
+            # Once a session is gone for good, no worker reports its form
+            self.sessions.listeners.append(self.shared_state.forget)
+        self.journal = create_journal(self.config)
+        self.recorder = create_recorder(self.config)
+        self.vad_engine = create_vad_engine(self.config)
+        self.vad_stats = VADStats()
+        self.tools = form_tool_registry
+        self.intents = IntentMatcher() if self.config.INTENT_FAST_PATH else None
+        # ID-tagged requests run concurrently on every connection's dispatcher
+        self.request_stats = DispatchStats()
+        # Per-stage latency histograms, served on /metrics
+        self.metrics = create_stage_metrics(self.config)
+        # Shared by every session's jitter buffer so counts survive disconnects
+        self.jitter_stats = JitterStats()
+        self.loop_monitor = create_loop_monitor(self.config, self.metrics)
+        # Limits concurrent sessions on /ws to what fits the latency budget
+        self.admission = create_admission_controller(self.config, self.metrics)
         self.active_connections = {}
         
-    async def handle_tool_call(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle tool calling"""
+    async def start(self):
+        """Restore journaled forms and start background services"""
+        await self.start_journal()
+        if self.loop_monitor:
+            self.loop_monitor.start()
+        if self.recorder:
+            self.recorder.start()
+        if self.admission:
+            self.admission.start()
+    
+    async def start_journal(self):
+        """Replay the form journal into the store, then journal every mutation"""
+        if not self.journal:
+            return
+        self.sessions.restore_forms(await asyncio.to_thread(self.journal.replay))
+        self.form_store.listeners.append(self.journal.on_form_event)
+        self.journal.start()
+        
+    async def handle_tool_call(self, session: Session, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle tool calling for a single session"""
+        started_at = time.perf_counter()
+        result = await self.tools.dispatch(session, tool_name, args)
+        self.metrics.since("tool_call", started_at)
+        return result
+    
+    def create_audio_buffer(self) -> JitterBuffer:
+        """Create a session's preallocated inbound audio buffer"""
+        return create_audio_buffer(
+            self.config.AUDIO_SAMPLE_RATE,
+            self.config.AUDIO_CHUNK_SIZE,
+            self.config.AUDIO_BUFFER_SECONDS,
+            self.config.JITTER_MIN_FRAMES,
+            self.config.JITTER_MAX_FRAMES,
+            self.config.JITTER_MAX_CONCEAL_FRAMES,
+            self.jitter_stats
+        )
+    
+    async def run_vad(self, session: Session):
+        """Run VAD over every whole window released into the session's ring buffer"""
+        ring = session.audio.ring
+        window_size = session.vad.window_size
+        n = min(ring.available(), ring.capacity) // window_size * window_size
+        if n:
+            await session.vad.process(ring.read_window(n))
+    
+    async def handle_audio_frame(self, session: Session, websocket: WebSocket, data: bytes):
+        """Handle a binary int16 PCM audio frame"""
+        received_at = time.perf_counter()
+        arrival_us = time.monotonic_ns() // 1000
         try:
-            if tool_name == "open_form":
-                form = await self.form_manager.create_form(args.get("form_type", "default"))
-                return {
-                    "status": "success",
-                    "message": "Form opened successfully. You can now provide your details.",
-                    "form": form
-                }
-            
-            elif tool_name == "update_form_field":
-                field_name = args.get("field_name")
-                value = args.get("value")
-                
-                if not field_name or value is None:
-                    return {"status": "error", "message": "Field name and value are required"}
-                
-                form = await self.form_manager.update_field(field_name, value)
-                return {
-                    "status": "success",
-                    "message": f"Updated {field_name} field successfully",
-                    "form": form
-                }
-            
-            elif tool_name == "submit_form":
-                result = await self.form_manager.submit_form()
-                if result["status"] == "success":
-                    return {
-                        "status": "success",
-                        "message": "Form submitted successfully!",
-                        "form": result["form"]
-                    }
-                else:
-                    return {
-                        "status": "error",
-                        "message": f"Form validation failed: {', '.join(result['errors'])}",
-                        "errors": result["errors"]
-                    }
-            
+            frame = decode_audio_frame(data, self.config.AUDIO_CHUNK_SIZE)
+        except ValueError as e:
+            await websocket.send_text(json.dumps({"type": "error", "message": str(e)}))
+            return
+        
+        session.audio_frames_received += 1
+        if session.audio is None:
+            session.audio = self.create_audio_buffer()
+            session.vad = create_vad(self.config, self.vad_engine, self.vad_stats)
+        session.audio.push(frame, arrival_us)
+        self.metrics.since("ws_receive", received_at)
+        
+        was_speaking = session.vad.speaking
+        vad_started_at = time.perf_counter()
+        await self.run_vad(session)
+        self.metrics.since("vad", vad_started_at)
+        if session.vad.speaking != was_speaking:
+            await websocket.send_text(json.dumps({"type": "vad", "speaking": session.vad.speaking}))
+        
+        if self.config.AUDIO_FRAME_ACKS:
+            # Echo the header back so the client can match the ack to its frame
+            send_started_at = time.perf_counter()
+            await websocket.send_bytes(data[:AUDIO_FRAME_HEADER.size])
+            self.metrics.since("output_send", send_started_at)
+        self.metrics.since("audio_frame", received_at)
+    
+    async def reply_to_tool_call(self, session: Session, websocket: WebSocket, message: Dict[str, Any]):
+        """Run a tool call and send its result, tagged with the request ID if one was given"""
+        result = await self.handle_tool_call(
+            session,
+            message.get("tool"),
+            message.get("args", {})
+        )
+        if "id" in message:
+            result["id"] = message["id"]
+        await self.send_reply(websocket, result)
+    
+    async def reply_to_utterance(self, session: Session, websocket: WebSocket, message: Dict[str, Any]):
+        """Resolve a transcribed utterance locally, or tell the client to hand it to the LLM"""
+        started_at = time.perf_counter()
+        intent = self.intents.match(message.get("text", "")) if self.intents else None
+        self.metrics.since("intent", started_at)
+        reply = {"type": "intent", "handled": False}
+        if intent:
+            result = await self.handle_tool_call(session, intent.tool, intent.args)
+            # A failed tool call is left to the LLM, like an unmatched utterance
+            reply["handled"] = result["status"] == "success"
+            reply["tool"] = intent.tool
+            reply["result"] = result
+            if reply["handled"]:
+                self.intents.record_hit(intent)
             else:
-                return {"status": "error", "message": f"Unknown tool: {tool_name}"}
-                
-        except Exception as e:
-            logger.error(f"Tool call error: {e}")
-            return {"status": "error", "message": str(e)}
+                self.intents.record_failure(intent)
+        if "id" in message:
+            reply["id"] = message["id"]
+        await self.send_reply(websocket, reply)
+    
+    async def send_reply(self, websocket: WebSocket, reply: Dict[str, Any]):
+        """Send a JSON reply, timing the socket write"""
+        started_at = time.perf_counter()
+        await websocket.send_text(dumps(reply))
+        self.metrics.since("output_send", started_at)
     
     async def handle_connection(self, websocket: WebSocket):
+        """Handle a WebSocket connection, if admission control lets it in"""
+        await serve_admitted(self.admission, websocket, self.serve_connection)
+    
+    async def serve_connection(self, websocket: WebSocket):
         """Handle individual WebSocket connections"""
-        connection_id = id(websocket)
+        try:
+            session = self.sessions.create(websocket.query_params.get("session_id"), websocket)
+        except ValueError as e:
+            await reject_session(websocket, str(e))
+            return
+        connection_id = session.session_id
         logger.info(f"New connection: {connection_id}")
+        if self.recorder:
+            websocket = session.websocket = self.recorder.wrap(websocket, connection_id)
+        
+        session.deltas = websocket.query_params.get("deltas") == "true"
+        dispatcher = RequestDispatcher(self.config.MAX_IN_FLIGHT_REQUESTS, self.request_stats)
         
         try:
             await websocket.accept()
             self.active_connections[connection_id] = websocket
+            await websocket.send_text(json.dumps({"type": "session", "session_id": connection_id}))
             
             while True:
-                # Wait for messages
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                # Wait for messages: audio arrives as binary frames, control messages as JSON text
+                event = await websocket.receive()
+                if event["type"] == "websocket.disconnect":
+                    break
+                
+                if event.get("bytes") is not None:
+                    await self.handle_audio_frame(session, websocket, event["bytes"])
+                    continue
+                
+                received_at = time.perf_counter()
+                message = json.loads(event["text"])
+                self.metrics.since("ws_receive", received_at)
                 
                 # Handle different message types
                 if message.get("type") == "tool_call":
-                    result = await self.handle_tool_call(
-                        message.get("tool"),
-                        message.get("args", {})
-                    )
-                    await websocket.send_text(json.dumps(result))
+                    if "id" in message:
+                        # Tagged requests run concurrently; the client matches replies by ID
+                        await dispatcher.submit(self.reply_to_tool_call(session, websocket, message))
+                    else:
+                        await self.reply_to_tool_call(session, websocket, message)
+                
+                elif message.get("type") == "utterance":
+                    if "id" in message:
+                        await dispatcher.submit(self.reply_to_utterance(session, websocket, message))
+                    else:
+                        await self.reply_to_utterance(session, websocket, message)
+                
+                elif message.get("type") == "resync":
+                    # Client missed a delta; send the full current form
+                    await websocket.send_text(dumps({
+                        "type": "form_snapshot",
+                        "form": session.form_manager.get_current_form()
+                    }))
+                
+                elif message.get("type") == "tools":
+                    # Tool schemas for clients that run the LLM themselves, encoded once
+                    reply = '{"type": "tools", "tools": ' + self.tools.encoded_schemas()
+                    if "id" in message:
+                        reply += f', "id": {json.dumps(message["id"])}'
+                    await websocket.send_text(reply + "}")
                 
                 elif message.get("type") == "ping":
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                    pong = {"type": "pong"}
+                    if "id" in message:
+                        pong["id"] = message["id"]
+                    await websocket.send_text(json.dumps(pong))
                 
                 else:
                     # Echo back for now
@@ -96,10 +252,69 @@ class SimpleVoiceAgent:
         except Exception as e:
             logger.error(f"Connection error: {e}")
         finally:
-            if connection_id in self.active_connections:
+            await dispatcher.close()
+            if self.recorder:
+                self.recorder.finish(websocket)
+            if self.active_connections.get(connection_id) is websocket:
                 del self.active_connections[connection_id]
+            # Keep the session and its current form for a caller that reconnects with the ID
+            self.sessions.detach(connection_id, websocket)
             logger.info(f"Connection closed: {connection_id}")
     
-    def get_form_status(self) -> Optional[Dict[str, Any]]:
-        """Get current form status"""
-        return self.form_manager.get_current_form()
\ No newline at end of file
+    def get_stats(self) -> Dict[str, Any]:
+        """Get service counters"""
+        return {
+            "active_connections": len(self.active_connections),
+            "sessions": len(self.sessions),
+            "detached_sessions": len(self.sessions.detached),
+            "worker": self.config.WORKER_INDEX,
+            "forms": self.form_store.stats(),
+            "latency_ms": self.metrics.summary(),
+            "event_loop": self.loop_monitor.stats() if self.loop_monitor else None,
+            "admission": self.admission.stats() if self.admission else None,
+            "shared_state": self.shared_state.stats() if self.shared_state else None,
+            "journal": self.journal.stats() if self.journal else None,
+            "recorder": self.recorder.stats() if self.recorder else None,
+            "audio": self.jitter_stats.stats(),
+            "vad": self.vad_stats.stats(),
+            "vad_engine": self.vad_engine.stats() if self.vad_engine else None,
+            "intents": self.intents.stats() if self.intents else None,
+            "requests": self.request_stats.stats(),
+            "serialization": serialization_stats.stats()
+        }
+    
+    def render_metrics(self) -> str:
+        """Prometheus text for /metrics: stage latencies plus inbound audio frame counts"""
+        frames = {key[len("frames_"):]: value for key, value in self.jitter_stats.stats().items()}
+        return self.metrics.render() + self.metrics.render_counters(
+            "voice_agent_audio_frames_total",
+            "Inbound audio frames by jitter buffer outcome.",
+            "outcome",
+            frames
+        )
+    
+    async def shutdown(self):
+        """Release process-wide resources"""
+        if self.loop_monitor:
+            await self.loop_monitor.close()
+        if self.admission:
+            await self.admission.close()
+        if self.vad_engine:
+            await self.vad_engine.stop()
+        if self.journal:
+            await self.journal.close()
+        if self.recorder:
+            await self.recorder.close()
+        if self.shared_state:
+            await asyncio.to_thread(self.shared_state.close)
+    
+    def get_session(self, session_id: str) -> Optional[Session]:
+        """Get a connected or resumable session by ID"""
+        return self.sessions.get(session_id)
+    
+    def get_form_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get current form status for a session"""
+        session = self.sessions.get(session_id)
+        if session:
+            return session.form_manager.get_current_form()
+        return None
\ No newline at end of file
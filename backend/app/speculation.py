@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Any, Optional
+from .intents import normalize
+
+logger = logging.getLogger(__name__)
+
+class SpeculationStats:
+    """Counters shared by every session's speculator"""
+
+    def __init__(self):
+        self.started = 0
+        self.committed = 0
+        self.wasted = 0
+        self.head_start_ms = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        settled = self.committed + self.wasted
+        return {
+            "started": self.started,
+            "committed": self.committed,
+            "wasted": self.wasted,
+            "hit_rate": round(self.committed / settled, 3) if settled else 0,
+            "avg_head_start_ms": round(self.head_start_ms / self.committed, 1) if self.committed else 0
+        }
+
+class Speculator:
+    """Starts the LLM on a partial transcript once it has stopped changing.
+
+    A partial unchanged for `stability_ms` (and at least `min_words` long) is sent via
+    `start(text, True)`. If the final transcript matches, `commit()` keeps that response;
+    if the transcript diverges first, `cancel()` abandons it and the final text is
+    started normally with `start(text, False)`. Transcripts are compared case- and
+    punctuation-insensitively.
+    """
+
+    def __init__(self, start: Callable[[str, bool], Awaitable[None]], cancel: Callable[[], Awaitable[None]],
+                 commit: Callable[[], Awaitable[None]], stability_ms: float = 250, min_words: int = 3,
+                 stats: Optional[SpeculationStats] = None):
+        self.start = start
+        self.cancel = cancel
+        self.commit = commit
+        self.stability = stability_ms / 1000
+        self.min_words = min_words
+        self.stats = stats if stats is not None else SpeculationStats()
+
+        self.partial_text: Optional[str] = None
+        self.partial_key: Optional[str] = None
+        self.speculated_key: Optional[str] = None
+        self.speculated_at = 0.0
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.pending: Optional[asyncio.Task] = None
+
+    async def partial(self, text: str):
+        """Feed an interim transcript"""
+        key = normalize(text)
+        if key == self.partial_key:
+            return
+        self.partial_text, self.partial_key = text, key
+        self._cancel_timer()
+
+        if self.speculated_key is not None and key != self.speculated_key:
+            # The caller kept talking; the speculative answer is for the wrong question
+            await self.abandon()
+
+        if self.speculated_key is None and len(key.split()) >= self.min_words:
+            self.timer = asyncio.get_running_loop().call_later(self.stability, self._on_stable)
+
+    async def final(self, text: str):
+        """Feed the final transcript, keeping or replacing the speculative request"""
+        self._cancel_timer()
+        if self.pending:
+            await self.pending
+
+        if self.speculated_key is not None and normalize(text) == self.speculated_key:
+            self.stats.committed += 1
+            self.stats.head_start_ms += (time.monotonic() - self.speculated_at) * 1000
+            self.speculated_key = None
+            await self.commit()
+        else:
+            await self.abandon()
+            await self.start(text, False)
+        self.partial_text = self.partial_key = None
+
+    async def abandon(self):
+        """Cancel any speculative request, e.g. when the turn ends without a final transcript"""
+        self._cancel_timer()
+        if self.pending:
+            await self.pending
+        if self.speculated_key is not None:
+            self.stats.wasted += 1
+            self.speculated_key = None
+            await self.cancel()
+
+    def reset(self):
+        """Forget the current turn without touching the LLM"""
+        self._cancel_timer()
+        self.partial_text = self.partial_key = self.speculated_key = None
+        if self.pending:
+            self.pending.cancel()
+            self.pending = None
+
+    def _cancel_timer(self):
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def _on_stable(self):
+        self.timer = None
+        self.speculated_key = self.partial_key
+        self.speculated_at = time.monotonic()
+        self.stats.started += 1
+        self.pending = asyncio.create_task(self._start_speculation(self.partial_text))
+
+    async def _start_speculation(self, text: str):
+        try:
+            await self.start(text, True)
+        except Exception as e:
+            logger.error(f"Speculative request failed: {e}")
+        finally:
+            # reset() may already have replaced a cancelled request
+            if self.pending is asyncio.current_task():
+                self.pending = None
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import re
+from typing import AsyncIterator, Dict, Any, List, NamedTuple, Optional, Pattern, Tuple
+
+class ScriptedToolCall(NamedTuple):
+    pattern: Pattern
+    tool: str
+    args: Dict[str, Any]
+
+# Used when no script file is given, so benchmarks exercise every form tool
+DEFAULT_SCRIPT = [
+    {"match": r"\bopen\b.*\bform\b", "tool": "open_form", "args": {"form_type": "default"}},
+    {"match": r"\bmy (?P<field_name>name|email|phone) is (?P<value>.+?)[.?!]*$", "tool": "update_form_field",
+     "args": {"field_name": "{field_name}", "value": "{value}"}},
+    {"match": r"\bsubmit\b", "tool": "submit_form", "args": {}}
+]
+
+def load_script(path: Optional[str]) -> List[ScriptedToolCall]:
+    """Load scripted tool calls from a JSON file: [{"match": regex, "tool": name, "args": {...}}].
+
+    String args may reference named groups of the match, e.g. "{value}".
+    """
+    rules = DEFAULT_SCRIPT
+    if path:
+        with open(path) as f:
+            rules = json.load(f)
+    return [ScriptedToolCall(re.compile(rule["match"], re.IGNORECASE), rule["tool"], rule.get("args", {}))
+            for rule in rules]
+
+class StubLLM:
+    """Deterministic local LLM stand-in.
+
+    Replies start after `first_token_ms` and stream one word every `token_ms`. Utterances
+    matching the script emit tool calls before the reply, the way the model would.
+    """
+
+    def __init__(self, first_token_ms: float = 200, token_ms: float = 20,
+                 script: Optional[List[ScriptedToolCall]] = None, reply_template: str = "You said: {text}"):
+        self.first_token = first_token_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.script = script if script is not None else load_script(None)
+        self.reply_template = reply_template
+        self.requests = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def tool_calls(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Tool calls the script emits for an utterance"""
+        calls = []
+        for rule in self.script:
+            match = rule.pattern.search(text)
+            if match:
+                groups = {name: value.strip() for name, value in match.groupdict().items() if value}
+                args = {key: value.format(**groups) if isinstance(value, str) else value
+                        for key, value in rule.args.items()}
+                calls.append((rule.tool, args))
+        return calls
+
+    def reply_tokens(self, text: str) -> List[str]:
+        """The reply to an utterance, split into the tokens it streams as"""
+        words = self.reply_template.format(text=text.strip()).split()
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    async def stream(self, text: str) -> AsyncIterator[str]:
+        """Stream the reply token by token with the configured timing"""
+        self.requests += 1
+        try:
+            await asyncio.sleep(self.first_token)
+            for i, token in enumerate(self.reply_tokens(text)):
+                if i:
+                    await asyncio.sleep(self.token_delay)
+                yield token
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.completed += 1
+
+    async def complete(self, text: str) -> str:
+        """Reply to a user turn in one piece"""
+        return "".join([token async for token in self.stream(text)])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get request counters"""
+        return {
+            "requests": self.requests,
+            "completed": self.completed,
+            "cancelled": self.cancelled
+        }
+
+def create_stub_llm(config) -> StubLLM:
+    """Stub LLM configured from STUB_LLM_* settings"""
+    return StubLLM(
+        config.STUB_LLM_FIRST_TOKEN_MS,
+        config.STUB_LLM_TOKEN_MS,
+        load_script(config.STUB_LLM_SCRIPT)
+    )
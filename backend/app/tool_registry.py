@@ -0,0 +1,147 @@
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from .form_tools import form_delta, get_form_tools
+
+logger = logging.getLogger(__name__)
+
+ToolHandler = Callable[[Any, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+ArgumentValidator = Callable[[Any], Tuple[Optional[Dict[str, Any]], Optional[str]]]
+
+JSON_TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "object": (dict,),
+    "array": (list,)
+}
+
+def compile_validator(parameters: Dict[str, Any]) -> ArgumentValidator:
+    """Compile a tool's JSON schema parameters into a fast argument check.
+
+    The validator returns (args with defaults applied, None) or (None, error message).
+    """
+    properties = parameters.get("properties", {})
+    required = tuple(parameters.get("required", ()))
+    type_checks = tuple(
+        (name, spec["type"], JSON_TYPES[spec["type"]])
+        for name, spec in properties.items()
+        if spec.get("type") in JSON_TYPES
+    )
+    defaults = {name: spec["default"] for name, spec in properties.items() if "default" in spec}
+
+    def validate(args: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        if not isinstance(args, dict):
+            return None, "Tool arguments must be an object"
+        for name in required:
+            if args.get(name) is None:
+                return None, f"Missing required argument: {name}"
+        for name, type_name, types in type_checks:
+            value = args.get(name)
+            if value is not None and not isinstance(value, types):
+                return None, f"Argument '{name}' must be of type {type_name}"
+        if defaults:
+            args = {**defaults, **args}
+        return args, None
+
+    return validate
+
+class ToolRegistry:
+    """Maps tool names to handlers and precompiled argument validators"""
+
+    def __init__(self):
+        self.tools: Dict[str, Tuple[ToolHandler, ArgumentValidator]] = {}
+        self.schemas: Tuple[Dict[str, Any], ...] = ()
+        self.schemas_json: Optional[str] = None
+
+    def register(self, schema: Dict[str, Any], handler: ToolHandler):
+        """Register a handler for a tool schema"""
+        self.tools[schema["name"]] = (handler, compile_validator(schema.get("parameters", {})))
+        self.schemas += (schema,)
+        self.schemas_json = None
+
+    def encoded_schemas(self) -> str:
+        """JSON of every registered schema, encoded once"""
+        if self.schemas_json is None:
+            self.schemas_json = json.dumps(self.schemas)
+        return self.schemas_json
+
+    def decoded_schemas(self) -> List[Dict[str, Any]]:
+        """A private copy of every schema, for clients such as LLM services that keep or change them"""
+        return json.loads(self.encoded_schemas())
+
+    async def dispatch(self, session: Any, tool_name: str, args: Any) -> Dict[str, Any]:
+        """Validate arguments and run a tool for a session"""
+        tool = self.tools.get(tool_name)
+        if tool is None:
+            return {"status": "error", "message": f"Unknown tool: {tool_name}"}
+
+        handler, validate = tool
+        args, error = validate(args)
+        if error:
+            return {"status": "error", "message": error}
+
+        try:
+            return await handler(session, args)
+        except ValueError as e:
+            # Bad field values and calls out of order are the caller's mistake, reported back to it
+            logger.info(f"Tool call rejected: {tool_name}: {e}")
+            return {"status": "error", "message": str(e)}
+        except Exception as e:
+            logger.error(f"Tool call error: {tool_name}: {e}")
+            return {"status": "error", "message": str(e)}
+
+async def open_form(session, args: Dict[str, Any]) -> Dict[str, Any]:
+    form = await session.form_manager.create_form(args["form_type"])
+    return {
+        "status": "success",
+        "message": "Form opened successfully. You can now provide your details.",
+        "form": form.snapshot()
+    }
+
+async def update_form_field(session, args: Dict[str, Any]) -> Dict[str, Any]:
+    field_name = args["field_name"]
+    form = await session.form_manager.update_field(field_name, args["value"])
+    if session.deltas:
+        return {
+            "status": "success",
+            "message": f"Updated {field_name} field successfully",
+            "delta": form_delta(form, (field_name,))
+        }
+    return {
+        "status": "success",
+        "message": f"Updated {field_name} field successfully",
+        "form": form.snapshot()
+    }
+
+async def submit_form(session, args: Dict[str, Any]) -> Dict[str, Any]:
+    result = await session.form_manager.submit_form()
+    if result["status"] == "success":
+        return {
+            "status": "success",
+            "message": "Form submitted successfully!",
+            "form": result["form"].snapshot()
+        }
+    return {
+        "status": "error",
+        "message": f"Form validation failed: {', '.join(result['errors'])}",
+        "errors": result["errors"]
+    }
+
+FORM_TOOL_HANDLERS = {
+    "open_form": open_form,
+    "update_form_field": update_form_field,
+    "submit_form": submit_form
+}
+
+def create_form_tool_registry() -> ToolRegistry:
+    """Build the registry for the form tools advertised to the LLM"""
+    registry = ToolRegistry()
+    for schema in get_form_tools():
+        registry.register(schema, FORM_TOOL_HANDLERS[schema["name"]])
+    registry.encoded_schemas()
+    return registry
+
+# Built once at import and shared by both agents
+form_tool_registry = create_form_tool_registry()
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from importlib.resources import files
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pipecat.vad.silero import SileroOnnxModel
+except Exception:
+    # pipecat raises a bare Exception, not ImportError, when onnxruntime is missing
+    SileroOnnxModel = None
+
+SILENCE = 0
+SPEECH = 1
+AMBIGUOUS = 2
+
+# Silero scores fixed 512-sample chunks at 16 kHz, with 64 samples of carried context
+SILERO_CHUNK_SIZE = 512
+SILERO_CONTEXT_SIZE = 64
+
+def _dbfs_to_mean_square(dbfs: float) -> float:
+    amplitude = 32768.0 * 10 ** (dbfs / 20)
+    return amplitude * amplitude
+
+class EnergyVAD:
+    """Vectorized energy and zero-crossing-rate classifier for int16 PCM windows"""
+
+    def __init__(self, silence_dbfs: float = -50.0, speech_dbfs: float = -30.0, zcr_max: float = 0.35):
+        # Compare mean-square energy directly so no log is taken per window
+        self.silence_ms = _dbfs_to_mean_square(silence_dbfs)
+        self.speech_ms = _dbfs_to_mean_square(speech_dbfs)
+        self.zcr_max = zcr_max
+
+    def classify(self, windows: np.ndarray) -> np.ndarray:
+        """Classify each row of a (n, window_size) array as SILENCE, SPEECH or AMBIGUOUS"""
+        x = windows.astype(np.float32)
+        mean_square = np.einsum("ij,ij->i", x, x) / windows.shape[1]
+
+        signs = np.signbit(windows)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (windows.shape[1] - 1)
+
+        decisions = np.full(len(windows), AMBIGUOUS, dtype=np.int8)
+        decisions[mean_square < self.silence_ms] = SILENCE
+        # Loud but noise-like (very high ZCR) windows stay ambiguous
+        decisions[(mean_square >= self.speech_ms) & (zcr <= self.zcr_max)] = SPEECH
+        return decisions
+
+class SileroState:
+    """Per-session recurrent state for the shared Silero model"""
+
+    def __init__(self):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros((1, SILERO_CONTEXT_SIZE), dtype=np.float32)
+
+class SileroBatchModel:
+    """Silero ONNX model scoring one chunk per session in a single batched call"""
+
+    def __init__(self, sample_rate: int):
+        path = files("pipecat.vad.data").joinpath("silero_vad.onnx")
+        self.model = SileroOnnxModel(str(path), force_onnx_cpu=True)
+        self.sample_rate = np.array(sample_rate, dtype=np.int64)
+
+    def __call__(self, chunks: np.ndarray, states: List[SileroState]) -> np.ndarray:
+        x = chunks.astype(np.float32) / 32768.0
+        x = np.concatenate([np.concatenate([s.context for s in states]), x], axis=1)
+        state = np.concatenate([s.state for s in states], axis=1)
+
+        out, state = self.model.session.run(None, {"input": x, "state": state, "sr": self.sample_rate})
+
+        for i, s in enumerate(states):
+            s.state = state[:, i:i + 1]
+            s.context = x[i:i + 1, -SILERO_CONTEXT_SIZE:]
+        return out[:, 0]
+
+class BatchedVADEngine:
+    """One VAD model shared by every session.
+
+    Pending chunks from all sessions are collected for up to `max_delay_ms`, scored
+    in one batch on a dedicated worker thread, and the confidences fanned back out.
+    A session contributes at most one chunk per batch so its recurrent state stays ordered.
+    """
+
+    def __init__(self, model: Callable[[np.ndarray, List[Any]], np.ndarray],
+                 new_state: Callable[[], Any], max_batch: int = 64, max_delay_ms: float = 5.0):
+        self.model = model
+        self.new_state = new_state
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vad-engine")
+
+        self.stopped = False
+
+        self.batches = 0
+        self.chunks_scored = 0
+        self.batch_errors = 0
+
+    def stream(self) -> "VADEngineStream":
+        """Create a per-session handle with its own model state"""
+        return VADEngineStream(self, self.new_state())
+
+    async def score(self, state: Any, chunk: np.ndarray) -> float:
+        """Queue a chunk for the next batch and wait for its confidence"""
+        if self.stopped:
+            raise RuntimeError("VAD engine is stopped")
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        # Copy out of the caller's ring buffer before it can be overwritten
+        self.queue.put_nowait((state, chunk.copy(), future))
+        return await future
+
+    async def stop(self):
+        """Stop batching, cancel chunks still waiting for a score and release the worker thread"""
+        self.stopped = True
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        while self.queue is not None and not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            future.cancel()
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get engine counters"""
+        return {
+            "batches": self.batches,
+            "chunks_scored": self.chunks_scored,
+            "avg_batch_size": round(self.chunks_scored / self.batches, 2) if self.batches else 0,
+            "batch_errors": self.batch_errors
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        pending: List[Tuple[Any, np.ndarray, asyncio.Future]] = []
+        deferred: List[Tuple[Any, np.ndarray, asyncio.Future]] = []
+
+        try:
+            while True:
+                pending = deferred or [await self.queue.get()]
+                deferred = []
+                deadline = loop.time() + self.max_delay
+                while len(pending) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                batch = []
+                seen = set()
+                for request in pending:
+                    if id(request[0]) in seen:
+                        deferred.append(request)
+                    else:
+                        seen.add(id(request[0]))
+                        batch.append(request)
+
+                confidences = await self._score(loop, batch)
+                self.batches += 1
+                self.chunks_scored += len(batch)
+                for i, (_, _, future) in enumerate(batch):
+                    if not future.done():
+                        future.set_result(float(confidences[i]) if i < len(confidences) else 0.0)
+        except asyncio.CancelledError:
+            # Nobody will score these now; don't leave their sessions waiting
+            for _, _, future in pending + deferred:
+                future.cancel()
+            raise
+
+    async def _score(self, loop: asyncio.AbstractEventLoop,
+                     batch: List[Tuple[Any, np.ndarray, asyncio.Future]]) -> np.ndarray:
+        try:
+            chunks = np.stack([chunk for _, chunk, _ in batch])
+            states = [state for state, _, _ in batch]
+            return await loop.run_in_executor(self.executor, self.model, chunks, states)
+        except Exception as e:
+            # Scored as silence; the energy gate still catches clear speech
+            self.batch_errors += 1
+            logger.error(f"VAD batch error: {e}")
+            return np.zeros(len(batch))
+
+class VADEngineStream:
+    """A session's view of the shared engine, usable as a GatedVAD fallback"""
+
+    def __init__(self, engine: BatchedVADEngine, state: Any):
+        self.engine = engine
+        self.state = state
+
+    async def __call__(self, window: np.ndarray) -> float:
+        confidence = 0.0
+        for start in range(0, len(window) - SILERO_CHUNK_SIZE + 1, SILERO_CHUNK_SIZE):
+            chunk = window[start:start + SILERO_CHUNK_SIZE]
+            confidence = max(confidence, await self.engine.score(self.state, chunk))
+        return confidence
+
+class VADStats:
+    """Window counters shared by every session's gated VAD"""
+
+    def __init__(self):
+        self.windows_processed = 0
+        self.windows_escalated = 0
+
+    def stats(self) -> Dict[str, Any]:
+        processed = self.windows_processed
+        return {
+            "windows_processed": processed,
+            "windows_escalated": self.windows_escalated,
+            # Decided by the energy/ZCR gate alone, without running the model
+            "windows_skipped": processed - self.windows_escalated,
+            "escalation_rate": round(self.windows_escalated / processed, 4) if processed else 0
+        }
+
+class GatedVAD:
+    """Energy/ZCR first pass that escalates only ambiguous windows to a model-backed scorer.
+
+    Without a fallback, ambiguous windows keep the current speaking state.
+    """
+
+    def __init__(self, gate: EnergyVAD, window_size: int, hangover_windows: int = 8,
+                 fallback: Optional[Callable[[np.ndarray], Awaitable[float]]] = None,
+                 fallback_threshold: float = 0.5, counters: Optional[VADStats] = None):
+        self.gate = gate
+        self.window_size = window_size
+        self.hangover_windows = hangover_windows
+        self.fallback = fallback
+        self.fallback_threshold = fallback_threshold
+
+        self.speaking = False
+        self.hangover_left = 0
+        self.counters = counters if counters is not None else VADStats()
+
+    async def process(self, samples: np.ndarray) -> bool:
+        """Run VAD over whole windows of `samples`; returns whether the caller is speaking"""
+        n = len(samples) // self.window_size
+        if not n:
+            return self.speaking
+
+        windows = samples[:n * self.window_size].reshape(n, self.window_size)
+        decisions = self.gate.classify(windows)
+        self.counters.windows_processed += n
+
+        for i, decision in enumerate(decisions):
+            if decision == AMBIGUOUS:
+                decision = await self._escalate(windows[i])
+            self._update(decision)
+
+        return self.speaking
+
+    def stats(self) -> Dict[str, Any]:
+        """Get VAD counters"""
+        return self.counters.stats()
+
+    async def _escalate(self, window: np.ndarray) -> int:
+        if self.fallback is None:
+            return SPEECH if self.speaking else SILENCE
+        self.counters.windows_escalated += 1
+        return SPEECH if await self.fallback(window) >= self.fallback_threshold else SILENCE
+
+    def _update(self, decision: int):
+        if decision == SPEECH:
+            self.speaking = True
+            self.hangover_left = self.hangover_windows
+        elif self.speaking:
+            # Hold speech through short pauses
+            if self.hangover_left:
+                self.hangover_left -= 1
+            else:
+                self.speaking = False
+
+def create_vad_engine(config) -> Optional[BatchedVADEngine]:
+    """Create the process-wide Silero engine, or None when Silero is disabled or not installed"""
+    if not config.VAD_USE_SILERO:
+        return None
+    if config.VAD_WINDOW_SIZE < SILERO_CHUNK_SIZE or config.VAD_WINDOW_SIZE % SILERO_CHUNK_SIZE:
+        # Silero only scores whole chunks; anything else would never be scored
+        raise ValueError(f"VAD_WINDOW_SIZE must be a multiple of {SILERO_CHUNK_SIZE} when VAD_USE_SILERO is on, "
+                         f"got {config.VAD_WINDOW_SIZE}")
+    if SileroOnnxModel is None:
+        logger.warning("Silero VAD not installed, using energy/ZCR VAD only")
+        return None
+
+    return BatchedVADEngine(
+        SileroBatchModel(config.AUDIO_SAMPLE_RATE),
+        SileroState,
+        config.VAD_BATCH_MAX_SIZE,
+        config.VAD_BATCH_MAX_DELAY_MS
+    )
+
+def create_vad(config, engine: Optional[BatchedVADEngine] = None, counters: Optional[VADStats] = None) -> GatedVAD:
+    """Create a session's gated VAD, escalating ambiguous windows to the shared engine"""
+    return GatedVAD(
+        EnergyVAD(config.VAD_SILENCE_DBFS, config.VAD_SPEECH_DBFS, config.VAD_ZCR_MAX),
+        config.VAD_WINDOW_SIZE,
+        config.VAD_HANGOVER_WINDOWS,
+        engine.stream() if engine else None,
+        config.VAD_SILERO_THRESHOLD,
+        counters
+    )
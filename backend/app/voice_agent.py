@@ -1,124 +1,319 @@
 import asyncio
+import functools
 import json
 import logging
-from typing import Dict, Any, Optional
-import websockets
+import time
+import urllib.parse
+from typing import Dict, Any, Optional, Union
 from pipecat.pipeline.pipeline import Pipeline
 from pipecat.pipeline.runner import PipelineRunner
 from pipecat.pipeline.task import PipelineTask
 from pipecat.processors.aggregators.sentence import SentenceAggregator
-from pipecat.services.gemini import GeminiLLMService
 from pipecat.transports.network.websocket_server import WebsocketServerTransport
-from pipecat.vad.silero import SileroVAD
-from .form_tools import FormManager, get_form_tools
+from .admission import create_admission_controller, serve_admitted
+from .audio import AudioRingBuffer
+from .form_tools import FormStore
+from .intents import IntentMatch, IntentMatcher
+from .interruption import InterruptionController, InterruptionStats
+from .journal import create_journal
+from .loop_monitor import create_loop_monitor
+from .metrics import StageMetrics, TurnTracer, create_stage_metrics
+from .outbound import SLOW_CONSUMER_CLOSE_CODE, OutboundQueue, aggregate_queue_stats
+from .pipeline_pool import PipelinePool
+from .processors import (
+    FirstFrameProbe,
+    GatedVADProcessor,
+    BargeInProcessor,
+    IntentProcessor,
+    OutputGuard,
+    StageProbe,
+    SpeculationGate,
+    SpeculativeTranscriptProcessor,
+    StubLLMService
+)
+from .recording import create_recorder
+from .serialization import dumps, serialization_stats
+from .sessions import Session, SessionStore, reject_session, worker_id_prefix
+from .shared_state import create_shared_state
+from .speculation import SpeculationStats
+from .stub_llm import create_stub_llm
+from .tool_registry import form_tool_registry
+from .vad import VADStats, create_vad, create_vad_engine
 from .config import Config
 
+try:
+    from pipecat.services.gemini import GeminiLLMService
+except ImportError:
+    # Only LLM_BACKEND=gemini needs it; the stub backend runs without it
+    GeminiLLMService = None
+
 logger = logging.getLogger(__name__)
 
+TRUNCATE_MESSAGE = json.dumps({"type": "truncate"})
+
+def requested_session_id(websocket) -> Optional[str]:
+    """The `session_id` query parameter of a websockets connection, if the client sent one"""
+    query = urllib.parse.urlsplit(getattr(websocket, "path", None) or "").query
+    return urllib.parse.parse_qs(query).get("session_id", [None])[0]
+
+class PipelineComponents:
+    """Processors for one connection's pipeline, built ahead of time by the pipeline pool"""
+    
+    def __init__(self, llm: Union[GeminiLLMService, StubLLMService], vad: GatedVADProcessor, intents: IntentProcessor,
+                 interruption: InterruptionController, metrics: StageMetrics):
+        self.llm = llm
+        self.vad = vad
+        self.intents = intents
+        self.interruption = interruption
+        self.barge_in = BargeInProcessor(interruption)
+        self.output_guard = OutputGuard(interruption)
+        self.tracer = TurnTracer(metrics)
+        self.probes = {
+            point: StageProbe(self.tracer, point)
+            for point in (StageProbe.PRE_VAD, StageProbe.POST_VAD, StageProbe.PRE_LLM,
+                          StageProbe.POST_LLM, StageProbe.PRE_OUTPUT)
+        }
+        self.sentence_aggregator = SentenceAggregator()
+        self.first_frame_probe = FirstFrameProbe()
+        # Used instead of the sentence aggregator when speculative dispatch is on
+        self.speculation: Optional[SpeculativeTranscriptProcessor] = None
+        self.speculation_gate: Optional[SpeculationGate] = None
+
 class VoiceAgent:
     def __init__(self):
         self.config = Config()
-        self.form_manager = FormManager()
+        self.form_store = FormStore(
+            max_forms=self.config.FORM_STORE_MAX_FORMS,
+            ttl_seconds=self.config.FORM_TTL_SECONDS
+        )
+        self.sessions = SessionStore(
+            self.form_store,
+            worker_id_prefix(self.config.WORKER_INDEX),
+            self.config.SESSION_TTL_SECONDS
+        )
+        # Latest form per session, readable from any worker process
+        self.shared_state = create_shared_state(self.config)
+        if self.shared_state:
+            self.form_store.listeners.append(self.shared_state.on_form_event)
+            # Once a session is gone for good, no worker reports its form
+            self.sessions.listeners.append(self.shared_state.forget)
+        self.journal = create_journal(self.config)
+        self.recorder = create_recorder(self.config)
+        self.vad_engine = create_vad_engine(self.config)
+        self.vad_stats = VADStats()
+        self.tools = form_tool_registry
+        # Shared by every pipeline so hit rates cover the whole process
+        self.intents = IntentMatcher()
+        self.speculation_stats = SpeculationStats()
+        # Per-stage latency histograms, served on /metrics
+        self.metrics = create_stage_metrics(self.config)
+        self.interruption_stats = InterruptionStats(self.metrics)
+        self.loop_monitor = create_loop_monitor(self.config, self.metrics)
+        # Limits concurrent sessions to what fits the latency budget
+        self.admission = create_admission_controller(self.config, self.metrics)
+        self.pipeline_pool = PipelinePool(
+            self.create_components,
+            self.config.PIPELINE_POOL_MIN_SIZE,
+            self.config.PIPELINE_POOL_MAX_SIZE,
+            self.metrics
+        )
         self.active_connections = {}
+    
+    async def start(self):
+        """Restore journaled forms and warm the pipeline pool before the first caller arrives"""
+        await self.start_journal()
+        if self.loop_monitor:
+            self.loop_monitor.start()
+        if self.recorder:
+            self.recorder.start()
+        if self.admission:
+            self.admission.start()
+        await self.pipeline_pool.start()
+    
+    async def start_journal(self):
+        """Replay the form journal into the store, then journal every mutation"""
+        if not self.journal:
+            return
+        self.sessions.restore_forms(await asyncio.to_thread(self.journal.replay))
+        self.form_store.listeners.append(self.journal.on_form_event)
+        self.journal.start()
         
-    async def handle_tool_call(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Handle tool calling from Gemini"""
-        try:
-            if tool_name == "open_form":
-                form = await self.form_manager.create_form(args.get("form_type", "default"))
-                return {
-                    "status": "success",
-                    "message": "Form opened successfully. You can now provide your details.",
-                    "form": form
-                }
-            
-            elif tool_name == "update_form_field":
-                field_name = args.get("field_name")
-                value = args.get("value")
-                
-                if not field_name or value is None:
-                    return {"status": "error", "message": "Field name and value are required"}
-                
-                form = await self.form_manager.update_field(field_name, value)
-                return {
-                    "status": "success",
-                    "message": f"Updated {field_name} field successfully",
-                    "form": form
-                }
-            
-            elif tool_name == "submit_form":
-                result = await self.form_manager.submit_form()
-                if result["status"] == "success":
-                    return {
-                        "status": "success",
-                        "message": "Form submitted successfully!",
-                        "form": result["form"]
-                    }
-                else:
-                    return {
-                        "status": "error",
-                        "message": f"Form validation failed: {', '.join(result['errors'])}",
-                        "errors": result["errors"]
-                    }
-            
-            else:
-                return {"status": "error", "message": f"Unknown tool: {tool_name}"}
-                
-        except Exception as e:
-            logger.error(f"Tool call error: {e}")
-            return {"status": "error", "message": str(e)}
+    async def handle_tool_call(self, session: Session, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Handle tool calling from Gemini for a single session, pushing form changes to its caller"""
+        started_at = time.perf_counter()
+        result = await self.tools.dispatch(session, tool_name, args)
+        self.metrics.since("tool_call", started_at)
+        if result["status"] == "success":
+            self.push_form_update(session, result)
+        return result
     
-    async def create_pipeline(self, websocket_transport):
-        """Create the Pipecat pipeline"""
+    def push_form_update(self, session: Session, result: Dict[str, Any]):
+        """Queue a tool result's form change on the session's own connection"""
+        if session.outbound is None:
+            return
+        if "delta" in result:
+            # Deltas never coalesce; a client that misses one resyncs by version
+            session.outbound.enqueue(dumps({"type": "form_delta", "data": result["delta"]}))
+        elif "form" in result:
+            form = result["form"]
+            session.outbound.enqueue(
+                dumps({"type": "form_update", "data": form}),
+                key=f"form_update:{form['id']}"
+            )
+    
+    async def handle_intent(self, session: Session, intent: IntentMatch) -> bool:
+        """Run a locally resolved tool call; its form change reaches the caller like any other.
+
+        Returns False when the tool call failed, so the utterance goes on to the LLM.
+        """
+        result = await self.handle_tool_call(session, intent.tool, intent.args)
+        if result["status"] != "success":
+            self.intents.record_failure(intent)
+            return False
+        self.intents.record_hit(intent)
+        return True
+    
+    def create_llm(self) -> Union[GeminiLLMService, StubLLMService]:
+        """Create the LLM service: Gemini, or the local stub for offline benchmarks"""
+        if self.config.LLM_BACKEND == "stub":
+            # Each pipeline gets its own stub so concurrent callers never share state
+            return StubLLMService(create_stub_llm(self.config))
+        
+        if GeminiLLMService is None:
+            raise RuntimeError("pipecat's Gemini service is not installed; set LLM_BACKEND=stub to run offline")
         
         # Configure Gemini service
-        gemini_service = GeminiLLMService(
+        return GeminiLLMService(
             api_key=self.config.GEMINI_API_KEY,
             model="gemini-1.5-flash",
-            tools=get_form_tools()
+            tools=self.tools.decoded_schemas()
         )
+    
+    def create_transport(self, websocket):
+        """Create the transport for one connection"""
+        return WebsocketServerTransport(
+            websocket=websocket,
+            audio_sample_rate=self.config.AUDIO_SAMPLE_RATE,
+            audio_channels=1
+        )
+    
+    async def create_components(self) -> PipelineComponents:
+        """Build the per-connection processors that are slow to create"""
         
-        # Set up tool calling handler
-        gemini_service.set_tool_handler(self.handle_tool_call)
+        llm = self.create_llm()
         
-        # Configure VAD for interruption
-        vad = SileroVAD()
+        # Configure VAD for interruption: energy/ZCR gate, Silero only for ambiguous windows
+        vad = GatedVADProcessor(
+            create_vad(self.config, self.vad_engine, self.vad_stats),
+            AudioRingBuffer(self.config.AUDIO_CHUNK_SIZE * 4)
+        )
         
-        # Create aggregators
-        sentence_aggregator = SentenceAggregator()
+        components = PipelineComponents(
+            llm,
+            vad,
+            IntentProcessor(self.intents),
+            InterruptionController(self.interruption_stats),
+            self.metrics
+        )
+        if self.config.SPECULATIVE_LLM:
+            components.speculation_gate = SpeculationGate()
+            components.speculation = SpeculativeTranscriptProcessor(
+                components.speculation_gate,
+                self.config.SPECULATION_STABILITY_MS,
+                self.config.SPECULATION_MIN_WORDS,
+                self.speculation_stats
+            )
+        return components
+    
+    async def create_pipeline(self, websocket_transport, session: Session, components: PipelineComponents):
+        """Create the Pipecat pipeline from warm components"""
+        
+        # Set up tool calling handler bound to this session's form state
+        components.llm.set_tool_handler(functools.partial(self.handle_tool_call, session))
+        if self.config.INTENT_FAST_PATH:
+            components.intents.set_handler(functools.partial(self.handle_intent, session))
+        
+        # Barge-in tells the client to drop whatever agent output it still holds
+        components.interruption.on_truncate = functools.partial(session.outbound.enqueue, TRUNCATE_MESSAGE)
         
-        # Create pipeline
+        # Create pipeline; probes between stages feed the latency histograms
+        probes = components.probes
+        if components.speculation:
+            # Stable partial transcripts reach the LLM before the sentence ends
+            processors = [
+                components.speculation,
+                probes[StageProbe.PRE_LLM],
+                components.llm,
+                probes[StageProbe.POST_LLM],
+                components.speculation_gate
+            ]
+        else:
+            processors = [
+                components.sentence_aggregator,
+                probes[StageProbe.PRE_LLM],
+                components.llm,
+                probes[StageProbe.POST_LLM]
+            ]
         pipeline = Pipeline([
             websocket_transport.input_processor(),
-            vad,
-            sentence_aggregator,
-            gemini_service,
+            probes[StageProbe.PRE_VAD],
+            components.vad,
+            probes[StageProbe.POST_VAD],
+            components.barge_in,
+            components.intents,
+            *processors,
+            components.first_frame_probe,
+            components.output_guard,
+            probes[StageProbe.PRE_OUTPUT],
             websocket_transport.output_processor()
         ])
         
         return pipeline
     
     async def handle_connection(self, websocket):
+        """Handle a WebSocket connection, if admission control lets it in"""
+        await serve_admitted(self.admission, websocket, self.serve_connection)
+    
+    async def serve_connection(self, websocket):
         """Handle individual WebSocket connections"""
-        connection_id = id(websocket)
+        started_at = time.perf_counter()
+        try:
+            session = self.sessions.create(requested_session_id(websocket), websocket)
+        except ValueError as e:
+            await reject_session(websocket, str(e))
+            return
+        connection_id = session.session_id
         logger.info(f"New connection: {connection_id}")
+        if self.recorder:
+            websocket = session.websocket = self.recorder.wrap(websocket, connection_id)
         
         try:
-            # Create transport for this connection
-            transport = WebsocketServerTransport(
-                websocket=websocket,
-                audio_sample_rate=self.config.AUDIO_SAMPLE_RATE,
-                audio_channels=1
+            # Form updates go through a bounded queue with its own writer task
+            session.outbound = OutboundQueue(
+                websocket.send,
+                self.config.OUTBOUND_QUEUE_SIZE,
+                self.config.SLOW_CONSUMER_POLICY,
+                functools.partial(websocket.close, code=SLOW_CONSUMER_CLOSE_CODE, reason="slow consumer")
             )
+            session.outbound.start()
+            session.outbound.enqueue(json.dumps({"type": "session", "session_id": connection_id}))
             
-            # Create pipeline
-            pipeline = await self.create_pipeline(transport)
+            # Create transport for this connection
+            transport = self.create_transport(websocket)
+            
+            # Attach to a warm pipeline
+            components = await self.pipeline_pool.acquire()
+            components.first_frame_probe.arm(
+                functools.partial(self.pipeline_pool.record_first_frame, started_at)
+            )
+            pipeline = await self.create_pipeline(transport, session, components)
             
             # Create and run pipeline task
             task = PipelineTask(pipeline)
             runner = PipelineRunner()
             
             self.active_connections[connection_id] = {
+                "session": session,
                 "websocket": websocket,
                 "transport": transport,
                 "pipeline": pipeline,
@@ -134,21 +329,66 @@ class VoiceAgent:
         finally:
             if connection_id in self.active_connections:
                 del self.active_connections[connection_id]
+            if session.outbound:
+                await session.outbound.close()
+            if self.recorder:
+                self.recorder.finish(websocket)
+            # The caller may reconnect with its session ID before the session TTL runs out
+            self.sessions.detach(connection_id, websocket)
             logger.info(f"Connection closed: {connection_id}")
     
-    async def broadcast_form_update(self, form_data: Dict[str, Any]):
-        """Broadcast form updates to all connected clients"""
-        message = {
-            "type": "form_update",
-            "data": form_data
+    def get_stats(self) -> Dict[str, Any]:
+        """Get service counters"""
+        return {
+            "active_connections": len(self.active_connections),
+            "outbound": aggregate_queue_stats(
+                connection["session"].outbound for connection in self.active_connections.values()
+            ),
+            "sessions": len(self.sessions),
+            "worker": self.config.WORKER_INDEX,
+            "forms": self.form_store.stats(),
+            "latency_ms": self.metrics.summary(),
+            "event_loop": self.loop_monitor.stats() if self.loop_monitor else None,
+            "admission": self.admission.stats() if self.admission else None,
+            "shared_state": self.shared_state.stats() if self.shared_state else None,
+            "journal": self.journal.stats() if self.journal else None,
+            "recorder": self.recorder.stats() if self.recorder else None,
+            "vad": self.vad_stats.stats(),
+            "vad_engine": self.vad_engine.stats() if self.vad_engine else None,
+            "intents": self.intents.stats(),
+            "serialization": serialization_stats.stats(),
+            "speculation": self.speculation_stats.stats() if self.config.SPECULATIVE_LLM else None,
+            "interruptions": self.interruption_stats.stats(),
+            "pipeline_pool": self.pipeline_pool.stats()
         }
-        
-        for connection in self.active_connections.values():
-            try:
-                await connection["websocket"].send(json.dumps(message))
-            except:
-                pass  # Connection may be closed
-    
-    def get_form_status(self) -> Optional[Dict[str, Any]]:
-        """Get current form status"""
-        return self.form_manager.get_current_form()
\ No newline at end of file
+    
+    def render_metrics(self) -> str:
+        """Prometheus text for /metrics: per-stage latencies, barge-in and first frame included"""
+        return self.metrics.render()
+    
+    async def shutdown(self):
+        """Release process-wide resources"""
+        if self.loop_monitor:
+            await self.loop_monitor.close()
+        if self.admission:
+            await self.admission.close()
+        await self.pipeline_pool.close()
+        if self.vad_engine:
+            await self.vad_engine.stop()
+        if self.journal:
+            await self.journal.close()
+        if self.recorder:
+            await self.recorder.close()
+        if self.shared_state:
+            await asyncio.to_thread(self.shared_state.close)
+    
+    def get_session(self, session_id: str) -> Optional[Session]:
+        """Get a live session by ID"""
+        return self.sessions.get(session_id)
+    
+    def get_form_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get current form status for a session"""
+        session = self.sessions.get(session_id)
+        if session:
+            return session.form_manager.get_current_form()
+        return None
\ No newline at end of file
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import pytest
+from app.admission import ADMISSION_CLOSE_CODE, AdmissionController, MIN_WINDOW_SAMPLES, serve_admitted
+from app.loop_monitor import LOOP_LAG_STAGE
+from app.metrics import StageMetrics
+
+def controller(**kwargs):
+    metrics = StageMetrics()
+    options = dict(budget_ms=500, target_fraction=0.8, initial_limit=10, min_limit=2, max_limit=20)
+    options.update(kwargs)
+    return metrics, AdmissionController(metrics, ["turn"], **options)
+
+def observe(metrics, stage, value_ms, n=MIN_WINDOW_SAMPLES):
+    for _ in range(n):
+        metrics.observe(stage, value_ms)
+
+def test_slow_window_shrinks_the_limit_multiplicatively():
+    metrics, admission = controller()
+    admission.in_use = 10
+    observe(metrics, "turn", 450)
+    admission.adjust()
+    assert admission.limit == 7 and admission.decreases == 1
+
+    # The next window is fast, and the limit is saturated: grow by one
+    admission.in_use = 7
+    observe(metrics, "turn", 10)
+    admission.adjust()
+    assert admission.limit == 8
+
+def test_loop_lag_shrinks_the_limit():
+    metrics, admission = controller(lag_budget_ms=50)
+    admission.in_use = 10
+    observe(metrics, LOOP_LAG_STAGE, 80)
+    admission.adjust()
+    assert admission.limit == 7
+
+def test_sparse_windows_are_ignored():
+    metrics, admission = controller()
+    admission.in_use = 10
+    observe(metrics, "turn", 450, n=MIN_WINDOW_SAMPLES - 1)
+    admission.adjust()
+    assert admission.limit == 11
+
+def test_limit_does_not_grow_while_unused():
+    metrics, admission = controller()
+    admission.adjust()
+    assert admission.limit == 10
+
+def test_queued_session_gets_a_released_slot():
+    async def scenario():
+        _, admission = controller(initial_limit=1, queue_size=4, queue_timeout_ms=1000)
+        assert await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats()["waiting"] == 1
+        admission.release()
+        assert await waiting
+        assert admission.in_use == 1
+    asyncio.run(scenario())
+
+def test_queue_timeout_rejects():
+    async def scenario():
+        _, admission = controller(initial_limit=1, queue_size=4, queue_timeout_ms=10)
+        assert await admission.acquire()
+        assert not await admission.acquire()
+        assert admission.rejected == 1 and admission.in_use == 1
+    asyncio.run(scenario())
+
+def test_waiter_cancelled_after_wake_does_not_leak_its_slot():
+    async def scenario():
+        _, admission = controller(initial_limit=1, queue_size=4, queue_timeout_ms=1000)
+        assert await admission.acquire()
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed over and the waiter cancelled before it runs again
+        admission.release()
+        waiting.cancel()
+        try:
+            admitted = await waiting
+        except asyncio.CancelledError:
+            admitted = False
+        # Either the slot went back, or acquire() returned it to its caller to release
+        assert admission.in_use == (1 if admitted else 0)
+    asyncio.run(scenario())
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=1000, reason=None):
+        self.close_code = code
+
+def test_serve_admitted_releases_when_the_handler_fails():
+    async def scenario():
+        _, admission = controller(initial_limit=1)
+
+        async def serve(websocket):
+            assert admission.in_use == 1
+            raise RuntimeError("boom")
+        with pytest.raises(RuntimeError):
+            await serve_admitted(admission, FakeWebSocket(), serve)
+        assert admission.in_use == 0
+    asyncio.run(scenario())
+
+def test_serve_admitted_rejects_over_the_limit():
+    async def scenario():
+        _, admission = controller(initial_limit=1)
+        assert await admission.acquire()
+        websocket = FakeWebSocket()
+        served = []
+        await serve_admitted(admission, websocket, served.append)
+        assert not served
+        assert websocket.sent[0]["type"] == "overloaded"
+        assert websocket.close_code == ADMISSION_CLOSE_CODE
+        assert admission.in_use == 1
+    asyncio.run(scenario())
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from app.audio import (AUDIO_FRAME_HEADER, AudioFrame, AudioRingBuffer, JitterBuffer, JitterStats,
+                       decode_audio_frame)
+
+FRAME_SIZE = 4
+
+def frame(seq: int, value: int = None) -> AudioFrame:
+    value = seq if value is None else value
+    return AudioFrame(seq, seq * 250, np.full(FRAME_SIZE, value, dtype=np.int16))
+
+def jitter_buffer(**kwargs) -> JitterBuffer:
+    options = dict(min_depth=1, max_depth=4, max_conceal=2)
+    options.update(kwargs)
+    return JitterBuffer(AudioRingBuffer(FRAME_SIZE * 16), FRAME_SIZE, 16000, **options)
+
+def released(buffer: JitterBuffer) -> list:
+    ring = buffer.ring
+    return list(ring.read_window(ring.available())[::FRAME_SIZE])
+
+def test_decode_is_a_read_only_view():
+    samples = np.arange(4, dtype=np.int16)
+    data = AUDIO_FRAME_HEADER.pack(7, 123) + samples.tobytes()
+    decoded = decode_audio_frame(data, max_samples=4)
+    assert decoded.seq == 7 and decoded.timestamp_us == 123
+    assert list(decoded.samples) == [0, 1, 2, 3]
+    assert not decoded.samples.flags.writeable
+
+@pytest.mark.parametrize("data", [b"\x00" * 4, AUDIO_FRAME_HEADER.pack(0, 0) + b"\x00", AUDIO_FRAME_HEADER.pack(0, 0) + bytes(10)])
+def test_decode_rejects_malformed_frames(data):
+    with pytest.raises(ValueError):
+        decode_audio_frame(data, max_samples=4)
+
+def test_ring_windows_are_contiguous_across_the_wrap():
+    ring = AudioRingBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16))
+    assert list(ring.read_window(6)) == [0, 1, 2, 3, 4, 5]
+    ring.write(np.arange(6, 12, dtype=np.int16))
+    window = ring.read_window(6)
+    assert list(window) == [6, 7, 8, 9, 10, 11]
+    assert window.base is ring.buffer or window.base is ring.buffer.base
+
+def test_ring_reader_skips_ahead_after_an_overrun():
+    ring = AudioRingBuffer(4)
+    ring.write(np.arange(10, dtype=np.int16))
+    assert list(ring.read_window(4)) == [6, 7, 8, 9]
+    assert ring.overruns == 1
+
+def test_jitter_buffer_reorders_frames():
+    buffer = jitter_buffer()
+    for seq in (0, 2, 1, 3):
+        buffer.push(frame(seq), seq * 250)
+    assert released(buffer) == [0, 1, 2, 3]
+
+def test_small_gap_is_concealed_by_repeating_the_last_frame():
+    buffer = jitter_buffer()
+    for seq in (0, 2, 3):
+        buffer.push(frame(seq), seq * 250)
+    assert released(buffer) == [0, 0, 2, 3]
+    assert buffer.stats()["frames_concealed"] == 1
+
+def test_late_and_duplicate_frames_are_dropped():
+    buffer = jitter_buffer()
+    buffer.push(frame(0), 0)
+    buffer.push(frame(0), 0)
+    buffer.push(frame(2), 500)
+    buffer.push(frame(2), 500)
+    stats = buffer.stats()
+    assert stats["frames_late"] == 1
+    assert stats["frames_duplicate"] == 1
+
+def test_resync_counts_every_skipped_frame_as_lost():
+    buffer = jitter_buffer(max_conceal=0)
+    buffer.push(frame(0), 0)
+    buffer.push(frame(2), 500)
+    # Jump far ahead: 1 is flushed as missing, 3..19 never arrive
+    buffer.push(frame(20), 5000)
+    stats = buffer.stats()
+    assert stats["frames_lost"] == 18
+    assert released(buffer) == [0, 2, 20]
+
+def test_counters_are_shared_across_buffers():
+    counters = JitterStats()
+    for _ in range(2):
+        buffer = jitter_buffer(counters=counters)
+        buffer.push(frame(0), 0)
+    assert counters.frames_received == 2
+
+def test_short_frames_conceal_and_pace_by_their_own_length():
+    # 20 ms frames of 320 samples in a buffer that accepts up to 1024
+    buffer = JitterBuffer(AudioRingBuffer(1024 * 8), 1024, 16000, min_depth=1, max_depth=8, max_conceal=2)
+    for seq in (0, 2, 3):
+        samples = np.full(320, seq + 1, dtype=np.int16)
+        buffer.push(AudioFrame(seq, seq * 20_000, samples), seq * 20_000)
+    assert buffer.ring.available() == 4 * 320
+    assert buffer.frame_duration_us == 20_000
+
+    # ~19 ms of jitter is nearly a whole 20 ms frame, so the target grows by one
+    buffer.jitter_us = 20_000
+    buffer.push(AudioFrame(4, 80_000, np.zeros(320, dtype=np.int16)), 80_000)
+    assert buffer.target_depth == 2
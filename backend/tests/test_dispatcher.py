@@ -0,0 +1,58 @@
+import asyncio
+from app.dispatcher import DispatchStats, RequestDispatcher
+
+def test_requests_run_concurrently_up_to_the_limit():
+    async def run():
+        dispatcher = RequestDispatcher(max_in_flight=2)
+        gate = asyncio.Event()
+        started = []
+
+        async def request(n):
+            started.append(n)
+            await gate.wait()
+
+        await dispatcher.submit(request(1))
+        await dispatcher.submit(request(2))
+        third = asyncio.create_task(dispatcher.submit(request(3)))
+        await asyncio.sleep(0)
+        blocked = not third.done()
+        gate.set()
+        await third
+        await asyncio.gather(*dispatcher.tasks)
+        return blocked, started, dispatcher.counters.stats()
+
+    blocked, started, stats = asyncio.run(run())
+    assert blocked
+    assert started == [1, 2, 3]
+    assert stats["completed"] == 3
+
+def test_failures_are_counted_and_release_their_slot():
+    async def run():
+        dispatcher = RequestDispatcher(max_in_flight=1)
+
+        async def fail():
+            raise ValueError("bad request")
+
+        await dispatcher.submit(fail())
+        await asyncio.gather(*dispatcher.tasks)
+        await asyncio.wait_for(dispatcher.submit(asyncio.sleep(0)), 1)
+        await asyncio.gather(*dispatcher.tasks)
+        return dispatcher.counters.stats()
+
+    stats = asyncio.run(run())
+    assert stats["failed"] == 1 and stats["completed"] == 1
+
+def test_cancelling_before_start_releases_the_slot():
+    async def run():
+        counters = DispatchStats()
+        dispatcher = RequestDispatcher(max_in_flight=1, counters=counters)
+        await dispatcher.submit(asyncio.sleep(10))
+        # Close before the request task has taken its first step
+        await dispatcher.close()
+        await asyncio.wait_for(dispatcher.submit(asyncio.sleep(0)), 1)
+        await dispatcher.close()
+        return dispatcher, counters.stats()
+
+    dispatcher, stats = asyncio.run(run())
+    assert stats["cancelled"] == 1
+    assert dispatcher.in_flight == 0
@@ -0,0 +1,25 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+def open_form(websocket) -> str:
+    session_id = websocket.receive_json()["session_id"]
+    websocket.send_json({"type": "tool_call", "tool": "open_form", "args": {}})
+    assert websocket.receive_json()["status"] == "success"
+    return session_id
+
+def test_form_endpoints_are_scoped_to_their_session():
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as first, client.websocket_connect("/ws") as second:
+        first_id, second_id = open_form(first), open_form(second)
+        first_form = client.get("/form/status", params={"session_id": first_id}).json()["form"]
+        second_form = client.get("/form/status", params={"session_id": second_id}).json()["form"]
+        assert first_form["id"] != second_form["id"]
+
+        assert client.post("/form/reset", params={"session_id": first_id}).json()["status"] == "success"
+        assert client.get("/form/status", params={"session_id": first_id}).json() == {"status": "no_active_form"}
+        assert client.get("/form/status", params={"session_id": second_id}).json()["form"]["id"] == second_form["id"]
+
+def test_unknown_session_is_not_found():
+    client = TestClient(app)
+    assert client.get("/form/status", params={"session_id": "missing"}).status_code == 404
+    assert client.post("/form/reset", params={"session_id": "missing"}).status_code == 404
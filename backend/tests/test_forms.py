@@ -0,0 +1,166 @@
+import asyncio
+import json
+import pytest
+from types import SimpleNamespace
+from app import form_tools
+from app.form_tools import Form, FormIdGenerator, FormManager, FormStore, SnapshotCache, form_delta
+from app.form_types import FIELD_VALIDATORS, FormType, create_form_type_registry
+from app.serialization import dumps, serialization_stats
+
+def run(coro):
+    return asyncio.run(coro)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock for FormStore that only moves when the test advances it"""
+    now = [1000.0]
+    monkeypatch.setattr(form_tools, "time", SimpleNamespace(monotonic=lambda: now[0], time=form_tools.time.time))
+    return now
+
+@pytest.mark.parametrize("field_type, value, expected", [
+    ("text", "  Ada   Lovelace ", "Ada Lovelace"),
+    ("email", " Ada@Example.COM ", "ada@example.com"),
+    ("tel", "+1 (555) 010-2030", "+1 (555) 010-2030"),
+    ("number", "1,234.5", "1234.5"),
+    ("url", "https://example.com/a", "https://example.com/a"),
+    ("date", "2026-10-17", "2026-10-17"),
+])
+def test_field_validators_normalize(field_type, value, expected):
+    assert FIELD_VALIDATORS[field_type](value) == (expected, None)
+
+@pytest.mark.parametrize("field_type, value", [
+    ("email", "ada@example"), ("tel", "555"), ("number", "twelve"), ("url", "example.com"), ("date", "17/10/2026"),
+])
+def test_field_validators_reject(field_type, value):
+    normalized, error = FIELD_VALIDATORS[field_type](value)
+    assert normalized is None and error
+
+def test_unknown_field_type_is_rejected():
+    with pytest.raises(ValueError):
+        FormType("bad", {"fields": {"x": {"type": "colour"}}})
+
+def test_registry_falls_back_to_default_type(tmp_path):
+    path = tmp_path / "types.json"
+    path.write_text(json.dumps({"rsvp": {"fields": {"guests": {"type": "number", "required": True}}}}))
+    registry = create_form_type_registry(str(path))
+    assert registry.get("rsvp").field_names == ("guests",)
+    assert registry.get("missing").name == "default"
+
+def test_update_tracks_errors_and_submit_checks_them():
+    manager = FormManager(FormStore())
+
+    async def scenario():
+        form = await manager.create_form()
+        assert set(form.errors) == {"name", "email"}
+        with pytest.raises(ValueError):
+            await manager.update_field("email", "not an email")
+        assert form.version == 1
+
+        await manager.update_field("name", "Ada")
+        assert (await manager.submit_form())["status"] == "error"
+        await manager.update_field("email", "ada@example.com")
+        assert form.errors == {}
+        assert (await manager.submit_form())["status"] == "success"
+        assert form.status == "submitted"
+
+        # Clearing a required field brings its error back
+        await manager.update_field("name", " ")
+        assert form.errors == {"name": "name is required"}
+    run(scenario())
+
+def test_delta_carries_errors():
+    manager = FormManager(FormStore())
+
+    async def scenario():
+        await manager.create_form()
+        form = await manager.update_field("name", "Ada")
+        delta = form_delta(form, ("name",))
+        assert delta["fields"] == {"name": "Ada"}
+        assert delta["base_version"] == 1 and delta["version"] == 2
+        assert delta["errors"] == {"email": "email is required"}
+
+        form = await manager.update_field("name", "")
+        assert form_delta(form, ("name",))["errors"] == {"name": "name is required", "email": "email is required"}
+    run(scenario())
+
+def test_snapshot_is_cached_per_version():
+    manager = FormManager(FormStore())
+
+    async def scenario():
+        form = await manager.create_form()
+        first = form.snapshot()
+        assert form.snapshot() is first
+        hits = serialization_stats.hits
+        assert dumps({"form": first}) == json.dumps({"form": first})
+        assert dumps({"form": first}) == json.dumps({"form": first})
+        assert serialization_stats.hits > hits
+
+        await manager.update_field("name", "Ada")
+        second = form.snapshot()
+        assert second is not first
+        assert second["fields"]["name"]["value"] == "Ada" and first["fields"]["name"]["value"] == ""
+    run(scenario())
+
+def test_snapshot_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(form_tools, "snapshot_cache", SnapshotCache(max_size=2))
+    store = FormStore()
+    manager = FormManager(store)
+
+    async def scenario():
+        forms = [await manager.create_form() for _ in range(3)]
+        for form in forms:
+            dumps(form.snapshot())
+        return forms
+
+    forms = run(scenario())
+    # The least recently read form gave its snapshot up
+    assert forms[0].cached is None
+    assert forms[1].cached is not None and forms[2].cached is not None
+    stats = store.stats()
+    assert stats["cached_snapshots"] == 2 and stats["snapshot_evictions"] == 1
+    assert stats["cached_snapshot_bytes"] == sum(len(form.cached.encoded) for form in forms[1:])
+
+    # Forms leaving the store leave the cache too
+    store.remove(forms[2].id)
+    assert forms[2].cached is None
+    assert store.stats()["cached_snapshots"] == 1
+
+def test_form_ids_are_unique_within_the_same_second():
+    generate = FormIdGenerator()
+    ids = [generate() for _ in range(1000)]
+    assert len(set(ids)) == len(ids)
+    assert all(form_id.startswith(generate.prefix + "_") for form_id in ids)
+
+def test_store_evicts_the_least_recently_used_form(clock):
+    store = FormStore(max_forms=2)
+    store.put("a", "form a")
+    store.put("b", "form b")
+    assert store.get("a") == "form a"
+    store.put("c", "form c")
+    assert "b" not in store and "a" in store and "c" in store
+    assert store.stats()["evictions"] == 1 and store.stats()["expirations"] == 0
+
+def test_store_expires_idle_forms(clock):
+    store = FormStore(ttl_seconds=60)
+    store.put("a", "form a")
+    clock[0] += 30
+    store.put("b", "form b")
+    clock[0] += 40
+    # "a" has been idle for 70 s; reading it counts as expiry, not a hit
+    assert store.get("a") is None
+    assert store.get("b") == "form b"
+    clock[0] += 61
+    assert store.expire() == 1
+    assert len(store) == 0
+    assert store.stats()["expirations"] == 2 and store.stats()["evictions"] == 0
+
+def test_from_dict_round_trip():
+    manager = FormManager(FormStore())
+
+    async def scenario():
+        form = await manager.create_form()
+        await manager.update_field("name", "Ada")
+        return form
+    form = run(scenario())
+    restored = Form.from_dict(json.loads(json.dumps(form.to_dict())))
+    assert restored.to_dict() == form.to_dict()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+import pytest
+from app.intents import IntentMatch, IntentMatcher
+from app.simple_voice_agent import SimpleVoiceAgent
+
+@pytest.mark.parametrize("text, expected", [
+    ("Open a form, please", IntentMatch("open_form", {})),
+    ("ok submit the form thanks", IntentMatch("submit_form", {})),
+    ("My name is Ada Lovelace.", IntentMatch("update_form_field", {"field_name": "name", "value": "Ada Lovelace"})),
+    ("my email is ada at example dot com",
+     IntentMatch("update_form_field", {"field_name": "email", "value": "ada@example.com"})),
+    ("my phone number is +1 (555) 010-2030",
+     IntentMatch("update_form_field", {"field_name": "phone", "value": "+15550102030"})),
+    ("my name is john thanks", IntentMatch("update_form_field", {"field_name": "name", "value": "John"})),
+    ("my email is ada at example dot com please",
+     IntentMatch("update_form_field", {"field_name": "email", "value": "ada@example.com"})),
+])
+def test_matches(text, expected):
+    assert IntentMatcher().match(text) == expected
+
+@pytest.mark.parametrize("text", [
+    "my name is not john",
+    "my name is john no wait",
+    "my email is not ada at example dot com",
+    "my phone number is not 555 010 2030",
+    "my name isn't john",
+    "open a form and fill it in",
+    "what is my name",
+    "my name is thanks",
+    "my email is ada at example",
+])
+def test_defers_to_the_llm(text):
+    assert IntentMatcher().match(text) is None
+
+def test_hits_count_only_when_recorded():
+    matcher = IntentMatcher()
+    intent = matcher.match("submit the form")
+    matcher.match("tell me a joke")
+    assert matcher.stats()["hits"] == 0
+    matcher.record_failure(intent)
+    matcher.record_hit(intent)
+    stats = matcher.stats()
+    assert (stats["hits"], stats["misses"], stats["failures"]) == (1, 1, 1)
+    assert stats["hits_by_tool"] == {"submit_form": 1}
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+def test_failed_tool_call_is_left_to_the_llm():
+    async def scenario():
+        agent = SimpleVoiceAgent()
+        session = agent.sessions.create()
+        websocket = FakeWebSocket()
+
+        # No form is open yet, so the update fails
+        await agent.reply_to_utterance(session, websocket, {"text": "my name is Ada"})
+        assert websocket.sent[-1]["handled"] is False
+        assert websocket.sent[-1]["result"]["status"] == "error"
+        assert agent.intents.stats()["hits"] == 0
+
+        await agent.reply_to_utterance(session, websocket, {"text": "open a form"})
+        await agent.reply_to_utterance(session, websocket, {"text": "my name is Ada"})
+        assert websocket.sent[-1]["handled"] is True
+        assert agent.intents.stats()["hits"] == 2
+        assert agent.intents.stats()["failures"] == 1
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+from app.interruption import ONSET_TO_SILENCE_STAGE, InterruptionController, InterruptionStats
+from app.metrics import StageMetrics
+
+def test_speech_only_interrupts_a_responding_agent():
+    controller = InterruptionController(InterruptionStats())
+    assert not controller.speech_started()
+    controller.agent_responding = True
+    assert controller.speech_started()
+    # Already interrupting: further onsets are not counted again
+    assert not controller.speech_started()
+    assert controller.stats.interruptions == 1
+
+def test_silenced_truncates_and_records_latency():
+    truncated = []
+    metrics = StageMetrics()
+    controller = InterruptionController(InterruptionStats(metrics))
+    controller.on_truncate = lambda: truncated.append(True)
+    controller.agent_responding = True
+    controller.speech_started()
+    controller.silenced()
+    assert truncated == [True]
+    assert not controller.interrupting and not controller.agent_responding
+    assert metrics.stages[ONSET_TO_SILENCE_STAGE].count == 1
+    assert f'stage="{ONSET_TO_SILENCE_STAGE}"' in metrics.render()
+
+def test_silenced_without_interruption_does_nothing():
+    metrics = StageMetrics()
+    controller = InterruptionController(InterruptionStats(metrics))
+    controller.on_truncate = lambda: (_ for _ in ()).throw(AssertionError("truncated"))
+    controller.silenced()
+    assert ONSET_TO_SILENCE_STAGE not in metrics.stages
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from app.form_tools import FormManager, FormStore
+from app.journal import FormJournal
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def journal_forms(path, updates):
+    """Start a journal on `path`, apply (field, value) updates to a new form, and close it"""
+    journal = FormJournal(str(path), flush_interval_ms=1)
+    forms = journal.replay()
+    store = FormStore()
+    store.listeners.append(journal.on_form_event)
+    manager = FormManager(store, "session-1")
+    journal.start()
+    form = await manager.create_form()
+    for field_name, value in updates:
+        await manager.update_field(field_name, value)
+    await journal.close()
+    return forms, form
+
+def test_replay_keeps_latest_record_per_form(tmp_path):
+    path = tmp_path / "forms.journal"
+    _, form = run(journal_forms(path, [("name", "Ada"), ("email", "ada@example.com")]))
+
+    forms = FormJournal(str(path)).replay()
+    owner, data = forms[form.id]
+    assert owner == "session-1"
+    assert data["fields"]["name"]["value"] == "Ada"
+    assert data["fields"]["email"]["value"] == "ada@example.com"
+    assert data["version"] == 3
+
+def test_append_after_torn_tail_starts_a_new_line(tmp_path):
+    path = tmp_path / "forms.journal"
+    _, first = run(journal_forms(path, [("name", "Ada")]))
+    with open(path, "ab") as f:
+        f.write(b'{"e": "update", "o": "session-1", "t": 1')
+
+    # Only the create record follows the torn tail
+    forms, second = run(journal_forms(path, []))
+    assert first.id in forms
+
+    lines = path.read_bytes().splitlines()
+    assert json.loads(lines[-1])["f"]["id"] == second.id
+    forms = FormJournal(str(path)).replay()
+    assert forms[first.id][1]["fields"]["name"]["value"] == "Ada"
+    assert second.id in forms
+
+def test_compaction_keeps_one_record_per_live_form(tmp_path):
+    path = tmp_path / "forms.journal"
+    _, form = run(journal_forms(path, [("name", str(i)) for i in range(10)]))
+    journal = FormJournal(str(path), compact_min_records=0)
+    journal.replay()
+    assert journal.records_in_file == 11
+
+    async def compact():
+        journal.start()
+        await journal._compact()
+        await journal.close()
+    run(compact())
+
+    assert len(path.read_bytes().splitlines()) == 1
+    assert FormJournal(str(path)).replay()[form.id][1]["fields"]["name"]["value"] == "9"
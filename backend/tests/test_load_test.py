@@ -0,0 +1,73 @@
+import asyncio
+import importlib.util
+import os
+import time
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "..", "performance-test.py")
+spec = importlib.util.spec_from_file_location("performance_test", SCRIPT)
+performance_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(performance_test)
+
+def test_hdr_histogram_percentiles_and_merge():
+    histogram = performance_test.HdrHistogram()
+    for value in range(1, 1001):
+        histogram.record(value * 1000)
+    assert histogram.percentile(50) == pytest.approx(500_000, rel=0.001)
+    assert histogram.percentile(99) == pytest.approx(990_000, rel=0.001)
+
+    restored = performance_test.HdrHistogram.from_dict(histogram.to_dict())
+    restored.merge(histogram)
+    assert restored.total == 2000
+    assert restored.percentile(99) == pytest.approx(990_000, rel=0.001)
+
+def test_lost_messages_are_recorded_at_the_timeout():
+    test = performance_test.LoadTest("ws://unused", frame_ms=20)
+    caller = performance_test.LoadCaller(test, 0, time.perf_counter())
+    now = time.perf_counter()
+    caller.stream_start = now - 0.2
+    caller.frames_sent = 10
+    caller.pending_frames = {8: now - 0.04, 9: now - 0.02}
+    caller.pending_calls = {"0:9": now - 0.02}
+
+    # The schedule ran 0.2 s past the start plus 0.2 s more: 20 frames, 10 of them unsent
+    caller.record_lost(now + 0.2)
+    assert test.frames_lost == 2 + 10
+    assert test.calls_lost == 1
+    assert test.frame_hist.total == 12
+    assert test.frame_hist.percentile(1) >= test.drain_seconds * 1_000_000 * 0.999
+    assert test.tool_hist.total == 1
+
+def step(p99=10.0, **failures):
+    result = {
+        "frame_latency_ms": {"p99": p99},
+        "tool_call_latency_ms": {"p99": None},
+        "connect_failures": 0, "rejected": 0, "errors": 0, "frames_lost": 0, "tool_calls_lost": 0
+    }
+    result.update(failures)
+    return result
+
+@pytest.mark.parametrize("result, breached", [
+    (step(), False),
+    (step(p99=600.0), True),
+    (step(errors=1), True),
+    (step(frames_lost=3), True),
+    (step(tool_calls_lost=1), True),
+    (step(connect_failures=1), True),
+    (step(rejected=1), True),
+])
+def test_step_breach(result, breached):
+    assert performance_test.step_breached(result, "p99", 500) is breached
+
+def test_find_breach_stops_at_the_first_failing_step(monkeypatch):
+    test = performance_test.LoadTest("ws://unused")
+    outcomes = {10: step(), 20: step(errors=2), 40: step()}
+
+    async def run_step(callers):
+        return {"callers": callers, "client_send_lag_ms": {"p99": 0.0}, **outcomes[callers]}
+    monkeypatch.setattr(test, "run_step", run_step)
+
+    results = asyncio.run(test.find_breach([10, 20, 40], 500, 99))
+    assert results["breach_concurrency"] == 20
+    assert results["last_passing_concurrency"] == 10
+    assert [s["callers"] for s in results["steps"]] == [10, 20]
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from app.loop_monitor import LOOP_LAG_STAGE, LoopMonitor
+from app.metrics import StageMetrics
+
+async def block_the_loop():
+    time.sleep(0.3)
+
+def test_blocking_task_is_caught_in_the_act():
+    async def run():
+        metrics = StageMetrics()
+        monitor = LoopMonitor(metrics, interval_ms=10, slow_callback_ms=100)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(block_the_loop(), name="blocker")
+        await asyncio.sleep(0.05)
+        await monitor.close()
+        return monitor, metrics
+
+    monitor, metrics = asyncio.run(run())
+    stats = monitor.stats()
+    assert stats["slow_callbacks"] >= 1
+    report = stats["recent"][-1]
+    assert report["where"] == "block_the_loop"
+    assert report["task"] == "blocker"
+    assert report["blocked_ms"] >= 200
+    assert stats["max_lag_ms"] >= 200
+    assert metrics.stages[LOOP_LAG_STAGE].count > 0
+
+def test_idle_loop_reports_no_stalls():
+    async def run():
+        monitor = LoopMonitor(interval_ms=10, slow_callback_ms=200)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await monitor.close()
+        return monitor.stats()
+
+    stats = asyncio.run(run())
+    assert stats["slow_callbacks"] == 0
+    assert stats["lag_ms"]["count"] > 0
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+
+pytest.importorskip("pipecat")
+
+from app.loopback import DEFAULT_TURNS, LoopbackBenchmark, LoopbackVoiceAgent, LoopbackWebSocket
+
+def stub_agent() -> LoopbackVoiceAgent:
+    agent = LoopbackVoiceAgent()
+    agent.config.LLM_BACKEND = "stub"
+    agent.config.STUB_LLM_FIRST_TOKEN_MS = 5
+    agent.config.STUB_LLM_TOKEN_MS = 0
+    return agent
+
+def test_call_runs_to_completion():
+    async def run():
+        agent = stub_agent()
+        await agent.start()
+        try:
+            benchmark = LoopbackBenchmark(agent, DEFAULT_TURNS, word_ms=1, turn_timeout=5)
+            results = await asyncio.wait_for(benchmark.run(1), 30)
+        finally:
+            await agent.shutdown()
+        return agent, results
+
+    agent, results = asyncio.run(run())
+    assert results["timeouts"] == 0
+    assert results["turn_ms"]["count"] == len(DEFAULT_TURNS)
+    assert not agent.active_connections
+
+def test_session_is_announced_resumable_and_detached_on_close():
+    async def run():
+        agent = stub_agent()
+        await agent.start()
+        try:
+            websocket = LoopbackWebSocket()
+            websocket.path = "/ws?session_id=caller-1"
+            connection = asyncio.create_task(agent.handle_connection(websocket))
+            await asyncio.wait_for(websocket.transport.output.started.wait(), 5)
+
+            duplicate = LoopbackWebSocket()
+            duplicate.path = websocket.path
+            await agent.handle_connection(duplicate)
+
+            benchmark = LoopbackBenchmark(agent, [])
+            await benchmark.connection_task(websocket.transport).stop_when_done()
+            await asyncio.wait_for(connection, 5)
+        finally:
+            await agent.shutdown()
+        return agent, websocket, duplicate
+
+    agent, websocket, duplicate = asyncio.run(run())
+    assert websocket.messages[0] == {"type": "session", "session_id": "caller-1"}
+    assert duplicate.closed and duplicate.messages[0]["type"] == "error"
+    assert agent.sessions.get("caller-1").detached_at is not None
@@ -0,0 +1,32 @@
+from app.metrics import Histogram, StageMetrics
+
+def test_quantiles_land_in_the_right_bucket():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value)
+    # Buckets are 2^(1/4) apart, so estimates are within ~19% of the true value
+    assert 45 <= histogram.quantile(0.5) <= 60
+    assert 90 <= histogram.quantile(0.99) <= 120
+    assert histogram.summary()["count"] == 100
+
+def test_delta_covers_only_new_observations():
+    histogram = Histogram()
+    histogram.observe(1)
+    earlier = histogram.copy()
+    histogram.observe(100)
+    window = histogram.delta(earlier)
+    assert window.count == 1
+    assert window.quantile(0.5) > 50
+
+def test_render_includes_worker_label():
+    metrics = StageMetrics({"worker": "1"})
+    metrics.observe("vad", 2)
+    text = metrics.render()
+    assert 'voice_agent_stage_latency_seconds_count{stage="vad",worker="1"} 1' in text
+
+def test_render_counters():
+    metrics = StageMetrics({"worker": "0"})
+    text = metrics.render_counters("frames_total", "Frames.", "outcome", {"received": 3, "lost": 1})
+    assert "# TYPE frames_total counter" in text
+    assert 'frames_total{outcome="received",worker="0"} 3' in text
+    assert 'frames_total{outcome="lost",worker="0"} 1' in text
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from app.outbound import COALESCE, DISCONNECT, DROP_OLDEST, OutboundQueue, aggregate_queue_stats
+
+def fill(queue, messages):
+    return [queue.enqueue(message, key) for message, key in messages]
+
+def test_coalesce_keeps_the_latest_snapshot_in_place():
+    queue = OutboundQueue(None, max_size=2, policy=COALESCE)
+    fill(queue, [("form v1", "form"), ("delta", None), ("form v2", "form")])
+    assert [message for _, message in queue.queue] == ["form v2", "delta"]
+    assert queue.stats()["coalesced"] == 1
+
+def test_drop_oldest_when_full():
+    queue = OutboundQueue(None, max_size=2, policy=DROP_OLDEST)
+    fill(queue, [("a", None), ("b", None), ("c", None)])
+    assert [message for _, message in queue.queue] == ["b", "c"]
+    assert queue.stats()["dropped"] == 1
+
+def test_disconnect_closes_a_slow_consumer():
+    async def run():
+        closed = asyncio.Event()
+
+        async def close():
+            closed.set()
+
+        queue = OutboundQueue(None, max_size=1, policy=DISCONNECT, close=close)
+        accepted = fill(queue, [("a", None), ("b", None), ("c", None)])
+        await asyncio.wait_for(closed.wait(), 1)
+        return queue, accepted
+
+    queue, accepted = asyncio.run(run())
+    assert accepted == [True, False, False]
+    assert queue.closed and queue.stats()["dropped"] == 2
+
+def test_close_waits_for_a_pending_disconnect():
+    async def run():
+        closed = []
+
+        async def close():
+            await asyncio.sleep(0.01)
+            closed.append(True)
+
+        queue = OutboundQueue(None, max_size=1, policy=DISCONNECT, close=close)
+        fill(queue, [("a", None), ("b", None)])
+        await queue.close()
+        return queue, closed
+
+    queue, closed = asyncio.run(run())
+    assert closed == [True]
+    assert queue.close_task is None
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        OutboundQueue(None, policy="block")
+
+def test_writer_sends_in_order_and_stops_on_send_failure():
+    async def run():
+        sent = []
+
+        async def send(message):
+            if message == "boom":
+                raise ConnectionError("gone")
+            sent.append(message)
+
+        queue = OutboundQueue(send)
+        queue.start()
+        fill(queue, [("a", None), ("b", None), ("boom", None), ("c", None)])
+        await asyncio.sleep(0.01)
+        await queue.close()
+        return queue, sent
+
+    queue, sent = asyncio.run(run())
+    assert sent == ["a", "b"]
+    assert queue.closed and not queue.enqueue("d")
+
+def test_aggregate_stats():
+    queues = [OutboundQueue(None), OutboundQueue(None)]
+    queues[0].enqueue("a")
+    queues[1].enqueue("b")
+    queues[1].enqueue("c")
+    totals = aggregate_queue_stats(queues)
+    assert totals["connections"] == 2 and totals["depth"] == 3 and totals["deepest"] == 2
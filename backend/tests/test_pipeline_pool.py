@@ -0,0 +1,81 @@
+import asyncio
+import time
+from app.metrics import StageMetrics
+from app.pipeline_pool import TIME_TO_FIRST_FRAME_STAGE, PipelinePool
+
+class Components:
+    """Stands in for a set of processors holding one caller's state"""
+
+    def __init__(self):
+        self.context = []
+
+def test_sequential_sessions_share_no_components():
+    async def run():
+        built = []
+
+        async def factory():
+            built.append(Components())
+            return built[-1]
+
+        pool = PipelinePool(factory, min_size=1)
+        await pool.start()
+
+        first = await pool.acquire()
+        first.context.append("my name is Alice")
+        await asyncio.sleep(0)
+
+        second = await pool.acquire()
+        await asyncio.sleep(0)
+        await pool.close()
+        return pool, built, first, second
+
+    pool, built, first, second = asyncio.run(run())
+    assert second is not first
+    assert second.context == []
+    assert first not in pool.ready
+
+def test_pool_refills_to_min_size_after_acquire():
+    async def run():
+        async def factory():
+            return Components()
+
+        pool = PipelinePool(factory, min_size=2)
+        await pool.start()
+        await pool.acquire()
+        await asyncio.sleep(0)
+        stats = pool.stats()
+        await pool.close()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["hits"] == 1 and stats["misses"] == 0
+    assert stats["ready"] == 2
+
+def test_pool_never_holds_more_than_max_size():
+    async def run():
+        built = []
+
+        async def factory():
+            built.append(Components())
+            return built[-1]
+
+        pool = PipelinePool(factory, min_size=8, max_size=2)
+        await pool.start()
+        await pool.acquire()
+        await asyncio.sleep(0)
+        await pool.close()
+        return pool, built
+
+    pool, built = asyncio.run(run())
+    assert pool.min_size == 2
+    assert len(built) == 3
+
+def test_time_to_first_frame_goes_to_stage_metrics():
+    async def factory():
+        return Components()
+
+    metrics = StageMetrics()
+    pool = PipelinePool(factory, min_size=0, metrics=metrics)
+    pool.record_first_frame(time.perf_counter() - 0.05)
+    histogram = metrics.stages[TIME_TO_FIRST_FRAME_STAGE]
+    assert histogram.count == 1 and histogram.quantile(0.5) >= 40
@@ -0,0 +1,38 @@
+import asyncio
+import os
+from app.recording import INBOUND_TEXT, OUTBOUND_TEXT, SessionRecorder, read_recording
+
+class FakeWebSocket:
+    def __init__(self, events):
+        self.events = list(events)
+        self.sent = []
+
+    async def receive(self):
+        return self.events.pop(0)
+
+    async def send_text(self, data):
+        self.sent.append(data)
+
+def record_session(directory, session_id, events):
+    async def session():
+        recorder = SessionRecorder(str(directory))
+        websocket = recorder.wrap(FakeWebSocket(events), session_id)
+        for _ in events:
+            event = await websocket.receive()
+            await websocket.send_text(event["text"].upper())
+        recorder.finish(websocket)
+        await recorder.close()
+        return websocket.recording.path
+    return asyncio.run(session())
+
+def test_recording_round_trip(tmp_path):
+    path = record_session(tmp_path, "abc", [{"type": "websocket.receive", "text": "hi"}])
+    events = list(read_recording(path))
+    assert [(event.kind, event.payload) for event in events] == [(INBOUND_TEXT, b"hi"), (OUTBOUND_TEXT, b"HI")]
+
+def test_malformed_session_id_cannot_pick_the_path(tmp_path):
+    directory = tmp_path / "recordings"
+    path = record_session(directory, "../../escaped", [{"type": "websocket.receive", "text": "hi"}])
+    assert os.path.dirname(os.path.abspath(path)) == str(directory)
+    assert "escaped" not in path
+    assert os.listdir(tmp_path) == ["recordings"]
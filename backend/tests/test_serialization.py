@@ -0,0 +1,15 @@
+import json
+from app.serialization import Snapshot, dumps, encode, serialization_stats
+
+def test_nested_snapshot_reuses_its_encoding():
+    snapshot = Snapshot({"id": "f1", "fields": {"name": "Ada"}}, version=1)
+    first = encode(snapshot)
+    hits = serialization_stats.hits
+    message = dumps({"type": "form_update", "data": {"form": snapshot}})
+    assert serialization_stats.hits == hits + 1
+    assert first in message
+    assert json.loads(message) == {"type": "form_update", "data": {"form": {"id": "f1", "fields": {"name": "Ada"}}}}
+
+def test_plain_objects_use_json_dumps():
+    value = {"type": "pong", "id": 3}
+    assert dumps(value) == json.dumps(value)
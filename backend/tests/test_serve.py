@@ -0,0 +1,21 @@
+from app.serve import available_cpus, route_request
+
+def request(target: str) -> bytes:
+    return f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+
+def test_worker_prefixed_sessions_go_back_to_their_worker():
+    assert route_request(request("/ws?session_id=w2-abc"), 4) == 2
+    assert route_request(request("/form/status?x=1&session_id=w0-abc"), 4) == 0
+
+def test_client_chosen_sessions_always_reach_the_same_worker():
+    index = route_request(request("/ws?session_id=resume1"), 4)
+    assert index is not None and 0 <= index < 4
+    assert route_request(request("/form/status?session_id=resume1"), 4) == index
+
+def test_new_sessions_are_not_pinned():
+    assert route_request(request("/ws"), 4) is None
+    # A prefix naming a worker that does not exist is just an ID
+    assert route_request(request("/ws?session_id=w9-abc"), 4) is not None
+
+def test_available_cpus_is_at_least_one():
+    assert available_cpus() >= 1
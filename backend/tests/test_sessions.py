@@ -0,0 +1,112 @@
+import asyncio
+import json
+import pytest
+from app.sessions import SESSION_REJECTED_CLOSE_CODE, SessionStore, reject_session, valid_session_id
+
+@pytest.mark.parametrize("session_id", ["abc", "w0-0123abcd", "A_b-9", "x" * 64])
+def test_valid_session_ids(session_id):
+    assert valid_session_id(session_id)
+
+@pytest.mark.parametrize("session_id", ["../../escaped", "a/b", "a b", "x" * 65, "abc\n", None, 42])
+def test_invalid_session_ids(session_id):
+    assert not valid_session_id(session_id)
+
+def test_create_rejects_malformed_session_id():
+    sessions = SessionStore()
+    with pytest.raises(ValueError):
+        sessions.create("../../escaped")
+    assert len(sessions) == 0
+
+def test_create_generates_prefixed_id():
+    sessions = SessionStore(id_prefix="w1-")
+    session = sessions.create()
+    assert session.session_id.startswith("w1-")
+    assert valid_session_id(session.session_id)
+
+class ClosingWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+    async def close(self, code=1000, reason=None):
+        self.close_code = code
+
+def test_reject_session_explains_and_closes():
+    websocket = ClosingWebSocket()
+    asyncio.run(reject_session(websocket, "Invalid session ID"))
+    assert websocket.sent == [{"type": "error", "message": "Invalid session ID"}]
+    assert websocket.close_code == SESSION_REJECTED_CLOSE_CODE
+
+def test_connected_session_cannot_be_attached_twice():
+    sessions = SessionStore()
+    owner = object()
+    session = sessions.create("caller", owner)
+    with pytest.raises(ValueError):
+        sessions.create("caller", object())
+    assert session.websocket is owner
+
+def test_stale_connection_cannot_detach_the_session():
+    sessions = SessionStore()
+    first, second = object(), object()
+    sessions.create("caller", first)
+    assert sessions.detach("caller", first)
+    session = sessions.create("caller", second)
+    # The first connection's cleanup running late leaves the new one attached
+    assert not sessions.detach("caller", first)
+    assert session.websocket is second and session.detached_at is None
+
+def test_reconnect_gets_current_form_back():
+    async def scenario():
+        sessions = SessionStore()
+        websocket = object()
+        session = sessions.create("caller", websocket)
+        form = await session.form_manager.create_form()
+        await session.form_manager.update_field("name", "Ada")
+        sessions.detach("caller", websocket)
+
+        resumed = sessions.create("caller", object())
+        assert resumed is session
+        current = resumed.form_manager.get_current_form()
+        assert current["id"] == form.id
+        assert current["fields"]["name"]["value"] == "Ada"
+    asyncio.run(scenario())
+
+def test_detached_sessions_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.sessions.time.monotonic", lambda: now[0])
+    sessions = SessionStore(ttl_seconds=60)
+    expired = []
+    sessions.listeners.append(expired.append)
+    websocket = object()
+    sessions.create("caller", websocket)
+    sessions.detach("caller", websocket)
+
+    now[0] += 30
+    assert sessions.get("caller") is not None
+    now[0] += 31
+    assert sessions.get("caller") is None
+    assert expired == ["caller"]
+    assert sessions.create("caller").detached_at is None
+
+def test_restored_forms_are_resumable_then_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.sessions.time.monotonic", lambda: now[0])
+    sessions = SessionStore(ttl_seconds=60)
+    old = {"id": "form_a", "type": "default", "fields": {"name": {"value": "Ada"}}}
+    new = {"id": "form_b", "type": "default", "fields": {"name": {"value": "Grace"}}}
+    sessions.restore_forms({"form_a": ("caller", old), "form_b": ("caller", new), "form_c": (None, old)})
+
+    assert sessions.get("caller").form_manager.get_current_form()["fields"]["name"]["value"] == "Grace"
+    session = sessions.create("caller", object())
+    assert session.form_manager.current_form == "form_b"
+
+    sessions.detach("caller", session.websocket)
+    now[0] += 61
+    assert sessions.get("caller") is None
+    assert "form_b" in sessions.form_store
@@ -0,0 +1,22 @@
+from app.shared_state import SharedFormState
+
+def test_forget_deletes_pending_and_flushed_forms(tmp_path):
+    state = SharedFormState(str(tmp_path / "state.sqlite3"), flush_interval_ms=10_000)
+    try:
+        state.publish("caller", {"id": "form_a"})
+        state.publish("other", {"id": "form_b"})
+        assert state.get_form("caller") == {"id": "form_a"}
+        state._flush()
+
+        state.forget("caller")
+        assert state.get_form("caller") is None
+        state._flush()
+        assert state.get_form("caller") is None
+        assert state.get_form("other") == {"id": "form_b"}
+
+        # A session that comes back publishes again
+        state.publish("caller", {"id": "form_c"})
+        state._flush()
+        assert state.get_form("caller") == {"id": "form_c"}
+    finally:
+        state.close()
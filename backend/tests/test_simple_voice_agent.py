@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+def tool_call(websocket, tool, args, request_id=None):
+    message = {"type": "tool_call", "tool": tool, "args": args}
+    if request_id is not None:
+        message["id"] = request_id
+    websocket.send_json(message)
+    return websocket.receive_json()
+
+def test_field_updates_reply_with_deltas_when_asked():
+    with TestClient(app).websocket_connect("/ws?deltas=true") as websocket:
+        websocket.receive_json()
+        opened = tool_call(websocket, "open_form", {})["form"]
+        reply = tool_call(websocket, "update_form_field", {"field_name": "name", "value": "Ada"}, request_id=7)
+    assert reply["status"] == "success" and reply["id"] == 7
+    assert "form" not in reply
+    delta = reply["delta"]
+    assert delta["id"] == opened["id"]
+    assert delta["base_version"] == opened["version"] and delta["version"] == opened["version"] + 1
+    assert delta["fields"] == {"name": "Ada"}
+
+def test_field_updates_reply_with_the_full_form_by_default():
+    with TestClient(app).websocket_connect("/ws") as websocket:
+        websocket.receive_json()
+        tool_call(websocket, "open_form", {})
+        reply = tool_call(websocket, "update_form_field", {"field_name": "name", "value": "Ada"})
+    assert "delta" not in reply
+    assert reply["form"]["fields"]["name"]["value"] == "Ada"
+
+def test_resync_sends_the_current_form():
+    with TestClient(app).websocket_connect("/ws?deltas=true") as websocket:
+        websocket.receive_json()
+        tool_call(websocket, "open_form", {})
+        tool_call(websocket, "update_form_field", {"field_name": "email", "value": "ada@example.com"})
+        websocket.send_json({"type": "resync"})
+        snapshot = websocket.receive_json()
+    assert snapshot["type"] == "form_snapshot"
+    assert snapshot["form"]["version"] == 2
+    assert snapshot["form"]["fields"]["email"]["value"] == "ada@example.com"
@@ -0,0 +1,67 @@
+import asyncio
+from app.speculation import SpeculationStats, Speculator
+
+class Recorder:
+    def __init__(self, start_delay: float = 0):
+        self.start_delay = start_delay
+        self.started = []
+        self.cancelled = 0
+        self.committed = 0
+
+    async def start(self, text, speculative):
+        await asyncio.sleep(self.start_delay)
+        self.started.append((text, speculative))
+
+    async def cancel(self):
+        self.cancelled += 1
+
+    async def commit(self):
+        self.committed += 1
+
+def speculator(recorder, **kwargs):
+    return Speculator(recorder.start, recorder.cancel, recorder.commit, stability_ms=10, min_words=3,
+                      stats=SpeculationStats(), **kwargs)
+
+def test_matching_final_commits_the_speculative_request():
+    async def run():
+        recorder = Recorder()
+        spec = speculator(recorder)
+        await spec.partial("set my name to")
+        await asyncio.sleep(0.03)
+        await spec.final("Set my name to.")
+        return recorder, spec.stats.stats()
+
+    recorder, stats = asyncio.run(run())
+    assert recorder.started == [("set my name to", True)]
+    assert recorder.committed == 1 and recorder.cancelled == 0
+    assert stats["committed"] == 1 and stats["wasted"] == 0
+
+def test_diverging_final_cancels_and_restarts():
+    async def run():
+        recorder = Recorder()
+        spec = speculator(recorder)
+        await spec.partial("set my name to")
+        await asyncio.sleep(0.03)
+        await spec.final("set my name to Alice")
+        return recorder, spec.stats.stats()
+
+    recorder, stats = asyncio.run(run())
+    assert recorder.started == [("set my name to", True), ("set my name to Alice", False)]
+    assert recorder.cancelled == 1 and recorder.committed == 0
+    assert stats["wasted"] == 1
+
+def test_reset_cancels_a_pending_request():
+    async def run():
+        recorder = Recorder(start_delay=1)
+        spec = speculator(recorder)
+        await spec.partial("set my name to")
+        await asyncio.sleep(0.03)
+        pending = spec.pending
+        assert pending is not None
+        spec.reset()
+        await asyncio.sleep(0)
+        return pending.cancelled(), spec.pending
+
+    cancelled, pending = asyncio.run(run())
+    assert cancelled
+    assert pending is None
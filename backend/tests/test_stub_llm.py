@@ -0,0 +1,30 @@
+import asyncio
+from app.stub_llm import StubLLM
+
+def test_script_emits_tool_calls_with_captured_args():
+    llm = StubLLM(0, 0)
+    assert llm.tool_calls("please open the form") == [("open_form", {"form_type": "default"})]
+    assert llm.tool_calls("My email is ada@example.com.") == [
+        ("update_form_field", {"field_name": "email", "value": "ada@example.com"})
+    ]
+    assert llm.tool_calls("hello") == []
+
+def test_reply_streams_word_by_word():
+    llm = StubLLM(0, 0)
+    assert llm.reply_tokens("hi there") == ["You ", "said: ", "hi ", "there"]
+    assert asyncio.run(llm.complete("hi there")) == "You said: hi there"
+    assert llm.stats() == {"requests": 1, "completed": 1, "cancelled": 0}
+
+def test_cancelled_stream_is_counted():
+    async def run():
+        llm = StubLLM(first_token_ms=1000)
+        task = asyncio.create_task(llm.complete("hi"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return llm.stats()
+
+    assert asyncio.run(run())["cancelled"] == 1
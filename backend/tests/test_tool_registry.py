@@ -0,0 +1,66 @@
+import asyncio
+import json
+import logging
+from app.form_tools import FormStore, get_form_tools
+from app.sessions import Session
+from app.tool_registry import ToolRegistry, compile_validator, form_tool_registry
+
+def dispatch(session, tool, args):
+    return asyncio.run(form_tool_registry.dispatch(session, tool, args))
+
+def session():
+    return Session("s1", form_store=FormStore())
+
+def test_validator_applies_defaults_and_checks_types():
+    validate = compile_validator({
+        "properties": {"name": {"type": "string"}, "count": {"type": "integer", "default": 1}},
+        "required": ["name"]
+    })
+    assert validate({"name": "x"}) == ({"name": "x", "count": 1}, None)
+    assert validate({})[1] == "Missing required argument: name"
+    assert validate({"name": 3})[1] == "Argument 'name' must be of type string"
+    assert validate([])[1] == "Tool arguments must be an object"
+
+def test_form_tools_round_trip():
+    caller = session()
+    assert dispatch(caller, "open_form", {})["status"] == "success"
+    result = dispatch(caller, "update_form_field", {"field_name": "name", "value": "Ada"})
+    assert result["form"]["fields"]["name"]["value"] == "Ada"
+
+def test_unknown_tool_is_an_error():
+    assert dispatch(session(), "delete_everything", {}) == {"status": "error", "message": "Unknown tool: delete_everything"}
+
+def test_expected_errors_are_not_logged_as_errors(caplog):
+    caller = session()
+    with caplog.at_level(logging.INFO, logger="app.tool_registry"):
+        result = dispatch(caller, "update_form_field", {"field_name": "name", "value": "Ada"})
+    assert result == {"status": "error", "message": "No active form"}
+    assert caplog.records and all(record.levelno < logging.WARNING for record in caplog.records)
+    assert not any(record.exc_info for record in caplog.records)
+
+def test_unexpected_errors_are_logged_as_errors(caplog):
+    registry = ToolRegistry()
+
+    async def broken(session, args):
+        raise KeyError("boom")
+
+    registry.register({"name": "broken", "parameters": {}}, broken)
+    with caplog.at_level(logging.INFO, logger="app.tool_registry"):
+        result = asyncio.run(registry.dispatch(session(), "broken", {}))
+    assert result["status"] == "error"
+    assert any(record.levelno == logging.ERROR for record in caplog.records)
+
+def test_form_tool_schemas_cannot_be_changed_by_callers():
+    encoded = form_tool_registry.encoded_schemas()
+    tools = get_form_tools()
+    tools.append({"name": "rogue"})
+    tools[0]["name"] = "renamed"
+    assert [tool["name"] for tool in get_form_tools()] == ["open_form", "update_form_field", "submit_form"]
+    assert json.loads(encoded)[0]["name"] == "open_form"
+
+def test_each_llm_client_gets_its_own_schemas():
+    first = form_tool_registry.decoded_schemas()
+    first[0]["parameters"]["properties"].clear()
+    second = form_tool_registry.decoded_schemas()
+    assert second[0]["parameters"]["properties"]
+    assert isinstance(form_tool_registry.schemas, tuple)
@@ -0,0 +1,132 @@
+import asyncio
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.vad import (AMBIGUOUS, SILENCE, SILERO_CHUNK_SIZE, SPEECH, BatchedVADEngine, EnergyVAD, GatedVAD,
+                     VADStats, create_vad_engine)
+
+WINDOW = 512
+
+def tone(amplitude: float, n: int = WINDOW) -> np.ndarray:
+    return (amplitude * np.sin(np.arange(n) * 2 * np.pi * 200 / 16000)).astype(np.int16)
+
+def noise(amplitude: float, n: int = WINDOW) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return (amplitude * rng.choice([-1, 1], n)).astype(np.int16)
+
+def test_energy_gate_classifies_windows():
+    windows = np.stack([np.zeros(WINDOW, dtype=np.int16), tone(10000), noise(10000), tone(300)])
+    assert list(EnergyVAD().classify(windows)) == [SILENCE, SPEECH, AMBIGUOUS, AMBIGUOUS]
+
+def test_gated_vad_escalates_only_ambiguous_windows():
+    scored = []
+
+    async def fallback(window):
+        scored.append(window)
+        return 0.9
+
+    async def scenario():
+        vad = GatedVAD(EnergyVAD(), WINDOW, hangover_windows=0, fallback=fallback)
+        samples = np.concatenate([np.zeros(WINDOW, dtype=np.int16), tone(300), tone(10000)])
+        assert await vad.process(samples)
+        stats = vad.stats()
+        assert stats["windows_processed"] == 3 and stats["windows_escalated"] == 1
+        assert stats["windows_skipped"] == 2
+        assert len(scored) == 1
+        assert not await vad.process(np.zeros(WINDOW, dtype=np.int16))
+    asyncio.run(scenario())
+
+def test_counters_aggregate_across_sessions():
+    async def fallback(window):
+        return 0.0
+
+    async def scenario():
+        counters = VADStats()
+        for _ in range(2):
+            vad = GatedVAD(EnergyVAD(), WINDOW, fallback=fallback, counters=counters)
+            await vad.process(np.concatenate([np.zeros(WINDOW, dtype=np.int16), tone(300)]))
+        return counters.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats == {"windows_processed": 4, "windows_escalated": 2, "windows_skipped": 2, "escalation_rate": 0.5}
+
+def test_gated_vad_holds_speech_through_hangover():
+    async def scenario():
+        vad = GatedVAD(EnergyVAD(), WINDOW, hangover_windows=2)
+        await vad.process(tone(10000))
+        silence = np.zeros(WINDOW, dtype=np.int16)
+        assert await vad.process(silence)
+        assert await vad.process(silence)
+        assert not await vad.process(silence)
+    asyncio.run(scenario())
+
+def mean_model(chunks, states):
+    for state in states:
+        state["calls"] += 1
+    return np.abs(chunks).mean(axis=1) / 32768
+
+def engine(model=mean_model, **kwargs):
+    return BatchedVADEngine(model, lambda: {"calls": 0}, **kwargs)
+
+def test_engine_batches_sessions_and_keeps_each_state_ordered():
+    async def scenario():
+        vad = engine(max_delay_ms=5)
+        a, b = vad.stream(), vad.stream()
+        chunk = np.full(SILERO_CHUNK_SIZE, 16384, dtype=np.int16)
+        results = await asyncio.gather(a(chunk), b(chunk), a(chunk))
+        assert results == [0.5, 0.5, 0.5]
+        # a's two chunks went into separate batches
+        assert vad.batches == 2 and vad.chunks_scored == 3
+        assert a.state["calls"] == 2
+        await vad.stop()
+    asyncio.run(scenario())
+
+def test_engine_survives_a_batch_that_cannot_be_stacked():
+    async def scenario():
+        vad = engine(max_delay_ms=5)
+        bad = vad.score(vad.new_state(), np.zeros(SILERO_CHUNK_SIZE - 1, dtype=np.int16))
+        good = vad.score(vad.new_state(), np.zeros(SILERO_CHUNK_SIZE, dtype=np.int16))
+        assert await asyncio.wait_for(asyncio.gather(bad, good), 1) == [0.0, 0.0]
+        assert vad.stats()["batch_errors"] == 1
+
+        # The batching task is still alive
+        chunk = np.full(SILERO_CHUNK_SIZE, 16384, dtype=np.int16)
+        assert await asyncio.wait_for(vad.score(vad.new_state(), chunk), 1) == 0.5
+        await vad.stop()
+    asyncio.run(scenario())
+
+def test_engine_scores_model_errors_as_silence():
+    def failing(chunks, states):
+        raise RuntimeError("model failed")
+
+    async def scenario():
+        vad = engine(failing)
+        assert await asyncio.wait_for(vad.score(vad.new_state(), np.zeros(SILERO_CHUNK_SIZE, dtype=np.int16)), 1) == 0.0
+        await vad.stop()
+    asyncio.run(scenario())
+
+def test_stop_cancels_outstanding_scores():
+    def slow(chunks, states):
+        import time
+        time.sleep(0.05)
+        return np.zeros(len(chunks))
+
+    async def scenario():
+        vad = engine(slow, max_delay_ms=0)
+        state = vad.new_state()
+        chunk = np.zeros(SILERO_CHUNK_SIZE, dtype=np.int16)
+        scores = [asyncio.ensure_future(vad.score(state, chunk)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await vad.stop()
+        for score in scores:
+            with pytest.raises(asyncio.CancelledError):
+                await asyncio.wait_for(score, 1)
+        with pytest.raises(RuntimeError):
+            await vad.score(state, chunk)
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("window_size", [256, 768])
+def test_silero_needs_whole_chunk_windows(window_size):
+    config = SimpleNamespace(VAD_USE_SILERO=True, VAD_WINDOW_SIZE=window_size)
+    with pytest.raises(ValueError):
+        create_vad_engine(config)
@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { FormData } from '../lib/rtvi-client';
 import { FormComponent } from './FormComponent';
 import { AudioVisualizer } from './AudioVisualizer';
@@ -14,6 +14,15 @@ export const VoiceAgent: React.FC = () => {
   const [latency, setLatency] = useState<number>(0);
   const [status, setStatus] = useState<string>('Disconnected');
   const [error, setError] = useState<string | null>(null);
+  const sessionIdRef = useRef<string | null>(null);
+  
+  // /form requests are scoped to the session the server assigned; there is nothing to reset before that
+  const postFormReset = () => {
+    if (!sessionIdRef.current) {
+      return Promise.reject(new Error('No session assigned yet'));
+    }
+    return fetch(`http://localhost:8000/form/reset?session_id=${encodeURIComponent(sessionIdRef.current)}`, { method: 'POST' });
+  };
   
   const sendToolCall = (tool: string, args: any) => {
     console.log('🔍 Checking WebSocket connection...');
@@ -56,8 +65,9 @@ export const VoiceAgent: React.FC = () => {
       
       console.log('Microphone access granted');
       
-      // Create WebSocket connection
-      const websocket = new WebSocket('ws://localhost:8000/ws');
+      // Create WebSocket connection, resuming our session if the server already assigned one
+      const resume = sessionIdRef.current ? `?session_id=${encodeURIComponent(sessionIdRef.current)}` : '';
+      const websocket = new WebSocket(`ws://localhost:8000/ws${resume}`);
       
       websocket.onopen = () => {
         console.log('🔗 Connected to WebSocket');
@@ -81,7 +91,10 @@ export const VoiceAgent: React.FC = () => {
           console.log('📨 Parsed message:', message);
           
           // Handle different response formats
-          if (message.form) {
+          if (message.type === 'session') {
+            console.log('🪪 Session assigned:', message.session_id);
+            sessionIdRef.current = message.session_id;
+          } else if (message.form) {
             console.log('📝 Form data received - updating UI:', message.form);
             setForm(message.form);
           } else if (message.type === 'form_update') {
@@ -419,7 +432,7 @@ export const VoiceAgent: React.FC = () => {
         else if (transcript.includes('reset') || transcript.includes('start over') || transcript.includes('clear')) {
           console.log('✅ Command recognized: Resetting form');
           // Reset form via API
-          fetch('http://localhost:8000/form/reset', { method: 'POST' })
+          postFormReset()
             .then(() => {
               console.log('✅ Form reset successfully');
               setForm(null);
@@ -609,9 +622,7 @@ export const VoiceAgent: React.FC = () => {
   
   const resetForm = async () => {
     try {
-      const response = await fetch('http://localhost:8000/form/reset', {
-        method: 'POST',
-      });
+      const response = await postFormReset();
       if (response.ok) {
         setForm(null);
       }
@@ -1,9 +1,22 @@
+import argparse
 import asyncio
+import itertools
+import math
+import random
 import websockets
 import json
 import time
 import statistics
-from typing import List
+import struct
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+# Mirrors backend/app/audio.py: uint32 sequence, uint64 timestamp (us), int16 PCM
+AUDIO_FRAME_HEADER = struct.Struct("<IQ")
+AUDIO_CHUNK_SIZE = 1024
+AUDIO_SAMPLE_RATE = 16000
+# Mirrors Config.MAX_LATENCY_MS
+MAX_LATENCY_MS = 500
 
 class PerformanceTest:
     def __init__(self, server_url: str = "ws://localhost:8000/ws"):
@@ -12,14 +25,15 @@ class PerformanceTest:
         
     async def test_connection_speed(self) -> float:
         """Test connection establishment time"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
             async with websockets.connect(self.server_url) as websocket:
+                await websocket.recv()  # Session handshake
                 await websocket.send(json.dumps({"type": "ping"}))
                 response = await websocket.recv()
                 
-            end_time = time.time()
+            end_time = time.perf_counter()
             return (end_time - start_time) * 1000  # Convert to milliseconds
             
         except Exception as e:
@@ -32,21 +46,18 @@ class PerformanceTest:
         
         try:
             async with websockets.connect(self.server_url) as websocket:
+                await websocket.recv()  # Session handshake
+                silence = bytes(AUDIO_CHUNK_SIZE * 2)  # Mock int16 PCM frame
                 for i in range(num_tests):
-                    # Send mock audio data
-                    audio_data = [0] * 1024  # Mock audio frame
-                    message = {
-                        "type": "audio",
-                        "data": audio_data,
-                        "timestamp": time.time()
-                    }
+                    # Send mock audio data as a binary frame
+                    frame = AUDIO_FRAME_HEADER.pack(i, int(time.monotonic_ns() // 1000)) + silence
                     
-                    start_time = time.time()
-                    await websocket.send(json.dumps(message))
+                    start_time = time.perf_counter()
+                    await websocket.send(frame)
                     
                     # Wait for response
                     response = await websocket.recv()
-                    end_time = time.time()
+                    end_time = time.perf_counter()
                     
                     latency = (end_time - start_time) * 1000
                     latencies.append(latency)
@@ -65,8 +76,10 @@ class PerformanceTest:
         
         try:
             async with websockets.connect(self.server_url) as websocket:
+                await websocket.recv()  # Session handshake
+                
                 # Test form opening
-                start_time = time.time()
+                start_time = time.perf_counter()
                 await websocket.send(json.dumps({
                     "type": "tool_call",
                     "tool": "open_form",
@@ -74,7 +87,7 @@ class PerformanceTest:
                 }))
                 
                 response = await websocket.recv()
-                form_open_time = (time.time() - start_time) * 1000
+                form_open_time = (time.perf_counter() - start_time) * 1000
                 results["form_open"] = form_open_time
                 
                 # Test field updates
@@ -86,7 +99,7 @@ class PerformanceTest:
                 ]
                 
                 for field_name, value in fields:
-                    start_time = time.time()
+                    start_time = time.perf_counter()
                     await websocket.send(json.dumps({
                         "type": "tool_call",
                         "tool": "update_form_field",
@@ -94,14 +107,14 @@ class PerformanceTest:
                     }))
                     
                     response = await websocket.recv()
-                    field_time = (time.time() - start_time) * 1000
+                    field_time = (time.perf_counter() - start_time) * 1000
                     field_update_times.append(field_time)
                 
                 results["field_updates"] = field_update_times
                 results["avg_field_update"] = statistics.mean(field_update_times)
                 
                 # Test form submission
-                start_time = time.time()
+                start_time = time.perf_counter()
                 await websocket.send(json.dumps({
                     "type": "tool_call",
                     "tool": "submit_form",
@@ -109,7 +122,7 @@ class PerformanceTest:
                 }))
                 
                 response = await websocket.recv()
-                submit_time = (time.time() - start_time) * 1000
+                submit_time = (time.perf_counter() - start_time) * 1000
                 results["form_submit"] = submit_time
                 
         except Exception as e:
@@ -179,15 +192,383 @@ class PerformanceTest:
         
         return results
 
+class HdrHistogram:
+    """Log-linear histogram of integer microseconds, in the layout of HdrHistogram.
+
+    Values below 2^sub_bucket_bits are recorded exactly; above that every power of two
+    is split into 2^(sub_bucket_bits - 1) buckets, keeping relative error under
+    1 / 2^(sub_bucket_bits - 1) at any magnitude. Counts are sparse so histograms
+    serialize compactly and merge by addition.
+    """
+    
+    def __init__(self, sub_bucket_bits: int = 11):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.half_count = 1 << (sub_bucket_bits - 1)
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.max_value = 0
+    
+    def record(self, value_us: int, count: int = 1):
+        value_us = max(0, int(value_us))
+        shift = max(0, value_us.bit_length() - self.sub_bucket_bits)
+        index = shift * self.half_count + (value_us >> shift)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        self.max_value = max(self.max_value, value_us)
+    
+    def merge(self, other: "HdrHistogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.max_value = max(self.max_value, other.max_value)
+    
+    def value_at(self, index: int) -> float:
+        """Midpoint of the values recorded at `index`"""
+        if index < 2 * self.half_count:
+            return float(index)
+        shift = index // self.half_count - 1
+        low = (index - shift * self.half_count) << shift
+        return low + ((1 << shift) - 1) / 2
+    
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.total:
+            return None
+        rank = max(1, round(p / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.value_at(index), self.max_value)
+        return float(self.max_value)
+    
+    def summary_ms(self) -> Dict[str, Any]:
+        def ms(value):
+            return round(value / 1000, 3) if value is not None else None
+        return {
+            "count": self.total,
+            "p50": ms(self.percentile(50)),
+            "p90": ms(self.percentile(90)),
+            "p95": ms(self.percentile(95)),
+            "p99": ms(self.percentile(99)),
+            "p99.9": ms(self.percentile(99.9)),
+            "max": ms(self.max_value if self.total else None)
+        }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sub_bucket_bits": self.sub_bucket_bits,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())}
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HdrHistogram":
+        histogram = cls(data["sub_bucket_bits"])
+        for index, count in data["counts"].items():
+            histogram.counts[int(index)] = count
+            histogram.total += count
+            histogram.max_value = max(histogram.max_value, int(histogram.value_at(int(index))))
+        return histogram
+
+class LoadCaller:
+    """One simulated caller streaming 20 ms audio frames on a fixed, open-loop schedule.
+
+    Frame and tool-call latencies are measured from when each message was *scheduled*,
+    not when it was actually sent, so a stalled server or client cannot hide queueing
+    delay (coordinated omission). For the same reason, messages that never got a reply,
+    or were never sent because the connection failed, are recorded as lost at no less
+    than the drain timeout instead of being left out of the histograms.
+    """
+    
+    def __init__(self, test: "LoadTest", caller_id: int, scheduled_at: float):
+        self.test = test
+        self.caller_id = caller_id
+        self.scheduled_at = scheduled_at
+        # seq -> intended send time
+        self.pending_frames: Dict[int, float] = {}
+        self.pending_calls: Dict[str, float] = {}
+        self.frames_sent = 0
+        # When the frame schedule starts; set once connected
+        self.stream_start: Optional[float] = None
+        self.errors = 0
+        self.rejected = False
+    
+    async def run(self, until: float):
+        test = self.test
+        await sleep_until(self.scheduled_at)
+        try:
+            websocket = await websockets.connect(test.server_url, max_queue=None)
+        except Exception:
+            test.connect_failures += 1
+            return
+        try:
+            handshake = json.loads(await websocket.recv())
+            if handshake.get("type") == "overloaded":
+                # Turned away by admission control: this caller never streams
+                self.rejected = True
+                test.rejected += 1
+                return
+            test.connect_hist.record((time.perf_counter() - self.scheduled_at) * 1_000_000)
+            receiver = asyncio.create_task(self.receive(websocket))
+            try:
+                await self.send(websocket, until)
+                # Give in-flight replies a moment to arrive before counting them lost
+                await asyncio.sleep(test.drain_seconds)
+            finally:
+                receiver.cancel()
+        except (websockets.ConnectionClosed, OSError):
+            self.errors += 1
+        finally:
+            if not self.rejected:
+                self.record_lost(until)
+            await websocket.close()
+    
+    def record_lost(self, until: float):
+        """Record unanswered and unsent messages as lost, at no less than the drain timeout"""
+        test = self.test
+        now = time.perf_counter()
+        timeout = test.drain_seconds
+        for intended in self.pending_frames.values():
+            test.frame_hist.record(max(now - intended, timeout) * 1_000_000)
+        for intended in self.pending_calls.values():
+            test.tool_hist.record(max(now - intended, timeout) * 1_000_000)
+        
+        # Frames the schedule still held when the connection failed
+        start = self.stream_start if self.stream_start is not None else self.scheduled_at
+        scheduled = max(0, math.ceil((until - start) / (test.frame_ms / 1000)))
+        unsent = max(0, scheduled - self.frames_sent)
+        if unsent:
+            test.frame_hist.record(timeout * 1_000_000, unsent)
+        
+        test.frames_lost += len(self.pending_frames) + unsent
+        test.calls_lost += len(self.pending_calls)
+        self.pending_frames.clear()
+        self.pending_calls.clear()
+    
+    async def send(self, websocket, until: float):
+        test = self.test
+        frame_interval = test.frame_ms / 1000
+        samples = bytes(int(AUDIO_SAMPLE_RATE * frame_interval) * 2)
+        calls = itertools.cycle(FORM_CALLS)
+        frames_per_call = max(1, int(test.tool_call_interval / frame_interval))
+        
+        start = self.stream_start = time.perf_counter()
+        for seq in itertools.count():
+            intended = start + seq * frame_interval
+            if intended >= until:
+                return
+            await sleep_until(intended)
+            test.send_lag_hist.record((time.perf_counter() - intended) * 1_000_000)
+            
+            self.pending_frames[seq] = intended
+            await websocket.send(AUDIO_FRAME_HEADER.pack(seq, time.monotonic_ns() // 1000) + samples)
+            self.frames_sent += 1
+            
+            if seq % frames_per_call == frames_per_call - 1:
+                call_id = f"{self.caller_id}:{seq}"
+                self.pending_calls[call_id] = intended
+                tool, args = next(calls)
+                await websocket.send(json.dumps({"type": "tool_call", "id": call_id, "tool": tool, "args": args}))
+    
+    async def receive(self, websocket):
+        test = self.test
+        async for message in websocket:
+            now = time.perf_counter()
+            if isinstance(message, bytes):
+                seq, _ = AUDIO_FRAME_HEADER.unpack_from(message)
+                intended = self.pending_frames.pop(seq, None)
+                if intended is not None:
+                    test.frame_hist.record((now - intended) * 1_000_000)
+                continue
+            reply = json.loads(message)
+            intended = self.pending_calls.pop(reply.get("id"), None)
+            if intended is not None:
+                test.tool_hist.record((now - intended) * 1_000_000)
+
+# Each caller cycles through a realistic form session
+FORM_CALLS = [
+    ("open_form", {"form_type": "default"}),
+    ("update_form_field", {"field_name": "name", "value": "John Smith"}),
+    ("update_form_field", {"field_name": "email", "value": "john@example.com"}),
+    ("update_form_field", {"field_name": "phone", "value": "555-1234"}),
+    ("submit_form", {}),
+]
+
+async def sleep_until(deadline: float):
+    delay = deadline - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+class LoadTest:
+    """Runs N concurrent callers arriving open-loop, then reports HDR latency histograms"""
+    
+    def __init__(self, server_url: str, frame_ms: float = 20, arrival_rate: float = 50,
+                 duration: float = 30, tool_call_interval: float = 2.0, seed: int = 1):
+        self.server_url = server_url
+        self.frame_ms = frame_ms
+        self.arrival_rate = arrival_rate
+        self.duration = duration
+        self.tool_call_interval = tool_call_interval
+        self.drain_seconds = 1.0
+        self.seed = seed
+        self.reset()
+    
+    def reset(self):
+        self.frame_hist = HdrHistogram()
+        self.tool_hist = HdrHistogram()
+        self.connect_hist = HdrHistogram()
+        # How late the load generator itself sent frames; large values mean the client saturated
+        self.send_lag_hist = HdrHistogram()
+        self.connect_failures = 0
+        # Callers shed by the server's admission control
+        self.rejected = 0
+        self.frames_lost = 0
+        self.calls_lost = 0
+    
+    async def run_step(self, callers: int) -> Dict[str, Any]:
+        """Run one load level: `callers` arrive as a Poisson process, then all stream for `duration`"""
+        self.reset()
+        rng = random.Random(self.seed)
+        start = time.perf_counter() + 0.1
+        arrivals = []
+        t = start
+        for _ in range(callers):
+            arrivals.append(t)
+            t += rng.expovariate(self.arrival_rate)
+        until = t + self.duration
+        
+        load_callers = [LoadCaller(self, i, at) for i, at in enumerate(arrivals)]
+        await asyncio.gather(*(caller.run(until) for caller in load_callers))
+        
+        return {
+            "callers": callers,
+            "frames_sent": sum(caller.frames_sent for caller in load_callers),
+            "frames_lost": self.frames_lost,
+            "tool_calls_lost": self.calls_lost,
+            "connect_failures": self.connect_failures,
+            "rejected": self.rejected,
+            # Callers whose connection failed after the handshake
+            "errors": sum(caller.errors for caller in load_callers),
+            "frame_latency_ms": self.frame_hist.summary_ms(),
+            "tool_call_latency_ms": self.tool_hist.summary_ms(),
+            "connect_ms": self.connect_hist.summary_ms(),
+            "client_send_lag_ms": self.send_lag_hist.summary_ms(),
+            "histograms": {
+                "frame_latency": self.frame_hist.to_dict(),
+                "tool_call_latency": self.tool_hist.to_dict()
+            }
+        }
+    
+    async def find_breach(self, levels: List[int], max_latency_ms: float, percentile: float) -> Dict[str, Any]:
+        """Step through concurrency levels until the latency percentile exceeds the budget"""
+        key = f"p{percentile:g}"
+        steps = []
+        breach = None
+        for callers in levels:
+            print(f"▶ {callers} callers...")
+            step = await self.run_step(callers)
+            frame_p = step["frame_latency_ms"][key]
+            tool_p = step["tool_call_latency_ms"][key]
+            step["breached"] = step_breached(step, key, max_latency_ms)
+            steps.append(step)
+            print(f"  frame {key}: {frame_p} ms | tool call {key}: {tool_p} ms | "
+                  f"lost frames: {step['frames_lost']} | lost tool calls: {step['tool_calls_lost']} | "
+                  f"errors: {step['errors'] + step['connect_failures']} | rejected: {step['rejected']} | "
+                  f"client lag p99: {step['client_send_lag_ms']['p99']} ms")
+            if step["breached"]:
+                breach = callers
+                break
+        
+        return {
+            "meta": {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "server_url": self.server_url,
+                "frame_ms": self.frame_ms,
+                "arrival_rate": self.arrival_rate,
+                "duration_s": self.duration,
+                "tool_call_interval_s": self.tool_call_interval,
+                "max_latency_ms": max_latency_ms,
+                "slo_percentile": percentile,
+                "seed": self.seed
+            },
+            "steps": steps,
+            "breach_concurrency": breach,
+            "last_passing_concurrency": max((s["callers"] for s in steps if not s["breached"]), default=None)
+        }
+
+def step_breached(step: Dict[str, Any], key: str, max_latency_ms: float) -> bool:
+    """A step fails on a percentile over budget, or on any lost message, failed connection or rejected caller"""
+    latencies = (step["frame_latency_ms"][key], step["tool_call_latency_ms"][key])
+    worst = max(value for value in (*latencies, 0) if value is not None)
+    failures = (step["connect_failures"], step["rejected"], step["errors"],
+                step["frames_lost"], step["tool_calls_lost"])
+    return worst > max_latency_ms or any(failures)
+
+def compare_results(baseline_path: str, candidate_path: str):
+    """Print percentile changes between two load result files, matched by concurrency"""
+    with open(baseline_path) as f:
+        baseline = {step["callers"]: step for step in json.load(f)["steps"]}
+    with open(candidate_path) as f:
+        candidate = json.load(f)["steps"]
+    
+    print(f"{'callers':>8} {'metric':<26} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for step in candidate:
+        base = baseline.get(step["callers"])
+        if base is None:
+            continue
+        for metric in ("frame_latency_ms", "tool_call_latency_ms"):
+            for key in ("p50", "p99"):
+                old, new = base[metric][key], step[metric][key]
+                if old is None or new is None:
+                    continue
+                change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+                print(f"{step['callers']:>8} {metric + ' ' + key:<26} {old:>10.3f} {new:>10.3f} {change:>8}")
+
 async def main():
-    tester = PerformanceTest()
-    results = await tester.run_full_test()
+    parser = argparse.ArgumentParser(description="Voice agent performance tests")
+    parser.add_argument("--url", default="ws://localhost:8000/ws")
+    parser.add_argument("--load", action="store_true", help="run the concurrent open-loop load test")
+    parser.add_argument("--callers", default="10,50,100,200,500",
+                        help="comma-separated concurrency levels, stepped until the budget is breached")
+    parser.add_argument("--duration", type=float, default=30, help="seconds each level streams audio")
+    parser.add_argument("--arrival-rate", type=float, default=50, help="caller arrivals per second")
+    parser.add_argument("--frame-ms", type=float, default=20, help="audio frame pacing")
+    parser.add_argument("--tool-call-interval", type=float, default=2.0, help="seconds between form calls per caller")
+    parser.add_argument("--max-latency-ms", type=float, default=MAX_LATENCY_MS)
+    parser.add_argument("--percentile", type=float, default=99, help="percentile held to the latency budget")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="result file (JSON)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"),
+                        help="compare two load result files and exit")
+    args = parser.parse_args()
+    
+    if args.compare:
+        compare_results(*args.compare)
+        return
+    
+    if args.load:
+        load_test = LoadTest(args.url, args.frame_ms, args.arrival_rate, args.duration,
+                             args.tool_call_interval, args.seed)
+        levels = [int(level) for level in args.callers.split(",")]
+        results = await load_test.find_breach(levels, args.max_latency_ms, args.percentile)
+        output = args.output or f"load_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        
+        print("\n" + "=" * 50)
+        if results["breach_concurrency"] is not None:
+            print(f"❌ {args.max_latency_ms:g}ms p{args.percentile:g} budget breached at "
+                  f"{results['breach_concurrency']} callers "
+                  f"(last passing: {results['last_passing_concurrency']})")
+        else:
+            print(f"✅ Budget held up to {levels[-1]} callers")
+    else:
+        tester = PerformanceTest(args.url)
+        results = await tester.run_full_test()
+        output = args.output or "performance_results.json"
     
     # Save results to file
-    with open("performance_results.json", "w") as f:
+    with open(output, "w") as f:
         json.dump(results, f, indent=2)
     
-    print(f"\n📄 Results saved to performance_results.json")
+    print(f"\n📄 Results saved to {output}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())